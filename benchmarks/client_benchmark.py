@@ -0,0 +1,195 @@
+"""Measure api calls, wall time and peak memory of DnsApiClient functions against the stand-in api.
+
+Usage: python benchmarks/client_benchmark.py [--sizes 10,1000,100000] [--rounds 5]
+           [--latency 0.02] [--blocked-rate 0.1] [--http-error-rate 0.05] [--json results.json]
+
+The stand-in server runs in its own process, so the peak memory is the one of the
+client only. Every scenario is run rounds times for the wall time ( median ) and
+once more with tracemalloc for the peak memory. Api calls are counted without
+retries, the retries of all runs are reported separately.
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import tracemalloc
+from time import perf_counter
+from hostingde.api.batch import ZoneChangeBatch
+from hostingde.api.dns import DnsApiClient
+from hostingde.api.metrics import MetricsCollector
+from hostingde.api.retry import RetryPolicy
+from standin import StandInApi, StandInServer
+
+ZONE_NAME = "example.org"
+SUB_ZONE_NAME = "dev.example.org"
+
+
+def runAddRecord(client, iteration):
+    client.addRecord("bench{}.{}".format(iteration, ZONE_NAME), "TXT", '"bench"')
+
+
+def runSetRecord(client, iteration):
+    client.setRecord("host0." + ZONE_NAME, "A", "192.0.2.{}".format(iteration))
+
+
+def prepareDeleteRecord(client, iteration):
+    client.addZoneRecord(
+        ZONE_NAME, "delete{}.{}".format(iteration, ZONE_NAME), "A", "192.0.2.1"
+    )
+
+
+def runDeleteRecord(client, iteration):
+    client.deleteRecord("delete{}.{}".format(iteration, ZONE_NAME), "A")
+
+
+def runGetZoneByDomain(client, iteration):
+    client.getZoneByDomain("www." + ZONE_NAME)
+
+
+def runCertbotFlow(client, iteration):
+    """perform and cleanup of the certbot plugin for a name and its wildcard.
+
+    Same calls as hostingde.plugins.certbot.dns_hostingde.Authenticator, without
+    waiting for propagation.
+    """
+    name = "_acme-challenge." + ZONE_NAME
+    contents = ['"token-{}-a"'.format(iteration), '"token-{}-b"'.format(iteration)]
+    batch = ZoneChangeBatch(client, workers=4)
+    for content in contents:
+        batch.add(name, "TXT", content, 60)
+    zoneConfigs = {}
+    for result in batch.commit():
+        if not result.success:
+            raise result.error
+        zoneConfigs[result.operation.recordContent] = result.zoneConfig
+
+    batch = ZoneChangeBatch(client, workers=4)
+    for content in contents:
+        batch.delete(name, "TXT", content, zoneConfig=zoneConfigs[content])
+    for result in batch.commit():
+        if not result.success:
+            raise result.error
+
+
+SCENARIOS = {
+    "addRecord": (None, runAddRecord),
+    "setRecord": (None, runSetRecord),
+    "deleteRecord": (prepareDeleteRecord, runDeleteRecord),
+    "getZoneByDomain": (None, runGetZoneByDomain),
+    "certbot": (None, runCertbotFlow),
+}
+
+
+def serveStandIn(connection, recordCount, options):
+    api = StandInApi(seed=1, **options)
+    api.addSyntheticZone(ZONE_NAME, recordCount)
+    api.addSyntheticZone(SUB_ZONE_NAME, 10)
+    with StandInServer(api) as server:
+        connection.send(server.url)
+        connection.recv()
+
+
+def runScenario(client, metrics, prepare, run, rounds):
+    durations = []
+    calls = []
+    for iteration in range(rounds + 1):
+        if prepare is not None:
+            prepare(client, iteration)
+        metrics.reset()
+        measureMemory = iteration == rounds
+        if measureMemory:
+            tracemalloc.start()
+        started = perf_counter()
+        run(client, iteration)
+        duration = perf_counter() - started
+        if measureMemory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            durations.append(duration)
+        series = metrics.getStats()["series"].values()
+        calls.append(
+            (
+                sum(values["requests"] - values["retries"] for values in series),
+                sum(values["retries"] for values in series),
+                sum(values["responseBytes"] for values in series),
+            )
+        )
+    return {
+        "calls": max(call[0] for call in calls),
+        "retries": sum(call[1] for call in calls),
+        "responseBytes": max(call[2] for call in calls),
+        "wallMs": statistics.median(durations) * 1000 if durations else None,
+        "peakKiB": peak / 1024.0,
+    }
+
+
+def runBenchmark(recordCount, scenarios, rounds, options):
+    connection, childConnection = multiprocessing.Pipe()
+    server = multiprocessing.Process(
+        target=serveStandIn, args=(childConnection, recordCount, options)
+    )
+    server.start()
+    try:
+        url = connection.recv()
+        metrics = MetricsCollector()
+        retryPolicy = RetryPolicy(maxRetries=5, baseDelay=0.05, maxDelay=0.5)
+        results = {}
+        with DnsApiClient(
+            "bench", baseUrl=url, hooks=[metrics], retryPolicy=retryPolicy
+        ) as client:
+            for name in scenarios:
+                prepare, run = SCENARIOS[name]
+                results[name] = runScenario(client, metrics, prepare, run, rounds)
+        return results
+    finally:
+        connection.send("stop")
+        server.join()
+
+
+def printResults(recordCount, results):
+    print("zone size: {} records".format(recordCount))
+    print(
+        "{:<16} {:>6} {:>8} {:>12} {:>10} {:>12}".format(
+            "scenario", "calls", "retries", "received KiB", "wall ms", "peak KiB"
+        )
+    )
+    for name, result in results.items():
+        print(
+            "{:<16} {:>6} {:>8} {:>12.1f} {:>10.2f} {:>12.1f}".format(
+                name,
+                result["calls"],
+                result["retries"],
+                result["responseBytes"] / 1024.0,
+                result["wallMs"] or 0,
+                result["peakKiB"],
+            )
+        )
+    print("")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--blocked-rate", type=float, default=0)
+    parser.add_argument("--http-error-rate", type=float, default=0)
+    parser.add_argument("--json", help="write all results to a json file")
+    args = parser.parse_args()
+
+    options = {
+        "latency": args.latency,
+        "blockedRate": args.blocked_rate,
+        "httpErrorRate": args.http_error_rate,
+    }
+    scenarios = args.scenarios.split(",")
+    allResults = {}
+    for size in [int(size) for size in args.sizes.split(",")]:
+        allResults[size] = runBenchmark(size, scenarios, args.rounds, options)
+        printResults(size, allResults[size])
+    if args.json:
+        with open(args.json, "w") as resultFile:
+            json.dump(allResults, resultFile, indent=2, sort_keys=True)
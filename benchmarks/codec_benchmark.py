@@ -0,0 +1,102 @@
+"""Compare the json codecs of hostingde.api.codec on zonesFind like payloads.
+
+Usage: python benchmarks/codec_benchmark.py [--zones 25] [--records 2000] [--rounds 20]
+"""
+
+import argparse
+from timeit import repeat
+from hostingde.api.codec import getAvailableCodecs, getCodec
+
+
+def getZonePayload(zoneCount, recordCount):
+    """Build a zonesFind response body with zoneCount zones of recordCount records."""
+    zones = []
+    for z in range(zoneCount):
+        zoneName = "zone{}.example.org".format(z)
+        zoneConfigId = "1808{:012d}".format(z)
+        records = []
+        for r in range(recordCount):
+            recordType = ("A", "AAAA", "TXT", "CNAME")[r % 4]
+            content = {
+                "A": "10.{}.{}.{}".format(z % 256, r // 256 % 256, r % 256),
+                "AAAA": "2001:db8::{:x}".format(r),
+                "TXT": '"v=spf1 include:_spf.{} ~all {}"'.format(zoneName, r),
+                "CNAME": "host{}.{}".format(r, zoneName),
+            }[recordType]
+            records.append(
+                {
+                    "id": "1810{:08d}{:04d}".format(r, z),
+                    "zoneId": zoneConfigId,
+                    "recordTemplateId": None,
+                    "name": "host{}.{}".format(r, zoneName),
+                    "type": recordType,
+                    "content": content,
+                    "ttl": 3600,
+                    "priority": None,
+                    "lastChangeDate": "2020-06-01T12:00:00Z",
+                }
+            )
+        zones.append(
+            {
+                "zoneConfig": {
+                    "id": zoneConfigId,
+                    "accountId": "15010100000001",
+                    "dnsSecMode": "off",
+                    "emailAddress": "hostmaster@" + zoneName,
+                    "lastChangeDate": "2020-06-01T12:00:00Z",
+                    "masterIp": "",
+                    "name": zoneName,
+                    "nameUnicode": zoneName,
+                    "soaValues": {
+                        "expire": 1209600,
+                        "negativeTtl": 180,
+                        "refresh": 86400,
+                        "retry": 7200,
+                        "ttl": 3600,
+                    },
+                    "templateValues": None,
+                    "type": "NATIVE",
+                    "zoneTransferWhitelist": [],
+                },
+                "records": records,
+            }
+        )
+    return {
+        "errors": [],
+        "metadata": {"clientTransactionId": "", "serverTransactionId": "bench"},
+        "status": "success",
+        "warnings": [],
+        "response": {
+            "data": zones,
+            "limit": zoneCount,
+            "page": 1,
+            "totalEntries": zoneCount,
+            "totalPages": 1,
+            "type": "FindZonesResult",
+        },
+    }
+
+
+def runBenchmark(payload, rounds):
+    content = getCodec("json").dumps(payload)
+    print(
+        "payload: {} zones, {:.1f} MiB".format(
+            len(payload["response"]["data"]), len(content) / 1024.0 / 1024.0
+        )
+    )
+    print("{:<8} {:>12} {:>12}".format("codec", "loads ms", "dumps ms"))
+    for name in getAvailableCodecs():
+        codec = getCodec(name)
+        assert codec.loads(content) == payload
+        loads = min(repeat(lambda: codec.loads(content), number=1, repeat=rounds))
+        dumps = min(repeat(lambda: codec.dumps(payload), number=1, repeat=rounds))
+        print("{:<8} {:>12.2f} {:>12.2f}".format(name, loads * 1000, dumps * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zones", type=int, default=25)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    runBenchmark(getZonePayload(args.zones, args.records), args.rounds)
@@ -0,0 +1,513 @@
+"""Local stand-in for the hosting.de dns api endpoints used by hostingde.api.dns.
+
+StandInApi keeps zones in memory and answers recordsFind, zoneConfigsFind,
+zonesFind, zoneCreate, zoneRecreate, zoneUpdate and zoneDelete like the live
+api, including filters, paging and api errors. StandInServer serves it over
+http on localhost, so a DnsApiClient can use it as its baseUrl:
+
+    api = StandInApi(latency=0.02, blockedRate=0.1)
+    api.addSyntheticZone("example.org", recordCount=10000)
+    with StandInServer(api) as server:
+        client = DnsApiClient("token", baseUrl=server.url)
+        client.setRecord("demo.example.org", "A", "127.0.0.1")
+
+It is meant for benchmarks and experiments, not as a reference of the api.
+"""
+
+import copy
+import fnmatch
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PATH = "/api/dns/v1/json/"
+
+RECORD_FIELDS = ("RecordName", "RecordType", "RecordContent")
+
+
+class StandInApi:
+    """In-memory zones and the api functions working on them.
+
+    Faults are injected before a request is processed, so a failed zoneUpdate
+    does not change the zone, like a blocked object on the live api.
+
+    Attributes:
+        latency -- seconds every request is delayed
+        blockedRate -- fraction of requests answered with error 10205 object blocked
+        httpErrorRate -- fraction of requests answered with httpErrorStatus
+        httpErrorStatus -- http status code of injected http failures
+        authToken -- required authToken, None accepts every token
+        calls -- number of requests per api function
+    """
+
+    def __init__(
+        self,
+        latency=0,
+        blockedRate=0,
+        httpErrorRate=0,
+        httpErrorStatus=503,
+        authToken=None,
+        seed=None,
+    ):
+        self.latency = latency
+        self.blockedRate = blockedRate
+        self.httpErrorRate = httpErrorRate
+        self.httpErrorStatus = httpErrorStatus
+        self.authToken = authToken
+        self.calls = {}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__zones = {}
+        self.__failures = []
+        self.__nextId = 1
+
+    # zones
+
+    def addZone(self, zoneName, records=(), zoneConfig=None):
+        """Add a zone with api records, returns the created zone."""
+        zoneConfig = dict(zoneConfig or {}, name=zoneName)
+        with self.__lock:
+            return copy.deepcopy(self.__createZone(zoneConfig, records))
+
+    def addSyntheticZone(self, zoneName, recordCount):
+        """Add a zone with NS, SOA and recordCount generated A, AAAA, TXT and CNAME records."""
+        return self.addZone(zoneName, getSyntheticRecords(zoneName, recordCount))
+
+    def getZone(self, zoneName):
+        with self.__lock:
+            zone = self.__findZone({"name": zoneName})
+            return None if zone is None else copy.deepcopy(zone.toDict())
+
+    # faults
+
+    def failNext(self, count=1, errorCode=10205, status=None):
+        """Fail the next count requests with an api error code or an http status."""
+        with self.__lock:
+            self.__failures.extend([(errorCode, status)] * count)
+
+    # request handling
+
+    def handle(self, function, body):
+        """Process an api request, returns the http status and the encoded response.
+
+        Responses are encoded while the zones are locked, so they never contain
+        half applied changes of concurrent requests.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self.__lock:
+            self.calls[function] = self.calls.get(function, 0) + 1
+            failure = self.__getFailure()
+            if failure is not None:
+                errorCode, status = failure
+                if status is not None:
+                    return status, encode({"message": "Injected http failure."})
+                return 200, encode(getErrorResponse(errorCode, "Object is blocked."))
+            if self.authToken is not None and body.get("authToken") != self.authToken:
+                return 200, encode(getErrorResponse(10100, "Authentication failed."))
+            handler = getattr(self, "_handle_" + function, None)
+            if handler is None:
+                message = "Unknown api function {}.".format(function)
+                return 404, encode({"message": message})
+            try:
+                return 200, encode(getSuccessResponse(handler(body)))
+            except StandInError as e:
+                return 200, encode(getErrorResponse(e.code, e.text))
+
+    def __getFailure(self):
+        if self.__failures:
+            return self.__failures.pop(0)
+        if self.httpErrorRate and self.__random.random() < self.httpErrorRate:
+            return None, self.httpErrorStatus
+        if self.blockedRate and self.__random.random() < self.blockedRate:
+            return 10205, None
+        return None
+
+    def _handle_zonesFind(self, body):
+        requestFilter = body.get("filter")
+        zones = [zone for zone in self.__zones.values() if zone.matches(requestFilter)]
+        return getPage(zones, body, lambda zone: zone.toDict())
+
+    def _handle_zoneConfigsFind(self, body):
+        requestFilter = body.get("filter")
+        zones = [zone for zone in self.__zones.values() if zone.matches(requestFilter)]
+        return getPage(zones, body, lambda zone: zone.zoneConfig)
+
+    def _handle_recordsFind(self, body):
+        requestFilter = body.get("filter")
+        records = []
+        for zone in self.__zones.values():
+            records.extend(zone.findRecords(requestFilter))
+        return getPage(records, body, lambda record: record)
+
+    def _handle_zoneCreate(self, body):
+        if self.__findZone(body["zoneConfig"]) is not None:
+            raise StandInError(10400, "Zone already exists.")
+        return self.__createZone(body["zoneConfig"], body.get("records", []))
+
+    def _handle_zoneRecreate(self, body):
+        zone = self.__getZone(body["zoneConfig"])
+        del self.__zones[zone.zoneConfig["id"]]
+        zoneConfig = dict(body["zoneConfig"], id=zone.zoneConfig["id"])
+        return self.__createZone(zoneConfig, body.get("records", []))
+
+    def _handle_zoneUpdate(self, body):
+        zone = self.__getZone(body["zoneConfig"])
+        # the update is validated completely before it changes the zone
+        deleted = []
+        for record in body.get("recordsToDelete", []):
+            records = zone.getMatchingRecords(record)
+            if len(records) == 0:
+                raise StandInError(10303, "Record to delete does not exist.")
+            deleted.extend(records)
+        zone.removeRecords(deleted)
+        for record in body.get("recordsToAdd", []):
+            zone.addRecord(self.__getRecord(zone, record))
+        zone.zoneConfig["lastChangeDate"] = getTimestamp()
+        return zone.toDict()
+
+    def _handle_zoneDelete(self, body):
+        zone = self.__getZone(
+            {"id": body.get("zoneConfigId"), "name": body.get("zoneConfigName")}
+        )
+        del self.__zones[zone.zoneConfig["id"]]
+        return None
+
+    def __createZone(self, zoneConfig, records):
+        zoneConfig = dict(
+            {
+                "accountId": "15010100000001",
+                "dnsSecMode": "off",
+                "emailAddress": "hostmaster@" + zoneConfig["name"],
+                "masterIp": "",
+                "nameUnicode": zoneConfig["name"],
+                "soaValues": {
+                    "expire": 1209600,
+                    "negativeTtl": 180,
+                    "refresh": 86400,
+                    "retry": 7200,
+                    "ttl": 3600,
+                },
+                "templateValues": None,
+                "type": "NATIVE",
+                "zoneTransferWhitelist": [],
+            },
+            **zoneConfig
+        )
+        zoneConfig["id"] = zoneConfig.get("id") or self.__getId()
+        zoneConfig["lastChangeDate"] = getTimestamp()
+        zone = StandInZone(zoneConfig)
+        for record in records:
+            zone.addRecord(self.__getRecord(zone, record))
+        self.__zones[zoneConfig["id"]] = zone
+        return zone.toDict()
+
+    def __getRecord(self, zone, record):
+        return {
+            "id": self.__getId(),
+            "zoneId": zone.zoneConfig["id"],
+            "zoneConfigId": zone.zoneConfig["id"],
+            "recordTemplateId": None,
+            "name": record["name"],
+            "type": record["type"],
+            "content": record["content"],
+            "ttl": record.get("ttl", 3600),
+            "priority": record.get("priority"),
+            "lastChangeDate": getTimestamp(),
+        }
+
+    def __getId(self):
+        self.__nextId += 1
+        return "1810{:012d}".format(self.__nextId)
+
+    def __findZone(self, zoneConfig):
+        if zoneConfig.get("id"):
+            return self.__zones.get(zoneConfig["id"])
+        name = (zoneConfig.get("name") or "").rstrip(".").lower()
+        for zone in self.__zones.values():
+            if name in (zone.name, zone.nameUnicode):
+                return zone
+        return None
+
+    def __getZone(self, zoneConfig):
+        zone = self.__findZone(zoneConfig)
+        if zone is None:
+            raise StandInError(10301, "Zone does not exist.")
+        return zone
+
+
+class StandInZone:
+    """A zone of the stand-in with its records indexed by lowercase name."""
+
+    def __init__(self, zoneConfig):
+        self.zoneConfig = zoneConfig
+        self.name = zoneConfig["name"].rstrip(".").lower()
+        self.nameUnicode = zoneConfig["nameUnicode"].rstrip(".").lower()
+        self.records = []
+        self.recordsByName = {}
+
+    def toDict(self):
+        return {"zoneConfig": self.zoneConfig, "records": self.records}
+
+    def addRecord(self, record):
+        self.records.append(record)
+        self.recordsByName.setdefault(record["name"].lower(), []).append(record)
+
+    def getMatchingRecords(self, record):
+        return [
+            r
+            for r in self.recordsByName.get(record["name"].lower(), [])
+            if r["type"] == record["type"]
+            and (not record.get("content") or r["content"] == record["content"])
+        ]
+
+    def removeRecords(self, records):
+        if len(records) == 0:
+            return
+        removedIds = set(record["id"] for record in records)
+        self.records = [r for r in self.records if r["id"] not in removedIds]
+        for name in set(record["name"].lower() for record in records):
+            self.recordsByName[name] = [
+                r for r in self.recordsByName[name] if r["id"] not in removedIds
+            ]
+
+    def matches(self, requestFilter):
+        """Check if the zone matches a zone filter, record fields match any record."""
+        if requestFilter is None or filterMatches(requestFilter, self, None):
+            return True
+        if not hasFields(requestFilter, RECORD_FIELDS):
+            return False
+        for record in self.__getCandidates(requestFilter):
+            if filterMatches(requestFilter, self, record):
+                return True
+        return False
+
+    def findRecords(self, requestFilter):
+        if requestFilter is None:
+            return list(self.records)
+        if not hasFields(requestFilter, RECORD_FIELDS) and not filterMatches(
+            requestFilter, self, None
+        ):
+            return []
+        return [
+            record
+            for record in self.__getCandidates(requestFilter)
+            if filterMatches(requestFilter, self, record)
+        ]
+
+    def __getCandidates(self, requestFilter):
+        # records named in the filter are looked up, other filters scan all records
+        names = getFilterNames(requestFilter)
+        if names is None:
+            return self.records
+        candidates = []
+        for name in names:
+            candidates.extend(self.recordsByName.get(name, []))
+        return candidates
+
+
+class StandInError(Exception):
+    def __init__(self, code, text):
+        self.code = code
+        self.text = text
+
+
+class StandInServer:
+    """Serve a StandInApi over http on localhost in a background thread.
+
+    Attributes:
+        api -- the StandInApi answering requests
+        url -- base url for DnsApiClient, e.g. http://127.0.0.1:38211
+    """
+
+    def __init__(self, api, host="127.0.0.1", port=0):
+        self.api = api
+        self.__server = ThreadingHTTPServer((host, port), getRequestHandler(api))
+        self.__server.daemon_threads = True
+        self.__thread = None
+        self.url = "http://{}:{}".format(*self.__server.server_address[:2])
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def getRequestHandler(api):
+    class StandInRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not self.path.startswith(API_PATH):
+                return self.__send(404, encode({"message": "Unknown path."}))
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except ValueError:
+                return self.__send(400, encode({"message": "Invalid json."}))
+            self.__send(*api.handle(self.path[len(API_PATH) :], data))
+
+        def __send(self, status, content):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInRequestHandler
+
+
+def filterMatches(requestFilter, zone, record):
+    if "subFilter" in requestFilter:
+        results = (
+            filterMatches(subFilter, zone, record)
+            for subFilter in requestFilter["subFilter"]
+        )
+        if requestFilter.get("subFilterConnective") == "OR":
+            return any(results)
+        return all(results)
+    field = requestFilter["field"]
+    if field == "ZoneConfigId":
+        value = zone.zoneConfig["id"]
+    elif field == "ZoneName":
+        value = zone.name
+    elif field == "ZoneNameUnicode":
+        value = zone.nameUnicode
+    elif record is None:
+        return False
+    elif field == "RecordName":
+        value = record["name"].lower()
+    elif field == "RecordType":
+        value = record["type"]
+    elif field == "RecordContent":
+        value = record["content"]
+    else:
+        raise StandInError(10500, "Unknown filter field {}.".format(field))
+    return valueMatches(str(value), str(requestFilter["value"]), requestFilter)
+
+
+def valueMatches(value, expected, requestFilter):
+    if requestFilter["field"] in ("ZoneName", "ZoneNameUnicode", "RecordName"):
+        expected = expected.rstrip(".").lower()
+    relation = requestFilter.get("relation", "equal")
+    if "*" in expected:
+        matches = fnmatch.fnmatchcase(value, expected)
+    else:
+        matches = value == expected
+    if relation == "unequal":
+        return not matches
+    return matches
+
+
+def hasFields(requestFilter, fields):
+    if "subFilter" in requestFilter:
+        return any(hasFields(f, fields) for f in requestFilter["subFilter"])
+    return requestFilter["field"] in fields
+
+
+def getFilterNames(requestFilter):
+    """Return the record names a record has to have to match, None if not limited."""
+    if "subFilter" in requestFilter:
+        subNames = [getFilterNames(f) for f in requestFilter["subFilter"]]
+        if requestFilter.get("subFilterConnective") == "OR":
+            if None in subNames:
+                return None
+            return set().union(*subNames)
+        limited = [names for names in subNames if names is not None]
+        if len(limited) == 0:
+            return None
+        return set.intersection(*limited)
+    value = str(requestFilter["value"])
+    if (
+        requestFilter["field"] != "RecordName"
+        or "*" in value
+        or requestFilter.get("relation", "equal") != "equal"
+    ):
+        return None
+    return {value.rstrip(".").lower()}
+
+
+def getPage(items, body, toDict):
+    limit = body.get("limit") or 25
+    page = body.get("page") or 1
+    totalPages = max(1, (len(items) + limit - 1) // limit)
+    return {
+        "data": [toDict(item) for item in items[(page - 1) * limit : page * limit]],
+        "limit": limit,
+        "page": page,
+        "totalEntries": len(items),
+        "totalPages": totalPages,
+        "type": "FindResult",
+    }
+
+
+def getSuccessResponse(response):
+    return {
+        "errors": [],
+        "metadata": {"clientTransactionId": "", "serverTransactionId": "standin"},
+        "status": "success",
+        "warnings": [],
+        "response": response,
+    }
+
+
+def getErrorResponse(code, text):
+    return {
+        "errors": [{"code": code, "contextObject": "", "text": text, "value": ""}],
+        "metadata": {"clientTransactionId": "", "serverTransactionId": "standin"},
+        "status": "error",
+        "warnings": [],
+    }
+
+
+def getSyntheticRecords(zoneName, recordCount):
+    records = [
+        {"name": zoneName, "type": "NS", "content": "ns1.hosting.de"},
+        {
+            "name": zoneName,
+            "type": "SOA",
+            "content": "ns1.hosting.de. hostmaster.hosting.de. 2020060101 86400 7200 3600000 900",
+        },
+    ]
+    for r in range(recordCount):
+        recordType = ("A", "AAAA", "TXT", "CNAME")[r % 4]
+        content = {
+            "A": "10.{}.{}.{}".format(r // 65536 % 256, r // 256 % 256, r % 256),
+            "AAAA": "2001:db8::{:x}".format(r),
+            "TXT": '"synthetic record {}"'.format(r),
+            "CNAME": "host{}.{}".format(r - 1, zoneName),
+        }[recordType]
+        records.append(
+            {
+                "name": "host{}.{}".format(r, zoneName),
+                "type": recordType,
+                "content": content,
+            }
+        )
+    return records
+
+
+def encode(response):
+    return json.dumps(response).encode("utf-8")
+
+
+def getTimestamp():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
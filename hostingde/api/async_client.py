@@ -0,0 +1,170 @@
+import asyncio
+from time import monotonic
+from hostingde.api.codec import JsonCodec
+from hostingde.api.errors import ApiHttpStatusError, ApiResponseError
+from hostingde.api.metrics import finishApiRequestEvent, startApiRequestEvent
+from hostingde.api.retry import RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+
+class AsyncApiSession:
+    """Asyncio connection pool for requests against the hosting.de api.
+
+    The number of requests in flight at the same time is limited by maxInFlight,
+    further requests wait without blocking the event loop until a slot is free.
+    Requires the optional aiohttp dependency ( pip install no-hostingde-api[async] ).
+
+    Attributes:
+        maxInFlight -- maximum number of concurrent requests
+        poolSize -- maximum number of pooled connections
+        timeout -- total timeout of a single request in seconds
+    """
+
+    def __init__(self, maxInFlight=10, poolSize=10, timeout=120):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncApiSession requires aiohttp: pip install no-hostingde-api[async]"
+            )
+        self.maxInFlight = maxInFlight
+        self.poolSize = poolSize
+        self.timeout = timeout
+        self.__semaphore = None
+        self.__session = None
+
+    def __getSession(self):
+        # aiohttp sessions and semaphores must be created inside the running loop
+        if self.__session is None or self.__session.closed:
+            self.__semaphore = asyncio.Semaphore(self.maxInFlight)
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.poolSize),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.__session
+
+    async def post(self, url, data, headers, timeout=None):
+        """Send a post request, timeout in seconds overrides the timeout of the session."""
+        session = self.__getSession()
+        options = {}
+        if timeout is not None:
+            options["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        async with self.__semaphore:
+            async with session.post(
+                url, data=data, headers=headers, **options
+            ) as response:
+                return response.status, await response.read()
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+async def getApiResponse(
+    session,
+    baseUrl,
+    path,
+    data,
+    max_retries=3,
+    retry_delay=2,
+    retryPolicy=None,
+    codec=None,
+    hooks=(),
+    write=False,
+):
+    """Asyncio variant of hostingde.api.client.getApiResponse."""
+    if retryPolicy is None:
+        retryPolicy = RetryPolicy.fixed(max_retries, retry_delay)
+
+    started = monotonic()
+    retry = 0
+    while True:
+        event = startApiRequestEvent(hooks, path, retry)
+        timeout = retryPolicy.getRequestTimeout(
+            getattr(session, "timeout", None), started
+        )
+        try:
+            json_data = await getApiResponseFullJson(
+                session, baseUrl, path, data, codec, event, timeout
+            )
+            if json_data["status"] != "error":
+                finishApiRequestEvent(hooks, event)
+                return json_data["response"]
+            error = ApiResponseError(
+                path, "Api response returned errors.", json_data["errors"]
+            )
+            retryable = retryPolicy.isRetryableErrors(json_data["errors"])
+        except ApiHttpStatusError as e:
+            error = e
+            retryable = retryPolicy.isRetryableStatus(e.status_code, write)
+        except asyncio.TimeoutError as e:
+            error = e
+            retryable = retryPolicy.isRetryableTimeout(write)
+        except aiohttp.ClientConnectionError as e:
+            # ClientConnectorError if no connection could be established
+            error = e
+            retryable = retryPolicy.isRetryableConnectionError(
+                not isinstance(e, aiohttp.ClientConnectorError), write
+            )
+        except Exception as e:
+            # e.g. undecodable responses, never retried
+            finishApiRequestEvent(hooks, event, e)
+            raise
+
+        delay = retryPolicy.getRetryDelay(retry, started) if retryable else None
+        finishApiRequestEvent(hooks, event, error, delay is not None)
+        if delay is None:
+            raise error
+        await asyncio.sleep(delay)
+        retry += 1
+
+
+async def getApiResponseFullJson(
+    session, baseUrl, path, data, codec=None, event=None, timeout=None
+):
+    if codec is None:
+        codec = JsonCodec()
+    status_code, content = await getApiHttpResponseOrException(
+        session, baseUrl, path, data, codec, event, timeout
+    )
+    if event is not None:
+        event.responseBytes = len(content)
+    return codec.loads(content)
+
+
+async def getApiHttpResponseOrException(
+    session, baseUrl, path, data, codec=None, event=None, timeout=None
+):
+    status_code, content = await getApiHttpResponse(
+        session, baseUrl, path, data, codec, event, timeout
+    )
+    if event is not None:
+        event.statusCode = status_code
+    if status_code != 200:
+        raise ApiHttpStatusError(
+            path, "Response did not have a status code of 200.", status_code
+        )
+    return status_code, content
+
+
+async def getApiHttpResponse(
+    session, baseUrl, path, data, codec=None, event=None, timeout=None
+):
+    if codec is None:
+        codec = JsonCodec()
+    url = baseUrl + path
+    headers = {"Content-Type": "application/json"}
+    json_data = codec.dumps(data)
+    if event is not None:
+        event.requestBytes = len(json_data)
+    if timeout is None:
+        return await session.post(url, json_data, headers=headers)
+    return await session.post(url, json_data, headers=headers, timeout=timeout)
@@ -0,0 +1,646 @@
+import asyncio
+from hostingde.api.errors import ObjectNotFoundError
+from hostingde.api.async_client import AsyncApiSession, getApiResponse
+from hostingde.api.pagination import hasPendingEntries
+from hostingde.api.codec import getDefaultCodec
+from hostingde.api.retry import RetryPolicy
+from hostingde.helpers.models import Record, Zone, ZoneConfig
+from hostingde.helpers import bodies
+from hostingde.helpers import dns
+from hostingde.helpers import filters
+
+
+class AsyncDnsApiClient:
+    """Asyncio twin of DnsApiClient for the Hosting.de DNS API.
+
+    All api functions are coroutines with the same names and arguments as the ones of
+    DnsApiClient, record and zone matching is done by the same helpers in
+    hostingde.helpers.dns and hostingde.helpers.filters.
+
+    Like DnsApiClient, the zone of a record is resolved with targeted recordsFind and
+    zoneConfigsFind requests instead of fetching whole zones, unless targetedLookups
+    is disabled.
+
+    Up to maxInFlight requests are sent concurrently, retries for busy api objects
+    wait with asyncio.sleep and do not block the event loop:
+
+        async with AsyncDnsApiClient("MySecretLongApiKey", maxInFlight=20) as client:
+            await asyncio.gather(
+                client.setRecord("a.example.org", "A", "127.0.0.1"),
+                client.setRecord("b.example.org", "A", "127.0.0.2"),
+            )
+
+    Requires the optional aiohttp dependency ( pip install no-hostingde-api[async] ).
+    """
+
+    def __init__(
+        self,
+        authToken,
+        baseUrl="https://secure.hosting.de",
+        retryDelay=2,
+        retries=2,
+        maxInFlight=10,
+        poolSize=10,
+        timeout=120,
+        session=None,
+        retryPolicy=None,
+        codec=None,
+        apiObjects=False,
+        hooks=None,
+        targetedLookups=True,
+    ):
+        self.__authToken = authToken
+        self.__baseUrl = baseUrl
+        if retryPolicy is None:
+            retryPolicy = RetryPolicy(maxRetries=retries, baseDelay=retryDelay)
+        self.__retryPolicy = retryPolicy
+        self.__codec = codec if codec is not None else getDefaultCodec()
+        self.__apiObjects = apiObjects
+        self.__hooks = list(hooks) if hooks is not None else []
+        self.__targetedLookups = targetedLookups
+        self.__ownsSession = session is None
+        if session is None:
+            session = AsyncApiSession(maxInFlight, poolSize, timeout)
+        self.__session = session
+
+    # connection lifecycle
+
+    async def close(self):
+        """Close all pooled connections, if the session is owned by this client."""
+        if self.__ownsSession:
+            await self.__session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # property setters
+
+    def setAuthToken(self, authToken):
+        self.__authToken = authToken
+
+    def setBaseUrl(self, baseUrl):
+        self.__baseUrl = baseUrl
+
+    def setRetryPolicy(self, retryPolicy):
+        self.__retryPolicy = retryPolicy
+
+    def getRetryPolicy(self):
+        return self.__retryPolicy
+
+    def addHook(self, hook):
+        """Add a request hook, e.g. a MetricsCollector from hostingde.api.metrics"""
+        self.__hooks.append(hook)
+
+    def removeHook(self, hook):
+        self.__hooks.remove(hook)
+
+    def setApiObjects(self, apiObjects):
+        self.__apiObjects = apiObjects
+
+    def setTargetedLookups(self, targetedLookups):
+        self.__targetedLookups = targetedLookups
+
+    def setCodec(self, codec):
+        self.__codec = codec
+
+    def getCodec(self):
+        return self.__codec
+
+    def setApiRetryDelay(self, delay):
+        """Deprecated - use setRetryPolicy or getRetryPolicy().baseDelay"""
+        self.__retryPolicy.baseDelay = delay
+
+    def setMaxApiRetries(self, retries):
+        """Deprecated - use setRetryPolicy or getRetryPolicy().maxRetries"""
+        self.__retryPolicy.maxRetries = retries
+
+    async def __getApiResponse(self, path, data, write=False):
+        return await getApiResponse(
+            self.__session,
+            self.__baseUrl,
+            path,
+            data,
+            retryPolicy=self.__retryPolicy,
+            codec=self.__codec,
+            hooks=self.__hooks,
+            write=write,
+        )
+
+    async def __getFindResponse(self, path, data, objectType):
+        response = await self.__getApiResponse(path, data)
+        if self.__apiObjects:
+            response["data"] = [objectType.fromDict(item) for item in response["data"]]
+        return response
+
+    # hosting.de api request helper functions
+
+    def getCommonFilterBody(self, requestFilter, limit, page, sort):
+        return bodies.getCommonFilterBody(
+            self.__authToken, requestFilter, limit, page, sort
+        )
+
+    def getZoneCreateBody(
+        self, zoneConfig, records, useDefaultNameserverSet=False, nameserverSetId=None
+    ):
+        return bodies.getZoneCreateBody(
+            self.__authToken,
+            zoneConfig,
+            records,
+            useDefaultNameserverSet,
+            nameserverSetId,
+        )
+
+    def getZoneConfigBody(self, zoneConfigId=None, zoneConfigName=None):
+        return bodies.getZoneConfigBody(zoneConfigId, zoneConfigName)
+
+    def getZoneUpdateBody(self, zoneConfig, recordsToAdd, recordsToDelete=[]):
+        return bodies.getZoneUpdateBody(
+            self.__authToken, zoneConfig, recordsToAdd, recordsToDelete
+        )
+
+    # hosting.de api list functions
+
+    async def recordsFind(self, recordFilter, limit=25, page=1, sort=None):
+        """Hosting.de api function for listing records - https://www.hosting.de/api/#listing-records"""
+        data = self.getCommonFilterBody(recordFilter, limit, page, sort)
+        return await self.__getFindResponse(
+            "/api/dns/v1/json/recordsFind", data, Record
+        )
+
+    async def zoneConfigsFind(self, zoneConfigFilter, limit=25, page=1, sort=None):
+        """Hosting.de api function for listing zone configs - https://www.hosting.de/api/#list-zoneconfigs"""
+        data = self.getCommonFilterBody(zoneConfigFilter, limit, page, sort)
+        return await self.__getFindResponse(
+            "/api/dns/v1/json/zoneConfigsFind", data, ZoneConfig
+        )
+
+    async def zonesFind(self, zoneFilter, limit=25, page=1, sort=None):
+        """Hosting.de api function for listing zones - https://www.hosting.de/api/#listing-zones"""
+        data = self.getCommonFilterBody(zoneFilter, limit, page, sort)
+        return await self.__getFindResponse("/api/dns/v1/json/zonesFind", data, Zone)
+
+    # hosting.de api list functions iterating over all pages
+
+    def iterRecords(self, recordFilter, limit=100, sort=None, prefetch=False):
+        """Asynchronously yield all records matching the filter, page by page."""
+        return aiterFindResults(self.recordsFind, recordFilter, limit, sort, prefetch)
+
+    def iterZoneConfigs(self, zoneConfigFilter, limit=100, sort=None, prefetch=False):
+        """Asynchronously yield all zone configs matching the filter, page by page."""
+        return aiterFindResults(
+            self.zoneConfigsFind, zoneConfigFilter, limit, sort, prefetch
+        )
+
+    def iterZones(self, zoneFilter, limit=25, sort=None, prefetch=False):
+        """Asynchronously yield all zones matching the filter, page by page."""
+        return aiterFindResults(self.zonesFind, zoneFilter, limit, sort, prefetch)
+
+    # hosting.de api zone editing functions
+
+    async def zoneCreate(
+        self,
+        zoneConfig,
+        records,
+        useDefaultNameserverSet=False,
+        nameserverSetId=None,
+        retryUncertain=False,
+    ):
+        """Hosting.de api function for creating a zone - https://www.hosting.de/api/#creating-new-zones
+
+        Like all zone writes, the request is not retried after timeouts, server errors and
+        lost connections, it may have been processed. retryUncertain retries these errors as configured
+        in the RetryPolicy anyway.
+        """
+        data = self.getZoneCreateBody(
+            zoneConfig, records, useDefaultNameserverSet, nameserverSetId
+        )
+        return await self.__getApiResponse(
+            "/api/dns/v1/json/zoneCreate", data, not retryUncertain
+        )
+
+    async def zoneDelete(
+        self, zoneConfigId=None, zoneConfigName=None, retryUncertain=False
+    ):
+        """Hosting.de api function for deleting a zone - https://www.hosting.de/api/#deleting-zones"""
+        data = self.getZoneConfigBody(zoneConfigId, zoneConfigName)
+        return await self.__getApiResponse(
+            "/api/dns/v1/json/zoneRecreate", data, not retryUncertain
+        )
+
+    async def zoneRecreate(
+        self,
+        zoneConfig,
+        records,
+        useDefaultNameserverSet=False,
+        nameserverSetId=None,
+        retryUncertain=False,
+    ):
+        """Hosting.de api function for recreating a zone - https://www.hosting.de/api/#recreating-existing-zones"""
+        data = self.getZoneCreateBody(
+            zoneConfig, records, useDefaultNameserverSet, nameserverSetId
+        )
+        return await self.__getApiResponse(
+            "/api/dns/v1/json/zoneRecreate", data, not retryUncertain
+        )
+
+    async def zoneUpdate(
+        self, zoneConfig, recordsToAdd, recordsToDelete=[], retryUncertain=False
+    ):
+        """Hosting.de api function for updating a zone - https://www.hosting.de/api/#updating-zones"""
+        data = self.getZoneUpdateBody(zoneConfig, recordsToAdd, recordsToDelete)
+        return await self.__getApiResponse(
+            "/api/dns/v1/json/zoneUpdate", data, not retryUncertain
+        )
+
+    # custom api functions for information gathering
+
+    async def getZonesByFilter(self, zoneFilter, limit=25, page=1, sort=None):
+        """Get zones by filter - see DnsApiClient.getZonesByFilter"""
+        zoneResponse = await self.zonesFind(zoneFilter, limit, page, sort)
+
+        # stop if we cannot find a zone to update
+        if zoneResponse["totalEntries"] == 0:
+            raise ObjectNotFoundError("Could not find any zone matching the filter.")
+
+        return zoneResponse["data"]
+
+    async def getZonesByRecord(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        limit=25,
+        page=1,
+        sort=None,
+    ):
+        """Get zones containing a given record - see DnsApiClient.getZonesByRecord"""
+        zoneFilter = filters.getRecordFilter(recordName, recordType, recordContent)
+        return await self.getZonesByFilter(zoneFilter, limit, page, sort)
+
+    async def getZonesByDomainHierarchy(self, recordName, limit=25, page=1, sort=None):
+        """Get zones based on domain hierarchy - see DnsApiClient.getZonesByDomainHierarchy"""
+        domains = dns.getRecordDomainList(recordName)
+        zoneFilter = filters.getZoneDomainListFilter(domains)
+        return await self.getZonesByFilter(zoneFilter, limit, page, sort)
+
+    async def getZoneByRecord(
+        self, recordName, recordType=None, recordContent=None, limit=25, page=1
+    ):
+        """Get best matching zone for existing record - see DnsApiClient.getZoneByRecord"""
+        zones = await self.getZonesByRecord(
+            recordName, recordType, recordContent, limit, page
+        )
+        return dns.getBestZoneForRecord(zones, recordName, recordType)
+
+    async def getZoneByDomain(
+        self, recordName, recordType=None, recordContent=None, limit=25, page=1
+    ):
+        """Get best matching zone for a record based on domain hierarchy - see DnsApiClient.getZoneByDomain"""
+        zones = await self.getZonesByDomainHierarchy(recordName, limit, page)
+        return dns.getBestZoneForRecord(zones, recordName, recordType, recordContent)
+
+    async def getZoneConfigByDomain(
+        self, recordName, recordType=None, recordContent=None
+    ):
+        """Get the zoneConfig of the best matching zone for a record - see DnsApiClient.getZoneConfigByDomain"""
+        if self.__targetedLookups:
+            # records only decide between nested zones owning the name
+            zoneConfigs = dns.getOwningZoneConfigs(
+                await self.getZoneConfigsByDomainHierarchy(recordName), recordName
+            )
+            if len(zoneConfigs) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            if len(zoneConfigs) == 1:
+                return zoneConfigs[0]
+        zone = await self.__getZoneForRecord(recordName, recordType, recordContent)
+        return zone["zoneConfig"]
+
+    async def getZoneConfigsByDomainHierarchy(self, recordName):
+        """Get zone configs based on domain hierarchy - see DnsApiClient.getZoneConfigsByDomainHierarchy"""
+        domains = dns.getRecordDomainList(recordName)
+        zoneConfigFilter = filters.getZoneDomainListFilter(domains)
+        return [
+            zoneConfig async for zoneConfig in self.iterZoneConfigs(zoneConfigFilter)
+        ]
+
+    async def getRecordZone(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        requireRecord=False,
+        completeZoneConfig=True,
+    ):
+        """Get the best matching zone for a record, containing only records named recordName - see DnsApiClient.getRecordZone"""
+        zones = dns.getNamedRecordZones(await self.getNamedRecords(recordName))
+        if requireRecord:
+            zones = dns.getZonesContainingRecord(
+                zones, recordName, recordType, recordContent
+            )
+            if len(zones) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            recordContent = None
+
+        if len(zones) == 0:
+            zoneConfigs = dns.getOwningZoneConfigs(
+                await self.getZoneConfigsByDomainHierarchy(recordName), recordName
+            )
+            if len(zoneConfigs) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            return {"zoneConfig": zoneConfigs[0], "records": []}
+
+        recordZone = await self.__getBestRecordZone(
+            zones, recordName, recordType, recordContent
+        )
+        if completeZoneConfig and "name" not in recordZone["zoneConfig"]:
+            recordZone["zoneConfig"] = (
+                await self.__getZoneConfigsById([recordZone["zoneConfig"]["id"]])
+            )[recordZone["zoneConfig"]["id"]]
+        return recordZone
+
+    async def __getBestRecordZone(self, zones, recordName, recordType, recordContent):
+        """Choose between zones containing records, zone configs are only fetched for ties."""
+        bestZones = dns.getBestRecordZones(zones, recordName, recordType, recordContent)
+        if len(bestZones) == 1:
+            return bestZones[0]
+
+        zoneConfigs = await self.__getZoneConfigsById(
+            [zone["zoneConfig"]["id"] for zone in bestZones]
+        )
+        for zone in bestZones:
+            zone["zoneConfig"] = zoneConfigs[zone["zoneConfig"]["id"]]
+        return dns.getBestZoneForRecord(
+            bestZones, recordName, recordType, recordContent
+        )
+
+    async def __getZoneConfigsById(self, zoneConfigIds):
+        zoneConfigFilter = filters.getZoneConfigIdListFilter(zoneConfigIds)
+        zoneConfigs = {}
+        async for zoneConfig in self.iterZoneConfigs(zoneConfigFilter):
+            zoneConfigs[zoneConfig["id"]] = zoneConfig
+        return zoneConfigs
+
+    async def getNamedRecords(self, recordName, zoneConfigId=None):
+        """Get all records named exactly recordName, optionally only of a single zone."""
+        recordFilter = filters.getNamedRecordFilter(recordName, zoneConfigId)
+        records = [record async for record in self.iterRecords(recordFilter)]
+        return dns.getRecordsNamed(records, recordName)
+
+    async def __getZoneForRecord(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        requireRecord=False,
+        completeZoneConfig=True,
+    ):
+        """Resolve the zone used by the helpers without a known zoneConfig."""
+        if self.__targetedLookups:
+            return await self.getRecordZone(
+                recordName, recordType, recordContent, requireRecord, completeZoneConfig
+            )
+        if requireRecord:
+            return await self.getZoneByRecord(recordName, recordType, recordContent)
+        return await self.getZoneByDomain(recordName, recordType, recordContent)
+
+    async def getRecordsByFilter(self, recordFilter, limit=50, page=1, sort=None):
+        recordsResponse = await self.recordsFind(recordFilter, limit, page, sort)
+
+        # stop if we cannot find a zone to update
+        if recordsResponse["totalEntries"] == 0:
+            raise ObjectNotFoundError("Could not find any records matching the filter.")
+
+        return recordsResponse["data"]
+
+    async def getRecords(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        limit=50,
+        page=1,
+        sort=None,
+    ):
+        """Get records based on given record - see DnsApiClient.getRecords"""
+        recordFilter = filters.getRecordFilter(recordName, recordType, recordContent)
+        return await self.getRecordsByFilter(recordFilter, limit, page, sort)
+
+    # custom api functions that require more information but do not require information from  api - single api call
+
+    async def addZoneRecordWithConfig(
+        self, zoneConfig, recordName, recordType, recordContent, ttl=600
+    ):
+        """Adds a new record to a known zone."""
+        recordsToAdd = [
+            dns.getRecordToAddEntry(recordName, recordType, recordContent, ttl)
+        ]
+        return await self.zoneUpdate(zoneConfig, recordsToAdd)
+
+    async def deleteZoneRecordWithConfig(
+        self, zoneConfig, recordName, recordType, recordContent
+    ):
+        """Delete a known record in a known zone."""
+        recordToDelete = [
+            dns.getRecordToDeleteEntry(recordName, recordType, recordContent)
+        ]
+        return await self.zoneUpdate(zoneConfig, [], recordToDelete)
+
+    async def updateZoneRecordWithConfig(
+        self, zoneConfig, recordName, recordType, recordContent, oldContent, ttl=600
+    ):
+        """Change a known record in a known zone."""
+        recordToDelete = [
+            dns.getRecordToDeleteEntry(recordName, recordType, oldContent)
+        ]
+        recordsToAdd = [
+            dns.getRecordToAddEntry(recordName, recordType, recordContent, ttl)
+        ]
+        return await self.zoneUpdate(zoneConfig, recordsToAdd, recordToDelete)
+
+    # custom api functions that require more information but still require some information from api - less zones to query and iterate
+
+    async def deleteZoneRecordsWithFilter(
+        self, zoneFilter, recordName, recordType, recordContent=None
+    ):
+        """Delete existing records in a known zone based on a filter."""
+        recordZones = await self.getZonesByFilter(zoneFilter)
+        recordZone = dns.getBestZoneForRecord(
+            recordZones, recordName, recordType, recordContent
+        )
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
+            recordZone, recordName, recordType, None, recordContent
+        )
+        return await self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+
+    async def setZoneRecordWithFilter(
+        self,
+        zoneFilter,
+        recordName,
+        recordType,
+        recordContent,
+        oldContent=None,
+        ttl=600,
+    ):
+        """Set records in a known zone based on a filter. Matching previous records are deleted."""
+        recordZones = await self.getZonesByFilter(zoneFilter)
+        recordZone = dns.getBestZoneForRecord(
+            recordZones, recordName, recordType, oldContent
+        )
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
+            recordZone, recordName, recordType, recordContent, oldContent, ttl
+        )
+        return await self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+
+    # custom api functions with simpler interface
+
+    async def addZoneRecord(
+        self, zoneName, recordName, recordType, recordContent, ttl=600
+    ):
+        """Add a new record to a zone known by name"""
+        zoneConfig = {"name": zoneName}
+        return await self.addZoneRecordWithConfig(
+            zoneConfig, recordName, recordType, recordContent, ttl
+        )
+
+    async def deleteZoneRecord(self, zoneName, recordName, recordType, recordContent):
+        """Delete a known record from a zone known by name"""
+        zoneConfig = {"name": zoneName}
+        return await self.deleteZoneRecordWithConfig(
+            zoneConfig, recordName, recordType, recordContent
+        )
+
+    async def updateZoneRecord(
+        self, zoneName, recordName, recordType, recordContent, oldContent, ttl=600
+    ):
+        """Update a known record in a zone known by name"""
+        zoneConfig = {"name": zoneName}
+        return await self.updateZoneRecordWithConfig(
+            zoneConfig, recordName, recordType, recordContent, oldContent, ttl
+        )
+
+    async def deleteZoneRecords(
+        self, zoneName, recordName, recordType, recordContent=None
+    ):
+        """Delete a record from a zone known by name - records are received from zone information queried from api"""
+        zoneFilter = filters.getFilter("ZoneName", zoneName)
+        return await self.deleteZoneRecordsWithFilter(
+            zoneFilter, recordName, recordType, recordContent
+        )
+
+    async def setZoneRecord(
+        self, zoneName, recordName, recordType, recordContent, oldContent=None, ttl=600
+    ):
+        """Create a record from a zone known by name - old records are received from zone information queried from api and deleted"""
+        zoneFilter = filters.getFilter("ZoneName", zoneName)
+        return await self.setZoneRecordWithFilter(
+            zoneFilter, recordName, recordType, recordContent, oldContent, ttl
+        )
+
+    # declarative zone changes
+
+    async def reconcileZone(self, zone, desiredRecords, recordTypes=None, dryRun=False):
+        """Make the records of a zone match desiredRecords with at most one zoneUpdate"""
+        if isinstance(zone, str):
+            zoneFilter = filters.getFilter("ZoneName", zone)
+            zone = (await self.getZonesByFilter(zoneFilter, limit=1))[0]
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneReconcileUpdate(
+            zone, desiredRecords, recordTypes
+        )
+        if not dryRun and (recordsToAdd or recordsToDelete):
+            await self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        return (zoneConfig, recordsToAdd, recordsToDelete)
+
+    # custom api functions for easy use without knowning zoneConfig
+    # these functions query for zone information from api
+    # this can lead to performance issues with many or large zones
+
+    async def addRecord(self, recordName, recordType, recordContent, ttl=600):
+        """Add a record to an unknown, but existing zone."""
+        zoneConfig = await self.getZoneConfigByDomain(recordName, recordType)
+        recordsToAdd = [
+            dns.getRecordToAddEntry(recordName, recordType, recordContent, ttl)
+        ]
+        return await self.zoneUpdate(zoneConfig, recordsToAdd)
+
+    async def deleteRecord(self, recordName, recordType, recordContent=None):
+        """Delete existing records in an unknown zone."""
+        return await self.__updateRecordZone(
+            recordName, recordType, None, recordContent, None, requireRecord=True
+        )
+
+    async def setRecord(
+        self, recordName, recordType, recordContent, oldContent=None, ttl=600
+    ):
+        """Set or create a record in an unknown zone. Matching previous records are deleted."""
+        return await self.__updateRecordZone(
+            recordName, recordType, recordContent, oldContent, ttl
+        )
+
+    async def updateRecord(
+        self, recordName, recordType, recordContent, oldContent=None, ttl=600
+    ):
+        """Update an existing record in an unknown zone. Matching previous records are deleted."""
+        return await self.__updateRecordZone(
+            recordName, recordType, recordContent, oldContent, ttl, requireRecord=True
+        )
+
+    async def __updateRecordZone(
+        self,
+        recordName,
+        recordType,
+        recordContent,
+        oldContent,
+        ttl,
+        requireRecord=False,
+    ):
+        """Replace records matching oldContent by recordContent in the zone of recordName."""
+        # the zoneUpdate only needs the id of the zone
+        recordZone = await self.__getZoneForRecord(
+            recordName, recordType, oldContent, requireRecord, completeZoneConfig=False
+        )
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
+            recordZone, recordName, recordType, recordContent, oldContent, ttl
+        )
+        return await self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+
+
+async def aiterFindResults(
+    findFunction, findFilter, limit=100, sort=None, prefetch=False
+):
+    """Asyncio variant of hostingde.api.pagination.iterFindResults.
+
+    With prefetch enabled, the next page is requested as task while the objects of
+    the current page are consumed.
+    """
+    page = 1
+    returned = 0
+    pending = asyncio.ensure_future(findFunction(findFilter, limit, page, sort))
+    try:
+        while pending is not None:
+            response = await pending
+            returned += len(response["data"])
+            pending = None
+            if hasPendingEntries(response, returned):
+                page += 1
+                nextPage = findFunction(findFilter, limit, page, sort)
+                if prefetch:
+                    pending = asyncio.ensure_future(nextPage)
+                else:
+                    pending = nextPage
+            for item in response["data"]:
+                yield item
+    finally:
+        if pending is not None:
+            if asyncio.isfuture(pending):
+                pending.cancel()
+            else:
+                pending.close()
@@ -0,0 +1,505 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from hostingde.api.errors import (
+    ObjectNotFoundError,
+    ApiHttpStatusError,
+    ApiResponseError,
+)
+from hostingde.api.metrics import submitWithOperation
+from hostingde.helpers import dns
+from hostingde.helpers import filters
+from hostingde.helpers.index import ZoneIndex, getNormalizedName
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+# errors stored in the results of the affected operations instead of ending a batch,
+# transport errors include writes that timed out and were not retried
+OPERATION_ERRORS = (
+    ObjectNotFoundError,
+    ApiHttpStatusError,
+    ApiResponseError,
+    requests.RequestException,
+    asyncio.TimeoutError,
+)
+if aiohttp is not None:
+    OPERATION_ERRORS += (aiohttp.ClientError,)
+
+
+class RecordOperation:
+    """A single record change of a batch.
+
+    Attributes:
+        action -- one of "add", "delete" or "set"
+        recordName -- name of the record
+        recordType -- type of the record
+        recordContent -- content to add, set or delete ( None deletes all records of name and type )
+        oldContent -- previous content replaced by set ( None replaces all records of name and type )
+        ttl -- ttl of added records
+        zoneName -- name of the zone, if known - otherwise the zone is found by domain hierarchy
+        zoneConfig -- zoneConfig of the zone, if known - the zone is not fetched at all,
+                      so deletions need the exact content of the records
+    """
+
+    def __init__(
+        self,
+        action,
+        recordName,
+        recordType,
+        recordContent=None,
+        oldContent=None,
+        ttl=600,
+        zoneName=None,
+        zoneConfig=None,
+    ):
+        if action not in ("add", "delete", "set"):
+            raise ValueError("Unknown record operation: {}".format(action))
+        for field, value in (("recordName", recordName), ("recordType", recordType)):
+            if not isinstance(value, str) or not value:
+                raise ValueError("{} must be a non-empty string.".format(field))
+        for field, value in (
+            ("recordContent", recordContent),
+            ("oldContent", oldContent),
+            ("zoneName", zoneName),
+        ):
+            if value is not None and not isinstance(value, str):
+                raise ValueError("{} must be a string.".format(field))
+        if action != "delete" and not recordContent:
+            raise ValueError("{} requires recordContent.".format(action))
+        if ttl is not None and not isinstance(ttl, int):
+            raise ValueError("ttl must be an integer.")
+        deletedContent = recordContent if action == "delete" else oldContent
+        if zoneConfig is not None and action != "add" and deletedContent is None:
+            raise ValueError(
+                "Deleting records without content requires the zone to be fetched."
+            )
+        self.action = action
+        self.recordName = recordName
+        self.recordType = recordType
+        self.recordContent = recordContent
+        self.oldContent = oldContent
+        self.ttl = ttl
+        self.zoneName = zoneName
+        self.zoneConfig = zoneConfig
+
+    def __repr__(self):
+        return "RecordOperation({}, {}, {}, {})".format(
+            self.action, self.recordName, self.recordType, self.recordContent
+        )
+
+
+class RecordOperationResult:
+    """Result of a single record operation of a batch.
+
+    Attributes:
+        operation -- the RecordOperation
+        zoneConfig -- zoneConfig of the zone the operation was applied to
+        changed -- False if the zone already was in the requested state
+        response -- zoneUpdate response of the zone, None if nothing had to be sent
+        error -- exception raised for the operation or its zone update, None on success
+    """
+
+    def __init__(
+        self, operation, zoneConfig=None, changed=False, response=None, error=None
+    ):
+        self.operation = operation
+        self.zoneConfig = zoneConfig
+        self.changed = changed
+        self.response = response
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+class ZoneChanges:
+    """Record additions and deletions for a single zone, merged from many operations.
+
+    Conflicting operations are resolved in order, later operations win:
+    records added and deleted again are not sent at all, records deleted and added
+    again unchanged are kept and identical additions are sent once.
+
+    If the records of the zone are not known, deletions are sent as given.
+    """
+
+    def __init__(self, zone, recordsKnown=True):
+        self.zone = zone
+        self.zoneConfig = zone["zoneConfig"]
+        self.recordsKnown = recordsKnown
+        self.operationIndexes = []
+        self.__recordsToAdd = OrderedDict()
+        self.__recordsToDelete = OrderedDict()
+
+    def apply(self, operation):
+        if operation.action == "add":
+            self.add(
+                operation.recordName,
+                operation.recordType,
+                operation.recordContent,
+                operation.ttl,
+            )
+        elif operation.action == "delete":
+            self.delete(
+                operation.recordName, operation.recordType, operation.recordContent
+            )
+        else:
+            self.delete(
+                operation.recordName, operation.recordType, operation.oldContent
+            )
+            if operation.recordContent:
+                self.add(
+                    operation.recordName,
+                    operation.recordType,
+                    operation.recordContent,
+                    operation.ttl,
+                )
+
+    def add(self, recordName, recordType, recordContent, ttl=600):
+        key = getRecordKey(recordName, recordType, recordContent)
+        if key in self.__recordsToDelete and self.recordsKnown:
+            # keep an existing record instead of deleting and adding it again
+            existing = dns.getMatchingRecordsFromZone(
+                self.zone, recordName, recordType, recordContent
+            )
+            if all(record.get("ttl") == ttl for record in existing):
+                del self.__recordsToDelete[key]
+                self.__recordsToAdd.pop(key, None)
+                return
+        self.__recordsToAdd[key] = dns.getRecordToAddEntry(
+            recordName, recordType, recordContent, ttl
+        )
+
+    def delete(self, recordName, recordType, recordContent=None):
+        for key in list(self.__recordsToAdd):
+            if recordKeyMatches(key, recordName, recordType, recordContent):
+                del self.__recordsToAdd[key]
+        if not self.recordsKnown:
+            key = getRecordKey(recordName, recordType, recordContent)
+            self.__recordsToDelete[key] = dns.getRecordToDeleteEntry(
+                recordName, recordType, recordContent
+            )
+            return
+        records = dns.getMatchingRecordsFromZone(
+            self.zone, recordName, recordType, recordContent
+        )
+        for record in records:
+            key = getRecordKey(record["name"], record["type"], record["content"])
+            self.__recordsToDelete[key] = dns.getRecordToDeleteEntryFromRecord(record)
+
+    def getRecordsToAdd(self):
+        return list(self.__recordsToAdd.values())
+
+    def getRecordsToDelete(self):
+        return list(self.__recordsToDelete.values())
+
+    def hasChanges(self):
+        return len(self.__recordsToAdd) > 0 or len(self.__recordsToDelete) > 0
+
+
+class ZoneChangeBatch:
+    """Collects record operations and commits them with one zoneUpdate per zone.
+
+    The zone configs needed by the operations are fetched together with as few
+    zoneConfigsFind calls as possible, the records of a zone are only fetched if
+    deletions or sets without a zoneConfig need them. Operations are grouped by zone
+    and merged before sending:
+
+        with ZoneChangeBatch(client) as batch:
+            batch.set("a.dev.example.org", "A", "127.0.0.1")
+            batch.delete("b.dev.example.org", "A")
+            batch.add("c.example.org", "TXT", '"hello"', zoneName="example.org")
+        results = batch.results
+
+    Zones are resolved the same way as by addRecord, setRecord and deleteRecord of
+    DnsApiClient. commit() returns one RecordOperationResult per operation in order,
+    with workers > 1 the updates of different zones are sent concurrently.
+    """
+
+    def __init__(self, client, zoneFilterSize=50, workers=1):
+        self.__client = client
+        self.__zoneFilterSize = zoneFilterSize
+        self.__workers = workers
+        self.__operations = []
+        self.results = None
+
+    def __len__(self):
+        return len(self.__operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exception, traceback):
+        if exceptionType is None:
+            self.commit()
+
+    def append(self, operation):
+        self.__operations.append(operation)
+        return operation
+
+    def add(
+        self,
+        recordName,
+        recordType,
+        recordContent,
+        ttl=600,
+        zoneName=None,
+        zoneConfig=None,
+    ):
+        return self.append(
+            RecordOperation(
+                "add",
+                recordName,
+                recordType,
+                recordContent,
+                None,
+                ttl,
+                zoneName,
+                zoneConfig,
+            )
+        )
+
+    def delete(
+        self, recordName, recordType, recordContent=None, zoneName=None, zoneConfig=None
+    ):
+        return self.append(
+            RecordOperation(
+                "delete",
+                recordName,
+                recordType,
+                recordContent,
+                None,
+                None,
+                zoneName,
+                zoneConfig,
+            )
+        )
+
+    def set(
+        self,
+        recordName,
+        recordType,
+        recordContent,
+        oldContent=None,
+        ttl=600,
+        zoneName=None,
+        zoneConfig=None,
+    ):
+        return self.append(
+            RecordOperation(
+                "set",
+                recordName,
+                recordType,
+                recordContent,
+                oldContent,
+                ttl,
+                zoneName,
+                zoneConfig,
+            )
+        )
+
+    def commit(self):
+        """Send all collected operations, returns a list of RecordOperationResult."""
+        operations = self.__operations
+        self.__operations = []
+        results = [None] * len(operations)
+
+        zoneChanges = self.getZoneChanges(operations, results)
+        if self.__workers > 1 and len(zoneChanges) > 1:
+            with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+                futures = [
+                    submitWithOperation(
+                        executor, self.commitZoneChanges, changes, operations, results
+                    )
+                    for changes in zoneChanges
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for changes in zoneChanges:
+                self.commitZoneChanges(changes, operations, results)
+
+        self.results = results
+        return results
+
+    def getZoneChanges(self, operations, results):
+        """Group operations by zone, failed resolutions are stored in results."""
+        zones = self.fetchZones(operations)
+        zoneIndex = ZoneIndex.fromZones(zones.values())
+        zoneChanges = OrderedDict()
+        # zones of records added by earlier operations, so they may be deleted again
+        pendingZones = {}
+
+        for i, operation in enumerate(operations):
+            if operation.zoneConfig is not None:
+                zone = getKnownZone(operation.zoneConfig, zones)
+            else:
+                try:
+                    zone = getOperationZone(
+                        operation, zones, zoneIndex, pendingZones, self.__loadZone
+                    )
+                    if operation.action != "add":
+                        # deleted records are looked up in the zone
+                        zone = getLoadedZone(zone, zones, self.__loadZone)
+                except OPERATION_ERRORS as e:
+                    results[i] = RecordOperationResult(operation, error=e)
+                    continue
+            zoneId = getZoneConfigKey(zone["zoneConfig"])
+            if operation.action != "delete":
+                pendingZones[getNormalizedName(operation.recordName)] = zone
+            if zoneId not in zoneChanges:
+                zoneChanges[zoneId] = ZoneChanges(zone, zone["records"] is not None)
+            elif zone["records"] is not None and not zoneChanges[zoneId].recordsKnown:
+                zoneChanges[zoneId].zone = zone
+                zoneChanges[zoneId].recordsKnown = True
+            zoneChanges[zoneId].apply(operation)
+            zoneChanges[zoneId].operationIndexes.append(i)
+
+        return list(zoneChanges.values())
+
+    def commitZoneChanges(self, changes, operations, results):
+        """Send a single zoneUpdate for the changes of a zone and store the results."""
+        response = None
+        error = None
+        if changes.hasChanges():
+            try:
+                response = self.__client.zoneUpdate(
+                    changes.zoneConfig,
+                    changes.getRecordsToAdd(),
+                    changes.getRecordsToDelete(),
+                )
+            except OPERATION_ERRORS as e:
+                error = e
+        for i in changes.operationIndexes:
+            results[i] = RecordOperationResult(
+                operations[i], changes.zoneConfig, changes.hasChanges(), response, error
+            )
+
+    def fetchZones(self, operations):
+        """Fetch the zone configs of all zones that may own the records of the operations."""
+        return fetchOperationZones(self.__client, operations, self.__zoneFilterSize)
+
+    def __loadZone(self, zoneConfig):
+        return fetchZone(self.__client, zoneConfig)
+
+
+def fetchOperationZones(client, operations, zoneFilterSize=50):
+    """Fetch all zones that may own the records of the operations, by zoneConfig id.
+
+    Only zone configs are fetched, the records of the returned zones are None until
+    getOperationZone or getLoadedZone load the zones they need records of.
+    """
+    zoneFilters = []
+    for name in getOperationZoneNames(operations):
+        zoneFilters.append(filters.getFilter("ZoneNameUnicode", name))
+    for operation in operations:
+        if operation.zoneName and operation.zoneConfig is None:
+            zoneFilters.append(filters.getFilter("ZoneName", operation.zoneName))
+
+    zones = OrderedDict()
+    for i in range(0, len(zoneFilters), zoneFilterSize):
+        zoneFilter = filters.getOrFilter(zoneFilters[i : i + zoneFilterSize])
+        for zoneConfig in client.iterZoneConfigs(zoneFilter):
+            zones[getZoneConfigKey(zoneConfig)] = {
+                "zoneConfig": zoneConfig,
+                "records": None,
+            }
+    return zones
+
+
+def getOperationZoneNames(operations):
+    names = OrderedDict()
+    for operation in operations:
+        if operation.zoneName or operation.zoneConfig is not None:
+            continue
+        for name in dns.getRecordDomainList(getNormalizedName(operation.recordName)):
+            names[name] = True
+    return list(names)
+
+
+def getOperationZone(operation, zones, zoneIndex, pendingZones=None, loadZone=None):
+    """Resolve the zone of an operation like the matching DnsApiClient helper would.
+
+    Zones without records ( see fetchOperationZones ) are replaced in zones by
+    loadZone(zoneConfig) if their records decide, i.e. for deletions and for names
+    owned by nested zones.
+    """
+    if pendingZones is None:
+        pendingZones = {}
+    if operation.zoneName:
+        zoneConfig = zoneIndex.getZoneConfigs(operation.zoneName)
+        if zoneConfig and getNormalizedName(zoneConfig[0]["name"]) == getNormalizedName(
+            operation.zoneName
+        ):
+            return zones[getZoneConfigKey(zoneConfig[0])]
+        raise ObjectNotFoundError("Could not find zone {}.".format(operation.zoneName))
+
+    candidates = [
+        zones[getZoneConfigKey(zoneConfig)]
+        for zoneConfig in zoneIndex.getZoneConfigs(operation.recordName)
+    ]
+    if len(candidates) > 1 or operation.action == "delete":
+        candidates = [getLoadedZone(zone, zones, loadZone) for zone in candidates]
+    name, type = operation.recordName, operation.recordType
+    if operation.action == "delete":
+        # like getZoneByRecord, only zones containing the record are candidates
+        candidates = [
+            zone
+            for zone in candidates
+            if dns.zoneContainsRecord(zone, name, type, operation.recordContent)
+        ]
+        if len(candidates) == 0 and getNormalizedName(name) in pendingZones:
+            return pendingZones[getNormalizedName(name)]
+    if len(candidates) == 0:
+        raise ObjectNotFoundError(
+            "Could not find any zone for record {}.".format(operation.recordName)
+        )
+    if operation.action == "set":
+        return dns.getBestZoneForRecord(candidates, name, type, operation.oldContent)
+    return dns.getBestZoneForRecord(candidates, name, type)
+
+
+def getLoadedZone(zone, zones, loadZone):
+    if zone["records"] is not None:
+        return zone
+    zone = dns.getIndexedZone(loadZone(zone["zoneConfig"]))
+    zones[getZoneConfigKey(zone["zoneConfig"])] = zone
+    return zone
+
+
+def getKnownZone(zoneConfig, zones):
+    """Return the zone of a known zoneConfig, its records are None if they were not fetched."""
+    zone = zones.get(getZoneConfigKey(zoneConfig))
+    if zone is not None:
+        return zone
+    return {"zoneConfig": zoneConfig, "records": None}
+
+
+def fetchZone(client, zoneConfig):
+    if zoneConfig.get("id"):
+        zoneFilter = filters.getFilter("ZoneConfigId", zoneConfig["id"])
+    else:
+        zoneFilter = filters.getFilter("ZoneName", zoneConfig["name"])
+    return dns.getIndexedZone(client.getZonesByFilter(zoneFilter)[0])
+
+
+def getZoneConfigKey(zoneConfig):
+    if zoneConfig.get("id"):
+        return zoneConfig["id"]
+    return getNormalizedName(zoneConfig["name"])
+
+
+def getRecordKey(recordName, recordType, recordContent):
+    return (recordName.lower(), recordType.lower(), recordContent.lower())
+
+
+def recordKeyMatches(key, recordName, recordType=None, recordContent=None):
+    return (
+        key[0] == recordName.lower()
+        and (recordType is None or key[1] == recordType.lower())
+        and (recordContent is None or key[2] == recordContent.lower())
+    )
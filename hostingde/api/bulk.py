@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from hostingde.api.batch import (
+    OPERATION_ERRORS,
+    RecordOperationResult,
+    ZoneChanges,
+    fetchOperationZones,
+    fetchZone,
+    getOperationZone,
+    getZoneConfigKey,
+)
+from hostingde.api.metrics import submitWithOperation
+from hostingde.helpers import dns
+from hostingde.helpers.index import ZoneIndex, getNormalizedName
+
+
+def applyRecordOperations(client, operations, workers=4, merge=True, zoneFilterSize=50):
+    """Apply record operations in parallel across zones and in order within a zone.
+
+    Zones are resolved with the same rules as ZoneChangeBatch and the DnsApiClient
+    helpers, unless zoneName or zoneConfig is given. Only zone configs are fetched
+    up front, zones are only fetched before the workers start if their records decide
+    the zone of an operation ( deletions and nested zones ). Every other zone is
+    fetched once by the worker handling it, so only zones being worked on are held
+    in memory.
+
+    With merge, all operations of a zone are sent as one zoneUpdate, otherwise every
+    operation is sent on its own in order, continuing with the zone returned by the
+    previous update. Api and transport errors are returned as results of the
+    operations they affect, the other zones are still updated.
+
+    Yields a RecordOperationResult per operation as soon as its zone is done,
+    results of a zone keep the order of its operations.
+    """
+    operations = list(operations)
+    zones = fetchOperationZones(client, operations, zoneFilterSize)
+    zoneIndex = ZoneIndex.fromZones(zones.values())
+    pendingZones = {}
+
+    zoneQueues = OrderedDict()
+    for operation in operations:
+        try:
+            zone = getBulkOperationZone(
+                client, operation, zones, zoneIndex, pendingZones
+            )
+        except OPERATION_ERRORS as e:
+            yield RecordOperationResult(operation, error=e)
+            continue
+        zoneKey = getZoneConfigKey(zone["zoneConfig"])
+        if operation.action != "delete":
+            pendingZones[getNormalizedName(operation.recordName)] = zone
+        if zoneKey not in zoneQueues:
+            zoneQueues[zoneKey] = []
+        zoneQueues[zoneKey].append(operation)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for zoneKey, zoneOperations in zoneQueues.items():
+            zone = zones.get(zoneKey) or getUnfetchedZone(zoneOperations[0])
+            futures.append(
+                submitWithOperation(
+                    executor, applyZoneOperations, client, zone, zoneOperations, merge
+                )
+            )
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+
+def getBulkOperationZone(client, operation, zones, zoneIndex, pendingZones):
+    if operation.zoneConfig is not None:
+        return getUnfetchedZone(operation)
+    return getOperationZone(
+        operation,
+        zones,
+        zoneIndex,
+        pendingZones,
+        lambda zoneConfig: fetchZone(client, zoneConfig),
+    )
+
+
+def getUnfetchedZone(operation):
+    return {"zoneConfig": operation.zoneConfig, "records": None}
+
+
+def applyZoneOperations(client, zone, operations, merge=True):
+    """Apply operations of a single zone in order, returns a list of results.
+
+    A zone without records is fetched first.
+    """
+    zoneConfig = zone["zoneConfig"]
+    try:
+        if zone["records"] is None:
+            zone = fetchZone(client, zoneConfig)
+    except OPERATION_ERRORS as e:
+        return [RecordOperationResult(op, zoneConfig, error=e) for op in operations]
+
+    if merge:
+        changes = ZoneChanges(zone)
+        for operation in operations:
+            changes.apply(operation)
+        response, error = sendZoneChanges(client, changes)
+        return [
+            RecordOperationResult(
+                operation, zone["zoneConfig"], changes.hasChanges(), response, error
+            )
+            for operation in operations
+        ]
+
+    results = []
+    for operation in operations:
+        if zone is None:
+            # the previous operation changed the zone without returning it
+            try:
+                zone = fetchZone(client, zoneConfig)
+            except OPERATION_ERRORS as e:
+                results.append(RecordOperationResult(operation, zoneConfig, error=e))
+                continue
+        changes = ZoneChanges(zone)
+        changes.apply(operation)
+        response, error = sendZoneChanges(client, changes)
+        zoneConfig = zone["zoneConfig"]
+        if response is not None and "records" in response:
+            zone = dns.getIndexedZone(response)
+        elif response is not None:
+            # fetched again before the next operation, a failed fetch is its error
+            zone = None
+        results.append(
+            RecordOperationResult(
+                operation, zoneConfig, changes.hasChanges(), response, error
+            )
+        )
+    return results
+
+
+def sendZoneChanges(client, changes):
+    """Send the changes of a zone if there are any, returns (response, error)."""
+    if not changes.hasChanges():
+        return None, None
+    try:
+        response = client.zoneUpdate(
+            changes.zoneConfig, changes.getRecordsToAdd(), changes.getRecordsToDelete()
+        )
+        return response, None
+    except OPERATION_ERRORS as e:
+        return None, e
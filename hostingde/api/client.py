@@ -1,30 +1,240 @@
-import json
+from time import monotonic, sleep
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from hostingde.api.codec import JsonCodec
 from hostingde.api.errors import ApiHttpStatusError, ApiResponseError
+from hostingde.api.metrics import finishApiRequestEvent, startApiRequestEvent
+from hostingde.api.retry import RetryPolicy
+from hostingde.api.stream import FindResponseParser
 
 
-def getApiResponse(baseUrl, path, data, max_retries=3, retry_delay=2):
-    json_data = getApiResponseFullJson(baseUrl, path, data)
-    if json_data["status"] != "error":
-        return json_data["response"]
+class ApiSession:
+    """Keep-alive connection pool for requests against the hosting.de api.
 
-    # retry after a given delay, if there is an error, that the object is blocked
-    if json_data["errors"][0]["code"] == 10205 and max_retries > 0:
-        from time import sleep
+    A single session reuses tcp and tls connections between api calls instead of
+    opening a new connection for every request. Sessions should be closed when they
+    are no longer needed, either by calling close() or by using them as context manager.
 
-        sleep(retry_delay)
-        return getApiResponse(baseUrl, path, data, max_retries - 1, retry_delay)
+    Attributes:
+        poolConnections -- number of connection pools to cache ( one per host )
+        poolMaxSize -- maximum number of connections kept alive per host
+        timeout -- requests timeout, either seconds or a (connect, read) tuple
+        rateLimiter -- optional RateLimiter every request has to pass, may be shared
+    """
+
+    def __init__(
+        self, poolConnections=1, poolMaxSize=10, timeout=(10, 120), rateLimiter=None
+    ):
+        self.timeout = timeout
+        self.rateLimiter = rateLimiter
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=poolConnections, pool_maxsize=poolMaxSize
+        )
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
+
+    def post(self, url, data, headers, stream=False, timeout=None):
+        """Send a post request, timeout overrides the timeout of the session."""
+        if timeout is None:
+            timeout = self.timeout
+        if self.rateLimiter is None:
+            return self.__session.post(
+                url, data, headers=headers, timeout=timeout, stream=stream
+            )
+        with self.rateLimiter:
+            return self.__session.post(
+                url, data, headers=headers, timeout=timeout, stream=stream
+            )
+
+    def close(self):
+        self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def getApiResponse(
+    baseUrl,
+    path,
+    data,
+    max_retries=3,
+    retry_delay=2,
+    session=None,
+    retryPolicy=None,
+    codec=None,
+    hooks=(),
+    write=False,
+):
+    """Send an api request and return the response object of the api.
+
+    Failed requests are retried as decided by retryPolicy, without a policy only
+    blocked objects are retried max_retries times after retry_delay seconds.
+    With write, timeouts, server errors and connection errors after the connection
+    was established are not retried, as the request may have been processed.
+    Request and response are encoded with codec, by default the stdlib json module.
+    Every request, including retries, is passed to the hooks ( see hostingde.api.metrics ).
+    """
+    if retryPolicy is None:
+        retryPolicy = RetryPolicy.fixed(max_retries, retry_delay)
+
+    started = monotonic()
+    retry = 0
+    while True:
+        event = startApiRequestEvent(hooks, path, retry)
+        timeout = retryPolicy.getRequestTimeout(getSessionTimeout(session), started)
+        try:
+            json_data = getApiResponseFullJson(
+                baseUrl, path, data, session, codec, event, timeout
+            )
+            if json_data["status"] != "error":
+                finishApiRequestEvent(hooks, event)
+                return json_data["response"]
+            error = ApiResponseError(
+                path, "Api response returned errors.", json_data["errors"]
+            )
+            retryable = retryPolicy.isRetryableErrors(json_data["errors"])
+        except ApiHttpStatusError as e:
+            error = e
+            retryable = retryPolicy.isRetryableStatus(e.status_code, write)
+        except requests.ConnectionError as e:
+            # includes connect timeouts and resets after the request has been sent
+            error = e
+            retryable = retryPolicy.isRetryableConnectionError(
+                not isConnectError(e), write
+            )
+        except requests.Timeout as e:
+            error = e
+            retryable = retryPolicy.isRetryableTimeout(write)
+        except Exception as e:
+            # e.g. undecodable responses, never retried
+            finishApiRequestEvent(hooks, event, e)
+            raise
+
+        delay = retryPolicy.getRetryDelay(retry, started) if retryable else None
+        finishApiRequestEvent(hooks, event, error, delay is not None)
+        if delay is None:
+            raise error
+        sleep(delay)
+        retry += 1
 
-    raise ApiResponseError(path, "Api response returned errors.", json_data["errors"])
 
+def iterApiResponseData(
+    baseUrl,
+    path,
+    data,
+    max_retries=3,
+    retry_delay=2,
+    session=None,
+    retryPolicy=None,
+    codec=None,
+    chunkSize=65536,
+    hooks=(),
+):
+    """Send a find request and yield the objects of response.data while they are received.
 
-def getApiResponseFullJson(baseUrl, path, data):
-    response = getApiHttpResponseOrException(baseUrl, path, data)
-    return json.loads(response.content)
+    Only the current object is decoded and held in memory instead of the whole body.
+    The response without its data ( totalEntries, page, ... ) is the return value
+    of the generator: response = yield from iterApiResponseData(...)
 
+    Status and errors are only known once the body was read completely, so api errors
+    are raised after all objects were yielded. Requests are only retried as long as
+    no object has been yielded.
+    """
+    if retryPolicy is None:
+        retryPolicy = RetryPolicy.fixed(max_retries, retry_delay)
 
-def getApiHttpResponseOrException(baseUrl, path, data):
-    response = getApiHttpResponse(baseUrl, path, data)
+    started = monotonic()
+    retry = 0
+    while True:
+        yielded = False
+        event = startApiRequestEvent(hooks, path, retry)
+        timeout = retryPolicy.getRequestTimeout(getSessionTimeout(session), started)
+        try:
+            response = getApiHttpResponse(
+                baseUrl, path, data, session, codec, True, event, timeout
+            )
+            try:
+                if event is not None:
+                    event.statusCode = response.status_code
+                if response.status_code != 200:
+                    raise ApiHttpStatusError(
+                        path,
+                        "Response did not have a status code of 200.",
+                        response.status_code,
+                    )
+                parser = FindResponseParser(codec)
+                for chunk in response.iter_content(chunkSize):
+                    if event is not None:
+                        event.responseBytes += len(chunk)
+                    for item in parser.feed(chunk):
+                        yielded = True
+                        yield item
+            finally:
+                response.close()
+            json_data = parser.close()
+            if json_data["status"] != "error":
+                finishApiRequestEvent(hooks, event)
+                return json_data["response"]
+            error = ApiResponseError(
+                path, "Api response returned errors.", json_data["errors"]
+            )
+            retryable = retryPolicy.isRetryableErrors(json_data["errors"])
+        except ApiHttpStatusError as e:
+            error = e
+            retryable = retryPolicy.isRetryableStatus(e.status_code)
+        except (
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+        ) as e:
+            error = e
+            retryable = retryPolicy.isRetryableConnectionError(not isConnectError(e))
+        except requests.Timeout as e:
+            error = e
+            retryable = retryPolicy.isRetryableTimeout()
+        except GeneratorExit:
+            # the caller stopped reading the objects
+            finishApiRequestEvent(hooks, event)
+            raise
+        except Exception as e:
+            finishApiRequestEvent(hooks, event, e)
+            raise
+
+        delay = None
+        if retryable and not yielded:
+            delay = retryPolicy.getRetryDelay(retry, started)
+        finishApiRequestEvent(hooks, event, error, delay is not None)
+        if delay is None:
+            raise error
+        sleep(delay)
+        retry += 1
+
+
+def getApiResponseFullJson(
+    baseUrl, path, data, session=None, codec=None, event=None, timeout=None
+):
+    if codec is None:
+        codec = JsonCodec()
+    response = getApiHttpResponseOrException(
+        baseUrl, path, data, session, codec, event, timeout
+    )
+    if event is not None:
+        event.responseBytes = len(response.content)
+    return codec.loads(response.content)
+
+
+def getApiHttpResponseOrException(
+    baseUrl, path, data, session=None, codec=None, event=None, timeout=None
+):
+    response = getApiHttpResponse(
+        baseUrl, path, data, session, codec, event=event, timeout=timeout
+    )
+    if event is not None:
+        event.statusCode = response.status_code
     if response.status_code != 200:
         raise ApiHttpStatusError(
             path, "Response did not have a status code of 200.", response.status_code
@@ -32,8 +242,37 @@ def getApiHttpResponseOrException(baseUrl, path, data):
     return response
 
 
-def getApiHttpResponse(baseUrl, path, data):
+def getApiHttpResponse(
+    baseUrl,
+    path,
+    data,
+    session=None,
+    codec=None,
+    stream=False,
+    event=None,
+    timeout=None,
+):
+    if codec is None:
+        codec = JsonCodec()
     url = baseUrl + path
     headers = {"Content-Type": "application/json"}
-    json_data = json.dumps(data)
-    return requests.post(url, json_data, headers=headers)
+    json_data = codec.dumps(data)
+    if event is not None:
+        event.requestBytes = len(json_data)
+    if session is None:
+        return requests.post(
+            url, json_data, headers=headers, stream=stream, timeout=timeout
+        )
+    return session.post(url, json_data, headers=headers, stream=stream, timeout=timeout)
+
+
+def isConnectError(error):
+    """Check if a requests ConnectionError happened before the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if len(error.args) > 0 else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def getSessionTimeout(session):
+    return getattr(session, "timeout", None)
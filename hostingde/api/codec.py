@@ -0,0 +1,93 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - optional dependency
+    ujson = None
+
+
+class JsonCodec:
+    """Encode api requests to and decode api responses from utf-8 json bytes.
+
+    The stdlib codec is always available, see getDefaultCodec for faster ones.
+    Any object with dumps(obj) returning bytes and loads(bytes) can be used as codec.
+    """
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, content):
+        # json.loads detects the encoding of bytes itself, no decoded str copy needed
+        return json.loads(content)
+
+
+class OrjsonCodec(JsonCodec):
+    """Codec using orjson ( pip install orjson ), which works on bytes natively."""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson: pip install orjson")
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, content):
+        return orjson.loads(content)
+
+
+class UjsonCodec(JsonCodec):
+    """Codec using ujson ( pip install ujson )."""
+
+    name = "ujson"
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError("UjsonCodec requires ujson: pip install ujson")
+
+    def dumps(self, obj):
+        return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, content):
+        return ujson.loads(content)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    UjsonCodec.name: UjsonCodec,
+}
+
+
+def getCodec(name):
+    """Return a new codec by name ( json, orjson or ujson )."""
+    if name not in CODECS:
+        raise ValueError("Unknown json codec: {}".format(name))
+    return CODECS[name]()
+
+
+def getAvailableCodecs():
+    """Return the names of all codecs that can be used in this environment."""
+    available = [JsonCodec.name]
+    if orjson is not None:
+        available.append(OrjsonCodec.name)
+    if ujson is not None:
+        available.append(UjsonCodec.name)
+    return available
+
+
+def getDefaultCodec():
+    """Return the fastest installed codec: orjson, ujson or the stdlib json module."""
+    if orjson is not None:
+        return OrjsonCodec()
+    if ujson is not None:
+        return UjsonCodec()
+    return JsonCodec()
@@ -0,0 +1,291 @@
+import ipaddress
+import logging
+import threading
+from time import monotonic
+import requests
+from hostingde.api.batch import ZoneChangeBatch
+from hostingde.api.errors import (
+    ObjectNotFoundError,
+    ApiHttpStatusError,
+    ApiResponseError,
+)
+from hostingde.helpers import filters
+
+logger = logging.getLogger(__name__)
+
+
+class DdnsRecord:
+    """A record kept up to date by DdnsUpdater.
+
+    Attributes:
+        recordName -- name of the record, e.g. home.dev.example.org
+        recordType -- type of the record, usually A or AAAA
+        contentProvider -- callable returning the current content, e.g. the public ip
+        ttl -- ttl of the published record
+        zoneName -- name of the zone, if known - otherwise the zone is found by domain hierarchy
+        zoneConfig -- zoneConfig of the zone, known after the first verification
+        publishedContents -- contents of the record at the api, None if not verified yet
+        publishedTtls -- ttls of the published records
+        verifiedAt -- monotonic time of the last verification against the api
+    """
+
+    def __init__(self, recordName, recordType, contentProvider, ttl=60, zoneName=None):
+        self.recordName = recordName
+        self.recordType = recordType.upper()
+        self.contentProvider = contentProvider
+        self.ttl = ttl
+        self.zoneName = zoneName
+        self.zoneConfig = None
+        self.publishedContents = None
+        self.publishedTtls = None
+        self.verifiedAt = None
+
+    def isVerifyDue(self, now, verifyInterval):
+        return (
+            self.publishedContents is None
+            or self.verifiedAt is None
+            or now - self.verifiedAt >= verifyInterval
+        )
+
+    def isPublished(self, content):
+        return self.publishedContents == [content] and self.publishedTtls == [self.ttl]
+
+    def getContent(self):
+        """Return the current content of the provider, validated for A and AAAA records."""
+        content = self.contentProvider()
+        if content is None:
+            return None
+        content = str(content).strip()
+        if self.recordType == "A":
+            content = str(ipaddress.IPv4Address(content))
+        elif self.recordType == "AAAA":
+            content = str(ipaddress.IPv6Address(content))
+        return content
+
+    def __repr__(self):
+        return "DdnsRecord({}, {})".format(self.recordName, self.recordType)
+
+
+class DdnsUpdateResult:
+    """Result of a record in a single DdnsUpdater.update run.
+
+    Attributes:
+        record -- the DdnsRecord
+        content -- content returned by the provider, None if it had none
+        changed -- True if the record was written
+        verified -- True if the published record was fetched from the api
+        error -- exception of the provider, the verification or the update, None on success
+    """
+
+    def __init__(self, record, content=None, changed=False, verified=False, error=None):
+        self.record = record
+        self.content = content
+        self.changed = changed
+        self.verified = verified
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+class DdnsUpdater:
+    """Publish changing record contents, e.g. the public ip of a host, without no-op writes.
+
+    The last published contents and the zoneConfig of every record are remembered,
+    so an update run only calls the content providers and sends nothing while the
+    contents are unchanged. Changed records are written with one zoneUpdate per zone,
+    without fetching the zone. The published records are verified against the api
+    ( one recordsFind per record ) only every verifyInterval seconds, after failed
+    writes and on the first run:
+
+        updater = DdnsUpdater(client, verifyInterval=3600)
+        updater.add("home.dev.example.org", "A", getHttpContentProvider("https://api.ipify.org"))
+        updater.run(interval=60)
+
+    Changes made by others are only noticed at the next verification.
+
+    Attributes:
+        verifyInterval -- seconds between verifications of the published records
+        ttl -- default ttl of the records
+        workers -- zones updated concurrently
+    """
+
+    def __init__(self, client, verifyInterval=3600, ttl=60, workers=1):
+        self.verifyInterval = verifyInterval
+        self.ttl = ttl
+        self.workers = workers
+        self.records = []
+        self.__client = client
+        self.__lock = threading.Lock()
+
+    def add(self, recordName, recordType, contentProvider, ttl=None, zoneName=None):
+        record = DdnsRecord(
+            recordName,
+            recordType,
+            contentProvider,
+            ttl if ttl is not None else self.ttl,
+            zoneName,
+        )
+        with self.__lock:
+            self.records.append(record)
+        return record
+
+    def remove(self, recordName, recordType):
+        """Stop updating a record, the published record is kept."""
+        name = recordName.lower()
+        with self.__lock:
+            self.records = [
+                record
+                for record in self.records
+                if record.recordName.lower() != name
+                or record.recordType != recordType.upper()
+            ]
+
+    def run(self, interval=60, stopEvent=None):
+        """Call update every interval seconds until stopEvent is set."""
+        if stopEvent is None:
+            stopEvent = threading.Event()
+        while not stopEvent.is_set():
+            for result in self.update():
+                if result.error is not None:
+                    logger.warning(
+                        "DDNS update of %s failed: %s",
+                        result.record.recordName,
+                        getattr(result.error, "message", result.error),
+                    )
+                elif result.changed:
+                    logger.info(
+                        "DDNS update of %s to %s",
+                        result.record.recordName,
+                        result.content,
+                    )
+            stopEvent.wait(interval)
+
+    def update(self, verify=False):
+        """Publish all changed contents, returns a DdnsUpdateResult per record.
+
+        With verify, all records are verified against the api, independent of verifyInterval.
+        """
+        with self.__lock:
+            records = list(self.records)
+        now = monotonic()
+        results = [None] * len(records)
+        batch = ZoneChangeBatch(self.__client, workers=self.workers)
+        pending = []
+
+        for i, record in enumerate(records):
+            try:
+                content = record.getContent()
+            except (ValueError, IOError) as e:
+                results[i] = DdnsUpdateResult(record, error=e)
+                continue
+            if content is None:
+                results[i] = DdnsUpdateResult(record)
+                continue
+
+            verified = False
+            if verify or record.isVerifyDue(now, self.verifyInterval):
+                try:
+                    self.verify(record)
+                    verified = True
+                except (
+                    ObjectNotFoundError,
+                    ApiHttpStatusError,
+                    ApiResponseError,
+                    requests.RequestException,
+                ) as e:
+                    results[i] = DdnsUpdateResult(record, content, error=e)
+                    continue
+            if record.isPublished(content):
+                results[i] = DdnsUpdateResult(record, content, False, verified)
+                continue
+
+            operations = [
+                batch.delete(
+                    record.recordName,
+                    record.recordType,
+                    publishedContent,
+                    zoneConfig=record.zoneConfig,
+                )
+                for publishedContent in record.publishedContents
+            ]
+            operations.append(
+                batch.add(
+                    record.recordName,
+                    record.recordType,
+                    content,
+                    record.ttl,
+                    zoneConfig=record.zoneConfig,
+                )
+            )
+            pending.append((i, record, content, verified, operations))
+
+        if len(pending) == 0:
+            return results
+        try:
+            operationResults = dict(
+                (id(result.operation), result) for result in batch.commit()
+            )
+            commitError = None
+        except requests.RequestException as e:
+            operationResults = {}
+            commitError = e
+        for i, record, content, verified, operations in pending:
+            errors = [commitError] if commitError is not None else []
+            for operation in operations:
+                if operationResults.get(id(operation)) is not None:
+                    if operationResults[id(operation)].error is not None:
+                        errors.append(operationResults[id(operation)].error)
+            if errors:
+                # the published state is unknown now, verify it on the next run
+                record.verifiedAt = None
+                results[i] = DdnsUpdateResult(
+                    record, content, False, verified, errors[0]
+                )
+                continue
+            record.publishedContents = [content]
+            record.publishedTtls = [record.ttl]
+            results[i] = DdnsUpdateResult(record, content, True, verified)
+        return results
+
+    def verify(self, record):
+        """Fetch the zoneConfig and the published contents of a record from the api."""
+        client = self.__client
+        if record.zoneConfig is None and record.zoneName:
+            zoneConfigs = list(
+                client.iterZoneConfigs(filters.getFilter("ZoneName", record.zoneName))
+            )
+            if len(zoneConfigs) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find zone {}.".format(record.zoneName)
+                )
+            record.zoneConfig = zoneConfigs[0]
+
+        if record.zoneConfig is None:
+            zone = client.getRecordZone(record.recordName, record.recordType)
+            record.zoneConfig = zone["zoneConfig"]
+            records = zone["records"]
+        else:
+            records = client.getNamedRecords(record.recordName, record.zoneConfig["id"])
+        records = [r for r in records if r["type"].upper() == record.recordType]
+        record.publishedContents = [r["content"] for r in records]
+        record.publishedTtls = [r.get("ttl") for r in records]
+        record.verifiedAt = monotonic()
+
+
+def getHttpContentProvider(url, timeout=10, session=None):
+    """Return a content provider reading the content from a url, e.g. an ip echo service."""
+    session = session if session is not None else requests.Session()
+
+    def getContent():
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.text.strip()
+
+    return getContent
+
+
+def getStaticContentProvider(content):
+    """Return a content provider always returning content."""
+    return lambda: content
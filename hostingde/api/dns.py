@@ -1,19 +1,97 @@
-from hostingde.api.errors import ObjectNotFoundError
-from hostingde.api.client import getApiResponse
+import json
+import threading
+from time import monotonic
+from hostingde.api.errors import ObjectNotFoundError, ApiResponseError
+from hostingde.api.client import ApiSession, getApiResponse, iterApiResponseData
+from hostingde.api.pagination import iterFindResults, iterStreamedFindResults
+from hostingde.api.batch import ZoneChangeBatch
+from hostingde.api import bulk
+from hostingde.api.ddns import DdnsUpdater
+from hostingde.api.codec import getDefaultCodec
+from hostingde.api.metrics import apiOperation
+from hostingde.api.retry import RetryPolicy
+from hostingde.api.singleflight import SingleFlight
+from hostingde.helpers import bodies
 from hostingde.helpers import dns
 from hostingde.helpers import filters
+from hostingde.helpers.cache import TtlCache, ZoneStateCache
+from hostingde.helpers.index import ZoneIndex
+from hostingde.helpers.models import (
+    Record,
+    Zone,
+    ZoneConfig,
+    iterApiObjects,
+)
 
 
 class DnsApiClient:
-    """ This class is designed to allow easy interaction with the Hosting.de DNS API."""
+    """ This class is designed to allow easy interaction with the Hosting.de DNS API.
+
+    A client keeps a pool of keep-alive connections, release it with close() or use the
+    client as context manager. Retries, rate limiting, zone caches, snapshots, request
+    hooks and the codec are configured with the constructor or the setters, see the
+    README for each feature. A client can be shared between threads, but setters and
+    loadZoneIndex should not be called while other threads are using it.
+    """
 
     def __init__(
-        self, authToken, baseUrl="https://secure.hosting.de", retryDelay=2, retries=2
+        self,
+        authToken,
+        baseUrl="https://secure.hosting.de",
+        retryDelay=2,
+        retries=2,
+        poolSize=10,
+        timeout=(10, 120),
+        session=None,
+        zoneCache=None,
+        zoneIndex=None,
+        retryPolicy=None,
+        rateLimiter=None,
+        targetedLookups=True,
+        codec=None,
+        apiObjects=False,
+        snapshot=None,
+        hooks=None,
+        zoneStateCache=None,
+        coalesceReads=True,
     ):
         self.__authToken = authToken
         self.__baseUrl = baseUrl
-        self.__retryDelay = retryDelay
-        self.__retries = retries
+        if retryPolicy is None:
+            retryPolicy = RetryPolicy(maxRetries=retries, baseDelay=retryDelay)
+        self.__retryPolicy = retryPolicy
+        self.__codec = codec if codec is not None else getDefaultCodec()
+        self.__apiObjects = apiObjects
+        self.__hooks = list(hooks) if hooks is not None else []
+        self.__ownsSession = session is None
+        if session is None:
+            session = ApiSession(
+                poolMaxSize=poolSize, timeout=timeout, rateLimiter=rateLimiter
+            )
+        elif rateLimiter is not None:
+            session.rateLimiter = rateLimiter
+        self.__session = session
+        self.__zoneCache = zoneCache
+        self.__zoneCacheSuffixLookup = True
+        self.__zoneIndex = zoneIndex
+        self.__targetedLookups = targetedLookups
+        self.__snapshot = snapshot
+        self.__zoneStateCache = zoneStateCache
+        self.__singleFlight = SingleFlight() if coalesceReads else None
+        self.__lastWrite = threading.local()
+
+    # connection lifecycle
+
+    def close(self):
+        """Close all pooled connections, if the session is owned by this client."""
+        if self.__ownsSession:
+            self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     # property setters
 
@@ -23,106 +101,470 @@ class DnsApiClient:
     def setBaseUrl(self, baseUrl):
         self.__baseUrl = baseUrl
 
+    def setRetryPolicy(self, retryPolicy):
+        self.__retryPolicy = retryPolicy
+
+    def getRetryPolicy(self):
+        return self.__retryPolicy
+
+    def addHook(self, hook):
+        """Add a request hook, e.g. a MetricsCollector from hostingde.api.metrics"""
+        self.__hooks.append(hook)
+
+    def removeHook(self, hook):
+        self.__hooks.remove(hook)
+
+    def setApiObjects(self, apiObjects):
+        self.__apiObjects = apiObjects
+
+    def setCodec(self, codec):
+        self.__codec = codec
+
+    def getCodec(self):
+        return self.__codec
+
     def setApiRetryDelay(self, delay):
-        self.__retryDelay = delay
+        """Deprecated - use setRetryPolicy or getRetryPolicy().baseDelay"""
+        self.__retryPolicy.baseDelay = delay
 
     def setMaxApiRetries(self, retries):
-        self.__retries = retries
+        """Deprecated - use setRetryPolicy or getRetryPolicy().maxRetries"""
+        self.__retryPolicy.maxRetries = retries
+
+    def setApiTimeout(self, timeout):
+        self.__session.timeout = timeout
+
+    def setRateLimiter(self, rateLimiter):
+        """Limit requests of this client, applies to all clients sharing the session."""
+        self.__session.rateLimiter = rateLimiter
+
+    def setZoneCache(self, zoneCache):
+        self.__zoneCache = zoneCache
+
+    def setZoneIndex(self, zoneIndex):
+        self.__zoneIndex = zoneIndex
+
+    def setTargetedLookups(self, targetedLookups):
+        """Resolve zones of record names with recordsFind and zoneConfigsFind instead of zonesFind."""
+        self.__targetedLookups = targetedLookups
+
+    def setSnapshot(self, snapshot):
+        """Read zones from a ZoneSnapshot, zones returned by updates of this client are stored in it."""
+        self.__snapshot = snapshot
+
+    def getSnapshot(self):
+        return self.__snapshot
+
+    def setZoneStateCache(self, zoneStateCache):
+        self.__zoneStateCache = zoneStateCache
+
+    def setCoalesceReads(self, coalesceReads):
+        """Send identical find requests of concurrent threads only once, zone writes are never coalesced."""
+        self.__singleFlight = SingleFlight() if coalesceReads else None
+
+    def getCoalescedReadStats(self):
+        """Return find requests sent, shared with a running request and in flight, None if disabled."""
+        if self.__singleFlight is None:
+            return None
+        return self.__singleFlight.stats()
+
+    # zone snapshot
+
+    @apiOperation
+    def syncSnapshot(self, zoneConfigFilter=None, fullRefresh=False):
+        """Refresh the zone snapshot with all zones changed since the last sync, see ZoneSnapshot.sync"""
+        return self.__snapshot.sync(self, zoneConfigFilter, fullRefresh)
+
+    def __storeSnapshotZone(self, zone):
+        if self.__snapshot is not None and zone:
+            self.__snapshot.storeZone(zone)
+
+    # zone index
+
+    @apiOperation
+    def loadZoneIndex(self, zoneConfigFilter=None):
+        """Build a ZoneIndex from all zone configs matching the filter and use it for zone lookups.
+
+        zoneConfigsFind does not return records, so this is cheap even for large zones.
+        The index has to be reloaded, if zones are created or deleted by other clients.
+        """
+        self.__zoneIndex = ZoneIndex(self.iterZoneConfigs(zoneConfigFilter))
+        return self.__zoneIndex
+
+    def __getIndexedZoneConfigs(self, recordName):
+        """Return the zone configs owning recordName, deepest first - None without index."""
+        if self.__zoneIndex is None:
+            return None
+        zoneConfigs = self.__zoneIndex.getZoneConfigs(recordName)
+        if len(zoneConfigs) == 0:
+            raise ObjectNotFoundError(
+                "Could not find any zone for {} in zone index.".format(recordName)
+            )
+        return zoneConfigs
+
+    # zone resolution cache
+
+    def enableZoneCache(self, maxSize=1024, ttl=300, suffixLookup=True):
+        """Remember the zoneConfig resolved for record names for up to ttl seconds.
+
+        With suffixLookup, new names below a cached zone are resolved to it without
+        any api call. Zones nested below a cached zone are not known until they have
+        been cached themselves, so accounts with nested zones should disable it or
+        load a zone index ( see loadZoneIndex ), which is used instead.
+        """
+        self.__zoneCache = TtlCache(maxSize, ttl)
+        self.__zoneCacheSuffixLookup = suffixLookup
+        return self.__zoneCache
+
+    def getZoneCacheStats(self):
+        """Return hits, misses, evictions and size of the zone cache or None if disabled."""
+        if self.__zoneCache is None:
+            return None
+        return self.__zoneCache.stats()
+
+    def __getCachedZoneConfig(self, recordName):
+        if self.__zoneCache is None:
+            return None
+        key = self.__getZoneCacheKey(recordName)
+        return self.__zoneCache.get(key or dns.getNormalizedName(recordName))
+
+    def __getZoneCacheKey(self, recordName):
+        """Return the cache key of recordName or of the closest cached zone above it.
+
+        With suffixLookup, names below a cached zone belong to it, unless a deeper zone
+        has been cached.
+        """
+        name = dns.getNormalizedName(recordName)
+        if self.__zoneCache.peek(name) is not None:
+            return name
+        if not self.__zoneCacheSuffixLookup or self.__zoneIndex is not None:
+            return None
+        for domain in dns.getRecordDomainList(name)[1:]:
+            zoneConfig = self.__zoneCache.peek(domain)
+            if (
+                zoneConfig is not None
+                and dns.getNormalizedName(zoneConfig.get("name") or "") == domain
+            ):
+                return domain
+        return None
+
+    def __cacheZoneConfig(self, recordName, zone):
+        if self.__zoneCache is None or zone is None:
+            return
+        zoneConfig = zone["zoneConfig"]
+        self.__zoneCache.set(dns.getNormalizedName(recordName), zoneConfig)
+        if "name" in zoneConfig:
+            self.__zoneCache.set(dns.getNormalizedName(zoneConfig["name"]), zoneConfig)
+
+    def __invalidateZoneCache(self, recordName):
+        if self.__zoneCache is not None:
+            key = self.__getZoneCacheKey(recordName)
+            if key is not None:
+                self.__zoneCache.invalidate(key)
+            self.__zoneCache.invalidate(dns.getNormalizedName(recordName))
+
+    # zone state cache - complete zones from zone write responses
+
+    def enableZoneStateCache(self, maxSize=64, ttl=300):
+        """Keep the zones returned by zone writes to change them again without fetching them."""
+        self.__zoneStateCache = ZoneStateCache(maxSize, ttl)
+        return self.__zoneStateCache
+
+    def getZoneStateCacheStats(self):
+        """Return hits, misses, evictions, stale and size of the zone state cache or None if disabled."""
+        if self.__zoneStateCache is None:
+            return None
+        return self.__zoneStateCache.stats()
 
-    def __getApiResponse(self, path, data):
+    def __storeZoneState(self, zone, recordName=None):
+        if self.__zoneStateCache is not None and zone:
+            self.__zoneStateCache.store(zone, recordName)
+
+    def __getZoneState(self, recordName, recordType, recordContent, requireRecord):
+        """Return the cached zone of a record name, None if unknown or the record is missing."""
+        if self.__zoneStateCache is None:
+            return None
+        zone = self.__zoneStateCache.getZone(recordName)
+        if zone is None:
+            return None
+        if requireRecord and not dns.zoneContainsRecord(
+            zone, recordName, recordType, recordContent
+        ):
+            return None
+        return zone
+
+    def __getCachedZone(self, recordName):
+        """Fetch only the cached zone of a record name - None if not cached or gone."""
+        zoneConfig = self.__getCachedZoneConfig(recordName)
+        if zoneConfig is None:
+            return None
+        try:
+            zoneFilter = filters.getFilter("ZoneConfigId", zoneConfig["id"])
+            return self.getZonesByFilter(zoneFilter)[0]
+        except ObjectNotFoundError:
+            self.__invalidateZoneCache(recordName)
+            return None
+
+    def __zoneUpdateForRecord(
+        self, recordName, zoneConfig, recordsToAdd, recordsToDelete=[]
+    ):
+        """Update a zone resolved for recordName, forgetting the zone on errors."""
+        try:
+            zone = self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        except (ObjectNotFoundError, ApiResponseError):
+            self.__invalidateZoneCache(recordName)
+            raise
+        if self.__zoneStateCache is not None and zone:
+            self.__zoneStateCache.mapRecordName(recordName, zone["zoneConfig"]["id"])
+        return zone
+
+    def __getApiResponse(self, path, data, write=False, retryUncertain=False):
+        try:
+            return self.__sendApiRequest(path, data, write and not retryUncertain)
+        finally:
+            if write:
+                # reads of this thread must not share responses of older requests
+                self.__lastWrite.value = monotonic()
+
+    def __sendApiRequest(self, path, data, write):
         return getApiResponse(
-            self.__baseUrl, path, data, self.__retries, self.__retryDelay
+            self.__baseUrl,
+            path,
+            data,
+            session=self.__session,
+            retryPolicy=self.__retryPolicy,
+            codec=self.__codec,
+            hooks=self.__hooks,
+            write=write,
+        )
+
+    def __getFindResponse(self, path, data, objectType):
+        response = self.__getReadResponse(path, data)
+        if self.__apiObjects:
+            response["data"] = [objectType.fromDict(item) for item in response["data"]]
+        return response
+
+    def __getReadResponse(self, path, data):
+        """Send a find request, sharing the response with identical concurrent requests."""
+        if self.__singleFlight is None:
+            return self.__getApiResponse(path, data)
+        key = (self.__baseUrl, path, json.dumps(data, sort_keys=True, default=str))
+        return self.__singleFlight.do(
+            key,
+            lambda: self.__getApiResponse(path, data),
+            getattr(self.__lastWrite, "value", None),
+        )
+
+    def __iterApiResponseData(self, path, data, objectType):
+        items = iterApiResponseData(
+            self.__baseUrl,
+            path,
+            data,
+            session=self.__session,
+            retryPolicy=self.__retryPolicy,
+            codec=self.__codec,
+            hooks=self.__hooks,
         )
+        if self.__apiObjects:
+            return iterApiObjects(items, objectType)
+        return items
 
     # hosting.de api request helper functions
 
     def getCommonFilterBody(self, requestFilter, limit, page, sort):
-        return {
-            "authToken": self.__authToken,
-            "filter": requestFilter,
-            "limit": limit,
-            "page": page,
-            "sort": sort,
-        }
+        return bodies.getCommonFilterBody(
+            self.__authToken, requestFilter, limit, page, sort
+        )
 
     def getZoneCreateBody(
         self, zoneConfig, records, useDefaultNameserverSet=False, nameserverSetId=None
     ):
-        data = {
-            "authToken": self.__authToken,
-            "zoneConfig": zoneConfig,
-            "records": records,
-            "useDefaultNameserverSet": useDefaultNameserverSet,
-        }
-        if nameserverSetId:
-            data["nameserverSetId"] = nameserverSetId
-        return data
+        return bodies.getZoneCreateBody(
+            self.__authToken,
+            zoneConfig,
+            records,
+            useDefaultNameserverSet,
+            nameserverSetId,
+        )
 
     def getZoneConfigBody(self, zoneConfigId=None, zoneConfigName=None):
-        data = {}
-        if zoneConfigId:
-            data["zoneConfigId"] = zoneConfigId
-        elif zoneConfigName:
-            data["zoneConfigName"] = zoneConfigName
-        return data
+        return bodies.getZoneConfigBody(zoneConfigId, zoneConfigName)
 
     def getZoneUpdateBody(self, zoneConfig, recordsToAdd, recordsToDelete=[]):
-        return {
-            "authToken": self.__authToken,
-            "zoneConfig": zoneConfig,
-            "recordsToAdd": recordsToAdd,
-            "recordsToDelete": recordsToDelete,
-        }
+        return bodies.getZoneUpdateBody(
+            self.__authToken, zoneConfig, recordsToAdd, recordsToDelete
+        )
 
     # hosting.de api list functions
 
     def recordsFind(self, recordFilter, limit=25, page=1, sort=None):
         """Hosting.de api function for listing records - https://www.hosting.de/api/#listing-records"""
         data = self.getCommonFilterBody(recordFilter, limit, page, sort)
-        return self.__getApiResponse("/api/dns/v1/json/recordsFind", data)
+        return self.__getFindResponse("/api/dns/v1/json/recordsFind", data, Record)
 
     def zoneConfigsFind(self, zoneConfigFilter, limit=25, page=1, sort=None):
         """Hosting.de api function for listing zone configs - https://www.hosting.de/api/#list-zoneconfigs"""
         data = self.getCommonFilterBody(zoneConfigFilter, limit, page, sort)
-        return self.__getApiResponse("/api/dns/v1/json/zoneConfigsFind", data)
+        response = self.__getFindResponse(
+            "/api/dns/v1/json/zoneConfigsFind", data, ZoneConfig
+        )
+        if self.__zoneStateCache is not None:
+            for zoneConfig in response["data"]:
+                self.__zoneStateCache.observe(zoneConfig)
+        return response
 
     def zonesFind(self, zoneFilter, limit=25, page=1, sort=None):
         """Hosting.de api function for listing zones - https://www.hosting.de/api/#listing-zones"""
         data = self.getCommonFilterBody(zoneFilter, limit, page, sort)
-        return self.__getApiResponse("/api/dns/v1/json/zonesFind", data)
+        response = self.__getFindResponse("/api/dns/v1/json/zonesFind", data, Zone)
+        if self.__zoneStateCache is not None:
+            for zone in response["data"]:
+                self.__zoneStateCache.refresh(zone)
+        return response
+
+    # hosting.de api list functions streaming the response
+
+    def recordsFindStream(self, recordFilter, limit=25, page=1, sort=None):
+        """Like recordsFind, but yields the records while they are received.
+
+        Returns the response without data, see hostingde.api.client.iterApiResponseData
+        """
+        data = self.getCommonFilterBody(recordFilter, limit, page, sort)
+        return self.__iterApiResponseData("/api/dns/v1/json/recordsFind", data, Record)
+
+    def zoneConfigsFindStream(self, zoneConfigFilter, limit=25, page=1, sort=None):
+        """Like zoneConfigsFind, but yields the zone configs while they are received."""
+        data = self.getCommonFilterBody(zoneConfigFilter, limit, page, sort)
+        return self.__iterApiResponseData(
+            "/api/dns/v1/json/zoneConfigsFind", data, ZoneConfig
+        )
+
+    def zonesFindStream(self, zoneFilter, limit=25, page=1, sort=None):
+        """Like zonesFind, but yields the zones while they are received."""
+        data = self.getCommonFilterBody(zoneFilter, limit, page, sort)
+        return self.__iterApiResponseData("/api/dns/v1/json/zonesFind", data, Zone)
+
+    # hosting.de api list functions iterating over all pages
+
+    def iterRecords(
+        self, recordFilter, limit=100, sort=None, prefetch=False, stream=False
+    ):
+        """Yield all records matching the filter, requesting one page at a time.
+
+        With stream, records are yielded while a page is received and large limits
+        do not need more memory ( prefetch is not supported ).
+        """
+        if stream:
+            return self.__iterStreamedFindResults(
+                self.recordsFindStream, recordFilter, limit, sort, prefetch
+            )
+        return iterFindResults(self.recordsFind, recordFilter, limit, sort, prefetch)
+
+    def iterZoneConfigs(
+        self, zoneConfigFilter, limit=100, sort=None, prefetch=False, stream=False
+    ):
+        """Yield all zone configs matching the filter, requesting one page at a time."""
+        if stream:
+            return self.__iterStreamedFindResults(
+                self.zoneConfigsFindStream, zoneConfigFilter, limit, sort, prefetch
+            )
+        return iterFindResults(
+            self.zoneConfigsFind, zoneConfigFilter, limit, sort, prefetch
+        )
+
+    def iterZones(self, zoneFilter, limit=25, sort=None, prefetch=False, stream=False):
+        """Yield all zones matching the filter, requesting one page at a time.
+
+        Zones contain all of their records, smaller pages keep memory usage low.
+        With stream, only a single zone is held in memory.
+        """
+        if stream:
+            return self.__iterStreamedFindResults(
+                self.zonesFindStream, zoneFilter, limit, sort, prefetch
+            )
+        return iterFindResults(self.zonesFind, zoneFilter, limit, sort, prefetch)
+
+    def __iterStreamedFindResults(
+        self, streamFunction, findFilter, limit, sort, prefetch
+    ):
+        if prefetch:
+            raise ValueError("prefetch can not be combined with stream.")
+        return iterStreamedFindResults(streamFunction, findFilter, limit, sort)
 
     # hosting.de api zone editing functions
 
     def zoneCreate(
-        self, zoneConfig, records, useDefaultNameserverSet=False, nameserverSetId=None
+        self,
+        zoneConfig,
+        records,
+        useDefaultNameserverSet=False,
+        nameserverSetId=None,
+        retryUncertain=False,
     ):
-        """Hosting.de api function for creating a zone - https://www.hosting.de/api/#creating-new-zones"""
+        """Hosting.de api function for creating a zone - https://www.hosting.de/api/#creating-new-zones
+
+        Like all zone writes, the request is not retried after timeouts, server errors and
+        lost connections, it may have been processed. retryUncertain retries these errors as configured
+        in the RetryPolicy anyway.
+        """
         data = self.getZoneCreateBody(
             zoneConfig, records, useDefaultNameserverSet, nameserverSetId
         )
-        return self.__getApiResponse("/api/dns/v1/json/zoneCreate", data)
+        zone = self.__getApiResponse(
+            "/api/dns/v1/json/zoneCreate", data, True, retryUncertain
+        )
+        if self.__zoneIndex is not None:
+            self.__zoneIndex.add(zone["zoneConfig"])
+        self.__storeSnapshotZone(zone)
+        self.__storeZoneState(zone)
+        return zone
 
-    def zoneDelete(self, zoneConfigId=None, zoneConfigName=None):
+    def zoneDelete(self, zoneConfigId=None, zoneConfigName=None, retryUncertain=False):
         """Hosting.de api function for deleting a zone - https://www.hosting.de/api/#deleting-zones"""
         data = self.getZoneConfigBody(zoneConfigId, zoneConfigName)
-        return self.__getApiResponse("/api/dns/v1/json/zoneRecreate", data)
+        response = self.__getApiResponse(
+            "/api/dns/v1/json/zoneRecreate", data, True, retryUncertain
+        )
+        if self.__snapshot is not None:
+            self.__snapshot.removeZone(zoneConfigId, zoneConfigName)
+        if self.__zoneStateCache is not None:
+            self.__zoneStateCache.invalidate(zoneConfigId, zoneConfigName)
+        return response
 
     def zoneRecreate(
-        self, zoneConfig, records, useDefaultNameserverSet=False, nameserverSetId=None
+        self,
+        zoneConfig,
+        records,
+        useDefaultNameserverSet=False,
+        nameserverSetId=None,
+        retryUncertain=False,
     ):
         """Hosting.de api function for recreating a zone - https://www.hosting.de/api/#recreating-existing-zones"""
         data = self.getZoneCreateBody(
             zoneConfig, records, useDefaultNameserverSet, nameserverSetId
         )
-        return self.__getApiResponse("/api/dns/v1/json/zoneRecreate", data)
+        zone = self.__getApiResponse(
+            "/api/dns/v1/json/zoneRecreate", data, True, retryUncertain
+        )
+        self.__storeSnapshotZone(zone)
+        self.__storeZoneState(zone)
+        return zone
 
-    def zoneUpdate(self, zoneConfig, recordsToAdd, recordsToDelete=[]):
+    def zoneUpdate(
+        self, zoneConfig, recordsToAdd, recordsToDelete=[], retryUncertain=False
+    ):
         """Hosting.de api function for updating a zone - https://www.hosting.de/api/#updating-zones"""
         data = self.getZoneUpdateBody(zoneConfig, recordsToAdd, recordsToDelete)
-        return self.__getApiResponse("/api/dns/v1/json/zoneUpdate", data)
+        zone = self.__getApiResponse(
+            "/api/dns/v1/json/zoneUpdate", data, True, retryUncertain
+        )
+        self.__storeSnapshotZone(zone)
+        self.__storeZoneState(zone)
+        return zone
 
     # custom api functions for information gathering
 
+    @apiOperation
     def getZonesByFilter(self, zoneFilter, limit=25, page=1, sort=None):
         """Get zones by filter
         
@@ -137,6 +579,7 @@ class DnsApiClient:
 
         return zoneResponse["data"]
 
+    @apiOperation
     def getZonesByRecord(
         self,
         recordName,
@@ -160,6 +603,7 @@ class DnsApiClient:
         zoneFilter = filters.getRecordFilter(recordName, recordType, recordContent)
         return self.getZonesByFilter(zoneFilter, limit, page, sort)
 
+    @apiOperation
     def getZonesByDomainHierarchy(self, recordName, limit=25, page=1, sort=None):
         """Get zones based on domain hierarchy
         If we do not know of an existing record, we need to search for all zones based on domain hierarchy, 
@@ -178,6 +622,7 @@ class DnsApiClient:
         zoneFilter = filters.getZoneDomainListFilter(domains)
         return self.getZonesByFilter(zoneFilter, limit, page, sort)
 
+    @apiOperation
     def getZoneByRecord(
         self, recordName, recordType=None, recordContent=None, limit=25, page=1
     ):
@@ -186,14 +631,43 @@ class DnsApiClient:
 
         This function returnes the best matching zone objects for the given record
         https://www.hosting.de/api/#the-zone-object
+
+        With the zone cache enabled, only a cached zone is fetched, if it still contains the record.
+        With a zone index, only the zones owning the name are searched.
+        With a zone snapshot, the zone is read from the snapshot.
         """
-        zones = self.getZonesByRecord(
-            recordName, recordType, recordContent, limit, page
-        )
+        if self.__snapshot is not None:
+            return self.__snapshot.getZoneByRecord(
+                recordName, recordType, recordContent
+            )
+
+        recordZone = self.__getCachedZone(recordName)
+        if recordZone is not None and dns.zoneContainsRecord(
+            recordZone, recordName, recordType, recordContent
+        ):
+            return recordZone
+
+        zoneConfigs = self.__getIndexedZoneConfigs(recordName)
+        if zoneConfigs is None:
+            zones = self.getZonesByRecord(
+                recordName, recordType, recordContent, limit, page
+            )
+        else:
+            zoneFilter = filters.getAndFilter(
+                [
+                    filters.getRecordFilter(recordName, recordType, recordContent),
+                    filters.getZoneConfigIdListFilter(
+                        [zoneConfig["id"] for zoneConfig in zoneConfigs]
+                    ),
+                ]
+            )
+            zones = self.getZonesByFilter(zoneFilter, limit, page)
         recordZone = dns.getBestZoneForRecord(zones, recordName, recordType)
+        self.__cacheZoneConfig(recordName, recordZone)
 
         return recordZone
 
+    @apiOperation
     def getZoneByDomain(
         self, recordName, recordType=None, recordContent=None, limit=25, page=1
     ):
@@ -203,14 +677,193 @@ class DnsApiClient:
 
         This function returnes the best matching zone objects for the given record
         https://www.hosting.de/api/#the-zone-object
+
+        With the zone cache enabled, only a cached zone is fetched.
+        With a zone index, only the zones owning the name are fetched by id.
+        With a zone snapshot, the zone is read from the snapshot.
         """
-        zones = self.getZonesByDomainHierarchy(recordName, limit, page)
+        if self.__snapshot is not None:
+            return self.__snapshot.getZoneByDomain(
+                recordName, recordType, recordContent
+            )
+
+        recordZone = self.__getCachedZone(recordName)
+        if recordZone is not None:
+            return recordZone
+
+        zoneConfigs = self.__getIndexedZoneConfigs(recordName)
+        if zoneConfigs is None:
+            zones = self.getZonesByDomainHierarchy(recordName, limit, page)
+        else:
+            zoneFilter = filters.getZoneConfigIdListFilter(
+                [zoneConfig["id"] for zoneConfig in zoneConfigs]
+            )
+            zones = self.getZonesByFilter(zoneFilter, limit, page)
         recordZone = dns.getBestZoneForRecord(
             zones, recordName, recordType, recordContent
         )
+        self.__cacheZoneConfig(recordName, recordZone)
 
         return recordZone
 
+    @apiOperation
+    def getZoneConfigByDomain(self, recordName, recordType=None, recordContent=None):
+        """Get the zoneConfig of the best matching zone for a record based on domain hierarchy
+
+        With the zone cache enabled, a cached zoneConfig is returned without any api call.
+        With a zone index, the deepest zone owning the name is returned without any api call,
+        even if a zone higher up the hierarchy contains a record with the same name.
+        With a zone snapshot, the zoneConfig is read from the snapshot.
+        """
+        if self.__snapshot is not None:
+            return self.__snapshot.getZoneConfigByDomain(
+                recordName, recordType, recordContent
+            )
+        zoneConfig = self.__getCachedZoneConfig(recordName)
+        if zoneConfig is not None and "name" in zoneConfig:
+            return zoneConfig
+        zoneConfigs = self.__getIndexedZoneConfigs(recordName)
+        if zoneConfigs is not None:
+            return zoneConfigs[0]
+        if self.__targetedLookups:
+            # records only decide between nested zones owning the name
+            zoneConfigs = dns.getOwningZoneConfigs(
+                self.getZoneConfigsByDomainHierarchy(recordName), recordName
+            )
+            if len(zoneConfigs) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            if len(zoneConfigs) == 1:
+                self.__cacheZoneConfig(recordName, {"zoneConfig": zoneConfigs[0]})
+                return zoneConfigs[0]
+        return self.__getZoneForRecord(recordName, recordType, recordContent)[
+            "zoneConfig"
+        ]
+
+    @apiOperation
+    def getZoneConfigsByDomainHierarchy(self, recordName):
+        """Get zone configs based on domain hierarchy - like getZonesByDomainHierarchy, but without records
+
+        This function returnes a list of zoneConfig objects
+        https://www.hosting.de/api/#the-zoneconfig-object
+        """
+        domains = dns.getRecordDomainList(recordName)
+        zoneConfigFilter = filters.getZoneDomainListFilter(domains)
+        return list(self.iterZoneConfigs(zoneConfigFilter))
+
+    @apiOperation
+    def getRecordZone(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        requireRecord=False,
+        completeZoneConfig=True,
+    ):
+        """Get the best matching zone for a record, containing only records named recordName
+
+        Instead of complete zones, only records named recordName are queried with recordsFind,
+        zone configs without records are queried only if no zone contains such a record or
+        the depth of zones has to be compared. The returned zone is the same as the one of
+        getZoneByDomain or with requireRecord of getZoneByRecord, but its records are limited
+        to recordName.
+
+        Without completeZoneConfig, the zoneConfig of a zone found by its records only
+        contains the id, which is enough for zoneUpdate and saves a zoneConfigsFind.
+        """
+        zoneConfig = self.__getCachedZoneConfig(recordName)
+        if zoneConfig is not None and zoneConfig.get("id"):
+            zone = {
+                "zoneConfig": zoneConfig,
+                "records": self.getNamedRecords(recordName, zoneConfig["id"]),
+            }
+            if not requireRecord or dns.zoneContainsRecord(
+                zone, recordName, recordType, recordContent
+            ):
+                return zone
+            self.__invalidateZoneCache(recordName)
+
+        zones = dns.getNamedRecordZones(self.getNamedRecords(recordName))
+        if requireRecord:
+            zones = dns.getZonesContainingRecord(
+                zones, recordName, recordType, recordContent
+            )
+            if len(zones) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            recordContent = None
+
+        if len(zones) == 0:
+            zoneConfigs = self.__getIndexedZoneConfigs(recordName)
+            if zoneConfigs is None:
+                zoneConfigs = dns.getOwningZoneConfigs(
+                    self.getZoneConfigsByDomainHierarchy(recordName), recordName
+                )
+            if len(zoneConfigs) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any zone matching the filter."
+                )
+            recordZone = {"zoneConfig": zoneConfigs[0], "records": []}
+        else:
+            recordZone = self.__getBestRecordZone(
+                zones, recordName, recordType, recordContent
+            )
+            if completeZoneConfig and "name" not in recordZone["zoneConfig"]:
+                recordZone["zoneConfig"] = self.__getZoneConfigsById(
+                    [recordZone["zoneConfig"]["id"]]
+                )[recordZone["zoneConfig"]["id"]]
+
+        self.__cacheZoneConfig(recordName, recordZone)
+        return recordZone
+
+    def __getBestRecordZone(self, zones, recordName, recordType, recordContent):
+        """Choose between zones containing records, zone configs are only fetched for ties."""
+        bestZones = dns.getBestRecordZones(zones, recordName, recordType, recordContent)
+        if len(bestZones) == 1:
+            return bestZones[0]
+
+        zoneConfigs = self.__getZoneConfigsById(
+            [zone["zoneConfig"]["id"] for zone in bestZones]
+        )
+        for zone in bestZones:
+            zone["zoneConfig"] = zoneConfigs[zone["zoneConfig"]["id"]]
+        return dns.getBestZoneForRecord(
+            bestZones, recordName, recordType, recordContent
+        )
+
+    def __getZoneConfigsById(self, zoneConfigIds):
+        zoneConfigFilter = filters.getZoneConfigIdListFilter(zoneConfigIds)
+        zoneConfigs = {}
+        for zoneConfig in self.iterZoneConfigs(zoneConfigFilter):
+            zoneConfigs[zoneConfig["id"]] = zoneConfig
+        return zoneConfigs
+
+    @apiOperation
+    def getNamedRecords(self, recordName, zoneConfigId=None):
+        """Get all records named exactly recordName, optionally only of a single zone."""
+        recordFilter = filters.getNamedRecordFilter(recordName, zoneConfigId)
+        return dns.getRecordsNamed(self.iterRecords(recordFilter), recordName)
+
+    def __getZoneForRecord(
+        self,
+        recordName,
+        recordType=None,
+        recordContent=None,
+        requireRecord=False,
+        completeZoneConfig=True,
+    ):
+        """Resolve the zone used by the helpers without a known zoneConfig."""
+        if self.__targetedLookups and self.__zoneIndex is None:
+            return self.getRecordZone(
+                recordName, recordType, recordContent, requireRecord, completeZoneConfig
+            )
+        if requireRecord:
+            return self.getZoneByRecord(recordName, recordType, recordContent)
+        return self.getZoneByDomain(recordName, recordType, recordContent)
+
+    @apiOperation
     def getRecordsByFilter(self, recordFilter, limit=50, page=1, sort=None):
         recordsResponse = self.recordsFind(recordFilter, limit, page, sort)
 
@@ -220,6 +873,7 @@ class DnsApiClient:
 
         return recordsResponse["data"]
 
+    @apiOperation
     def getRecords(
         self,
         recordName,
@@ -233,12 +887,22 @@ class DnsApiClient:
 
         This function returnes a list of record objects
         https://www.hosting.de/api/#the-record-object
+
+        With a zone snapshot, the records are read from the snapshot.
         """
+        if self.__snapshot is not None:
+            records = self.__snapshot.getRecords(recordName, recordType, recordContent)
+            if len(records) == 0:
+                raise ObjectNotFoundError(
+                    "Could not find any records matching the filter."
+                )
+            return records[(page - 1) * limit : page * limit]
         recordFilter = filters.getRecordFilter(recordName, recordType, recordContent)
         return self.getRecordsByFilter(recordFilter, limit, page, sort)
 
     # custom api functions that require more information but do not require information from  api - single api call
 
+    @apiOperation
     def addZoneRecordWithConfig(
         self, zoneConfig, recordName, recordType, recordContent, ttl=600
     ):
@@ -248,6 +912,7 @@ class DnsApiClient:
         ]
         return self.zoneUpdate(zoneConfig, recordsToAdd)
 
+    @apiOperation
     def deleteZoneRecordWithConfig(
         self, zoneConfig, recordName, recordType, recordContent
     ):
@@ -257,6 +922,7 @@ class DnsApiClient:
         ]
         return self.zoneUpdate(zoneConfig, [], recordToDelete)
 
+    @apiOperation
     def updateZoneRecordWithConfig(
         self, zoneConfig, recordName, recordType, recordContent, oldContent, ttl=600
     ):
@@ -271,6 +937,7 @@ class DnsApiClient:
 
     # custom api functions that require more information but still require some information from api - less zones to query and iterate
 
+    @apiOperation
     def deleteZoneRecordsWithFilter(
         self, zoneFilter, recordName, recordType, recordContent=None
     ):
@@ -284,6 +951,7 @@ class DnsApiClient:
         )
         return self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
 
+    @apiOperation
     def setZoneRecordWithFilter(
         self,
         zoneFilter,
@@ -305,6 +973,7 @@ class DnsApiClient:
 
     # custom api functions with simpler interface
 
+    @apiOperation
     def addZoneRecord(self, zoneName, recordName, recordType, recordContent, ttl=600):
         """Add a new record to a zone known by name"""
         zoneConfig = {"name": zoneName}
@@ -312,6 +981,7 @@ class DnsApiClient:
             zoneConfig, recordName, recordType, recordContent, ttl
         )
 
+    @apiOperation
     def deleteZoneRecord(self, zoneName, recordName, recordType, recordContent):
         """Delete a known record from a zone known by name"""
         zoneConfig = {"name": zoneName}
@@ -319,6 +989,7 @@ class DnsApiClient:
             zoneConfig, recordName, recordType, recordContent
         )
 
+    @apiOperation
     def updateZoneRecord(
         self, zoneName, recordName, recordType, recordContent, oldContent, ttl=600
     ):
@@ -328,6 +999,7 @@ class DnsApiClient:
             zoneConfig, recordName, recordType, recordContent, oldContent, ttl
         )
 
+    @apiOperation
     def deleteZoneRecords(self, zoneName, recordName, recordType, recordContent=None):
         """Delete a record from a zone known by name - records are received from zone information queried from api"""
         zoneFilter = filters.getFilter("ZoneName", zoneName)
@@ -335,6 +1007,7 @@ class DnsApiClient:
             zoneFilter, recordName, recordType, recordContent
         )
 
+    @apiOperation
     def setZoneRecord(
         self, zoneName, recordName, recordType, recordContent, oldContent=None, ttl=600
     ):
@@ -344,43 +1017,159 @@ class DnsApiClient:
             zoneFilter, recordName, recordType, recordContent, oldContent, ttl
         )
 
+    # declarative zone changes
+
+    @apiOperation
+    def reconcileZone(self, zone, desiredRecords, recordTypes=None, dryRun=False):
+        """Make the records of a zone match desiredRecords with at most one zoneUpdate
+
+        zone is either a zone object or the name of a zone, which is fetched first
+        or read from the zone snapshot.
+        Records of other types than recordTypes ( by default SOA ) are not changed.
+        Returns (zoneConfig, recordsToAdd, recordsToDelete), see dns.getZoneReconcileUpdate.
+        Nothing is sent if the zone already matches or with dryRun.
+        """
+        if isinstance(zone, str) and self.__snapshot is not None:
+            zone = self.__snapshot.getZoneByName(zone) or zone
+        if isinstance(zone, str):
+            zoneFilter = filters.getFilter("ZoneName", zone)
+            zone = self.getZonesByFilter(zoneFilter, limit=1)[0]
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneReconcileUpdate(
+            zone, desiredRecords, recordTypes
+        )
+        if not dryRun and (recordsToAdd or recordsToDelete):
+            self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        return (zoneConfig, recordsToAdd, recordsToDelete)
+
+    # batched record changes - one zoneUpdate per zone
+
+    def getZoneChangeBatch(self, workers=1):
+        """Return a ZoneChangeBatch collecting record operations for this client."""
+        return ZoneChangeBatch(self, workers=workers)
+
+    def applyRecordOperations(self, operations, workers=4, merge=True):
+        """Apply RecordOperations in parallel across zones and in order within each zone.
+
+        Yields a RecordOperationResult per operation as soon as its zone is done,
+        see hostingde.api.bulk.applyRecordOperations.
+        """
+        return bulk.applyRecordOperations(self, operations, workers, merge)
+
+    # ddns - only changed contents are written
+
+    def getDdnsUpdater(self, verifyInterval=3600, ttl=60, workers=1):
+        """Return a DdnsUpdater publishing changed record contents with this client."""
+        return DdnsUpdater(self, verifyInterval, ttl, workers)
+
     # custom api functions for easy use without knowning zoneConfig
     # these functions query for zone information from api
     # this can lead to performance issues with many or large zones
 
+    @apiOperation
     def addRecord(self, recordName, recordType, recordContent, ttl=600):
         """Add a record to an unknown, but existing zone."""
-        recordZone = self.getZoneByDomain(recordName, recordType)
+        recordZone = self.__getZoneState(recordName, recordType, None, False)
+        if recordZone is not None:
+            zoneConfig = recordZone["zoneConfig"]
+        else:
+            zoneConfig = self.getZoneConfigByDomain(recordName, recordType)
         recordsToAdd = [
             dns.getRecordToAddEntry(recordName, recordType, recordContent, ttl)
         ]
-        return self.zoneUpdate(recordZone["zoneConfig"], recordsToAdd)
+        return self.__zoneUpdateForRecord(recordName, zoneConfig, recordsToAdd)
 
+    @apiOperation
     def deleteRecord(self, recordName, recordType, recordContent=None):
         """Delete existing records in an unknown zone."""
-        recordZone = self.getZoneByRecord(recordName, recordType, recordContent)
-        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
-            recordZone, recordName, recordType, None, recordContent
+        return self.__updateRecordZone(
+            recordName, recordType, None, recordContent, None, requireRecord=True
         )
-        return self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
 
+    @apiOperation
     def setRecord(
         self, recordName, recordType, recordContent, oldContent=None, ttl=600
     ):
         """Set or create a record in an unknown zone. Matching previous records are deleted."""
-        recordZone = self.getZoneByDomain(recordName, recordType, oldContent)
-        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
-            recordZone, recordName, recordType, recordContent, oldContent, ttl
+        return self.__updateRecordZone(
+            recordName, recordType, recordContent, oldContent, ttl
         )
-        return self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
 
+    @apiOperation
     def updateRecord(
         self, recordName, recordType, recordContent, oldContent=None, ttl=600
     ):
         """Update an existing record in an unknown zone. Matching previous records are deleted."""
-        recordZone = self.getZoneByRecord(recordName, recordType, oldContent)
+        return self.__updateRecordZone(
+            recordName, recordType, recordContent, oldContent, ttl, requireRecord=True
+        )
+
+    def __updateRecordZone(
+        self,
+        recordName,
+        recordType,
+        recordContent,
+        oldContent,
+        ttl,
+        requireRecord=False,
+    ):
+        """Replace records matching oldContent by recordContent in the zone of recordName.
+
+        The zone is read from the zone state cache if possible, so only the zoneUpdate
+        is sent. A failed update of a cached zone is repeated once with a fetched zone.
+        """
+        recordZone = self.__getZoneState(
+            recordName, recordType, oldContent, requireRecord
+        )
+        if recordZone is not None:
+            try:
+                return self.__zoneStateUpdate(
+                    recordZone, recordName, recordType, recordContent, oldContent, ttl
+                )
+            except (ObjectNotFoundError, ApiResponseError):
+                # e.g. a record to delete is gone, the cached zone was stale
+                self.__zoneStateCache.markStale()
+                self.__zoneStateCache.invalidate(recordZone["zoneConfig"].get("id"))
+
+        # the zoneUpdate only needs the id of the zone
+        recordZone = self.__getZoneForRecord(
+            recordName, recordType, oldContent, requireRecord, completeZoneConfig=False
+        )
         zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
             recordZone, recordName, recordType, recordContent, oldContent, ttl
         )
-        return self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        return self.__zoneUpdateForRecord(
+            recordName, zoneConfig, recordsToAdd, recordsToDelete
+        )
+
+    def __zoneStateUpdate(
+        self, recordZone, recordName, recordType, recordContent, oldContent, ttl
+    ):
+        """Update a cached zone, records changed by others meanwhile are fixed afterwards."""
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
+            recordZone, recordName, recordType, recordContent, oldContent, ttl
+        )
+        zone = self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        if dns.zoneUpdateMatches(recordZone, recordsToAdd, recordsToDelete, zone):
+            return zone
+
+        # the cached zone was stale, apply what is missing to the returned zone
+        self.__zoneStateCache.markStale()
+        zoneConfig, recordsToAdd, recordsToDelete = dns.getZoneUpdateFromZone(
+            zone, recordName, recordType, recordContent, oldContent, ttl
+        )
+        recordsToDelete = [
+            record
+            for record in recordsToDelete
+            if not recordContent or record["content"].lower() != recordContent.lower()
+        ]
+        recordsToAdd = [
+            record
+            for record in recordsToAdd
+            if not dns.zoneContainsRecord(
+                zone, recordName, recordType, record["content"]
+            )
+        ]
+        if recordsToAdd or recordsToDelete:
+            zone = self.zoneUpdate(zoneConfig, recordsToAdd, recordsToDelete)
+        return zone
 
@@ -43,3 +43,16 @@ class ApiResponseError(Error):
         self.url = url
         self.message = message
         self.errors = errors
+
+
+class DnsQueryError(Error):
+    """Exception raised for failed dns queries against a nameserver.
+
+    Attributes:
+        nameserver -- address of the queried nameserver
+        message -- explanation of the error
+    """
+
+    def __init__(self, nameserver, message):
+        self.nameserver = nameserver
+        self.message = message
@@ -0,0 +1,308 @@
+import asyncio
+import functools
+import logging
+import threading
+from time import monotonic
+import requests
+from hostingde.api.errors import ApiHttpStatusError, ApiResponseError
+
+try:
+    import contextvars
+except ImportError:  # Python 3.6
+    contextvars = None
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class ThreadLocalVar:
+    """Stand-in for contextvars.ContextVar before Python 3.7, values are kept per thread."""
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.__default = default
+        self.__local = threading.local()
+
+    def get(self):
+        return getattr(self.__local, "value", self.__default)
+
+    def set(self, value):
+        token = self.get()
+        self.__local.value = value
+        return token
+
+    def reset(self, token):
+        self.__local.value = token
+
+
+if contextvars is not None:
+    currentOperation = contextvars.ContextVar("hostingdeApiOperation", default=None)
+else:
+    currentOperation = ThreadLocalVar("hostingdeApiOperation")
+
+
+class ApiRequestEvent:
+    """A single api request, passed to the hooks before and after it is sent.
+
+    Every retry is a request of its own with an increased retry count.
+
+    Attributes:
+        path -- api path of the request, endpoint is its last part, e.g. zoneUpdate
+        operation -- client function the request was sent for, e.g. setRecord
+        retry -- number of previous attempts of the same call
+        duration -- seconds until the response was received and decoded
+        requestBytes -- size of the encoded request body
+        responseBytes -- size of the response body
+        statusCode -- http status code of the response or None
+        errorCode -- api error code, http_<status>, connection, timeout or invalid_response on errors
+        error -- the exception of a failed request or None
+        retrying -- if the failed request is going to be retried
+    """
+
+    def __init__(self, path, retry=0):
+        self.path = path
+        self.endpoint = path.rstrip("/").split("/")[-1]
+        self.operation = currentOperation.get() or self.endpoint
+        self.retry = retry
+        self.started = monotonic()
+        self.duration = None
+        self.requestBytes = 0
+        self.responseBytes = 0
+        self.statusCode = None
+        self.errorCode = None
+        self.error = None
+        self.retrying = False
+
+    def finish(self, error=None, retrying=False):
+        self.duration = monotonic() - self.started
+        self.error = error
+        self.errorCode = getErrorCode(error)
+        self.retrying = retrying
+
+
+class ApiHook:
+    """Base class of request hooks, e.g. DnsApiClient(hooks=[MetricsCollector()])
+
+    Hooks are called in the thread sending the request and have to be thread-safe
+    if the client is shared between threads.
+    """
+
+    def requestStarted(self, event):
+        pass
+
+    def requestFinished(self, event):
+        pass
+
+
+class MetricsCollector(ApiHook):
+    """In-memory counters and latency histograms per endpoint and client operation.
+
+        metrics = MetricsCollector()
+        client = DnsApiClient("MySecretLongApiKey", hooks=[metrics])
+        client.setRecord("demo.dev.example.org", "A", "127.0.0.1")
+        print(metrics.toPrometheus())
+
+    Attributes:
+        buckets -- upper bounds of the duration histogram buckets in seconds
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.__lock = threading.Lock()
+        self.__series = {}
+        self.__errors = {}
+
+    def requestFinished(self, event):
+        key = (event.endpoint, event.operation)
+        with self.__lock:
+            series = self.__series.get(key)
+            if series is None:
+                series = self.__series[key] = {
+                    "requests": 0,
+                    "retries": 0,
+                    "requestBytes": 0,
+                    "responseBytes": 0,
+                    "durationSum": 0.0,
+                    "durationBuckets": [0] * len(self.buckets),
+                }
+            series["requests"] += 1
+            if event.retry > 0:
+                series["retries"] += 1
+            series["requestBytes"] += event.requestBytes
+            series["responseBytes"] += event.responseBytes
+            series["durationSum"] += event.duration
+            for i, bucket in enumerate(self.buckets):
+                if event.duration <= bucket:
+                    series["durationBuckets"][i] += 1
+            if event.errorCode is not None:
+                errorKey = key + (event.errorCode,)
+                self.__errors[errorKey] = self.__errors.get(errorKey, 0) + 1
+
+    def getStats(self):
+        """Return a copy of all series by (endpoint, operation) and errors by (endpoint, operation, code)."""
+        with self.__lock:
+            series = {}
+            for key, values in self.__series.items():
+                series[key] = dict(
+                    values, durationBuckets=list(values["durationBuckets"])
+                )
+            return {"series": series, "errors": dict(self.__errors)}
+
+    def reset(self):
+        with self.__lock:
+            self.__series = {}
+            self.__errors = {}
+
+    def toPrometheus(self, prefix="hostingde_api"):
+        """Return all metrics in the Prometheus text exposition format."""
+        stats = self.getStats()
+        series = sorted(stats["series"].items())
+        lines = []
+
+        counters = (
+            ("requests_total", "requests", "Api requests sent, including retries."),
+            ("retries_total", "retries", "Api requests that were retries."),
+            ("request_bytes_total", "requestBytes", "Encoded api request bytes."),
+            ("response_bytes_total", "responseBytes", "Api response bytes."),
+        )
+        for name, field, description in counters:
+            lines.append("# HELP {}_{} {}".format(prefix, name, description))
+            lines.append("# TYPE {}_{} counter".format(prefix, name))
+            for key, values in series:
+                lines.append(
+                    "{}_{}{{{}}} {}".format(prefix, name, getLabels(key), values[field])
+                )
+
+        lines.append(
+            "# HELP {}_errors_total Failed api requests by error code.".format(prefix)
+        )
+        lines.append("# TYPE {}_errors_total counter".format(prefix))
+        for key, count in sorted(stats["errors"].items()):
+            lines.append(
+                '{}_errors_total{{{},code="{}"}} {}'.format(
+                    prefix, getLabels(key[:2]), escapeLabel(key[2]), count
+                )
+            )
+
+        name = prefix + "_request_duration_seconds"
+        lines.append("# HELP {} Api request duration in seconds.".format(name))
+        lines.append("# TYPE {} histogram".format(name))
+        for key, values in series:
+            labels = getLabels(key)
+            for bucket, count in zip(self.buckets, values["durationBuckets"]):
+                lines.append(
+                    '{}_bucket{{{},le="{}"}} {}'.format(name, labels, bucket, count)
+                )
+            lines.append(
+                '{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, values["requests"])
+            )
+            lines.append("{}_sum{{{}}} {}".format(name, labels, values["durationSum"]))
+            lines.append("{}_count{{{}}} {}".format(name, labels, values["requests"]))
+        return "\n".join(lines) + "\n"
+
+
+class LoggingHook(ApiHook):
+    """Log every api request at debug level and failed requests as warning."""
+
+    def __init__(self, logger=None):
+        self.logger = (
+            logger if logger is not None else logging.getLogger("hostingde.api")
+        )
+
+    def requestFinished(self, event):
+        if event.error is None:
+            self.logger.debug(
+                "%s ( %s ) took %.3fs, %d bytes sent, %d bytes received",
+                event.endpoint,
+                event.operation,
+                event.duration,
+                event.requestBytes,
+                event.responseBytes,
+            )
+            return
+        self.logger.warning(
+            "%s ( %s ) failed after %.3fs with %s, attempt %d%s",
+            event.endpoint,
+            event.operation,
+            event.duration,
+            event.errorCode,
+            event.retry + 1,
+            ", retrying" if event.retrying else "",
+        )
+
+
+def apiOperation(function):
+    """Label all api requests sent while function runs with its name.
+
+    Nested calls keep the label of the outermost function, so requests of
+    setRecord are counted for setRecord and not for getZoneByDomain.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if currentOperation.get() is not None:
+            return function(*args, **kwargs)
+        token = currentOperation.set(function.__name__)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            currentOperation.reset(token)
+
+    return wrapper
+
+
+def submitWithOperation(executor, function, *args):
+    """Submit function to executor, its requests keep the operation label of the caller."""
+    if contextvars is not None:
+        return executor.submit(contextvars.copy_context().run, function, *args)
+    return executor.submit(runWithOperation, currentOperation.get(), function, *args)
+
+
+def runWithOperation(operation, function, *args):
+    token = currentOperation.set(operation)
+    try:
+        return function(*args)
+    finally:
+        currentOperation.reset(token)
+
+
+def startApiRequestEvent(hooks, path, retry):
+    if not hooks:
+        return None
+    event = ApiRequestEvent(path, retry)
+    for hook in hooks:
+        hook.requestStarted(event)
+    return event
+
+
+def finishApiRequestEvent(hooks, event, error=None, retrying=False):
+    if event is None:
+        return
+    event.finish(error, retrying)
+    for hook in hooks:
+        hook.requestFinished(event)
+
+
+def getErrorCode(error):
+    if error is None:
+        return None
+    if isinstance(error, ApiResponseError):
+        if error.errors:
+            return str(error.errors[0].get("code", "api"))
+        return "api"
+    if isinstance(error, ApiHttpStatusError):
+        return "http_{}".format(error.status_code)
+    if isinstance(error, (requests.Timeout, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(error, ValueError):
+        return "invalid_response"
+    return "connection"
+
+
+def getLabels(key):
+    return 'endpoint="{}",operation="{}"'.format(
+        escapeLabel(key[0]), escapeLabel(key[1])
+    )
+
+
+def escapeLabel(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
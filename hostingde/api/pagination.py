@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from hostingde.api.metrics import submitWithOperation
+
+
+def iterFindResults(findFunction, findFilter, limit=100, sort=None, prefetch=False):
+    """Yield all objects returned by a paginated hosting.de find function.
+
+    findFunction is called as findFunction(findFilter, limit, page, sort), e.g. the
+    recordsFind, zonesFind or zoneConfigsFind functions of DnsApiClient.
+    Pages are requested lazily, only one page is held in memory at a time and no
+    further page is requested once totalEntries objects have been returned.
+
+    With prefetch enabled, the next page is requested in a background thread while
+    the objects of the current page are consumed.
+    """
+    if not prefetch:
+        page = 1
+        returned = 0
+        while True:
+            response = findFunction(findFilter, limit, page, sort)
+            for item in response["data"]:
+                yield item
+            returned += len(response["data"])
+            if not hasPendingEntries(response, returned):
+                return
+            page += 1
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    page = 1
+    returned = 0
+    pending = submitWithOperation(executor, findFunction, findFilter, limit, page, sort)
+    try:
+        while pending is not None:
+            response = pending.result()
+            returned += len(response["data"])
+            pending = None
+            if hasPendingEntries(response, returned):
+                page += 1
+                pending = submitWithOperation(
+                    executor, findFunction, findFilter, limit, page, sort
+                )
+            for item in response["data"]:
+                yield item
+    finally:
+        # do not wait for a prefetched page nobody is going to consume
+        if pending is not None:
+            pending.cancel()
+        executor.shutdown(wait=False)
+
+
+def iterStreamedFindResults(streamFunction, findFilter, limit=100, sort=None):
+    """Yield all objects returned by a paginated and streamed hosting.de find function.
+
+    streamFunction is called as streamFunction(findFilter, limit, page, sort) and has to
+    yield the objects of a page and return the response without data, e.g. the
+    recordsFindStream function of DnsApiClient. Not even a single page is held in memory.
+    """
+    page = 1
+    returned = 0
+    while True:
+        pageReturned = 0
+        items = streamFunction(findFilter, limit, page, sort)
+        while True:
+            try:
+                item = next(items)
+            except StopIteration as stop:
+                response = stop.value
+                break
+            pageReturned += 1
+            yield item
+        returned += pageReturned
+        if pageReturned == 0 or returned >= response["totalEntries"]:
+            return
+        page += 1
+
+
+def hasPendingEntries(response, returned):
+    """Check if a find response indicates further pages after returned objects."""
+    return len(response["data"]) > 0 and returned < response["totalEntries"]
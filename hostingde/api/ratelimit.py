@@ -0,0 +1,91 @@
+import threading
+from time import monotonic
+
+
+class RateLimiter:
+    """Token bucket limiting api requests per second and requests in flight.
+
+    A single limiter can be shared by any number of threads and DnsApiClient or
+    ApiSession instances, e.g. all clients using the same api key:
+
+        limiter = RateLimiter(rate=5, burst=10, maxInFlight=4)
+        clients = [DnsApiClient(apiKey, rateLimiter=limiter) for _ in range(8)]
+
+    Every request, including retries, takes one token. Tokens are refilled with rate
+    tokens per second up to burst tokens, requests wait until a token is available
+    and less than maxInFlight requests are running.
+
+    Attributes:
+        rate -- requests per second
+        burst -- maximum number of requests sent at once after being idle
+        maxInFlight -- maximum number of concurrent requests, None for no limit
+    """
+
+    def __init__(self, rate=10, burst=None, maxInFlight=None):
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.maxInFlight = maxInFlight
+        self.__tokens = float(self.burst)
+        self.__updated = monotonic()
+        self.__inFlight = 0
+        self.__waiting = 0
+        self.__condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        with self.__condition:
+            self.__waiting += 1
+            try:
+                while True:
+                    self.__refill()
+                    inFlightFree = (
+                        self.maxInFlight is None or self.__inFlight < self.maxInFlight
+                    )
+                    if inFlightFree and self.__tokens >= 1:
+                        self.__tokens -= 1
+                        self.__inFlight += 1
+                        return
+                    # wait for the next token or a finished request
+                    timeout = None
+                    if self.__tokens < 1:
+                        timeout = (1 - self.__tokens) / self.rate
+                    self.__condition.wait(timeout)
+            finally:
+                self.__waiting -= 1
+
+    def release(self):
+        """Mark a request acquired before as finished."""
+        with self.__condition:
+            self.__inFlight -= 1
+            self.__condition.notify_all()
+
+    def getWaitTime(self):
+        """Return the seconds until the next token is available."""
+        with self.__condition:
+            self.__refill()
+            if self.__tokens >= 1:
+                return 0.0
+            return (1 - self.__tokens) / self.rate
+
+    def getQueueDepth(self):
+        """Return the number of requests waiting for the limiter."""
+        with self.__condition:
+            return self.__waiting
+
+    def getInFlight(self):
+        """Return the number of requests currently running."""
+        with self.__condition:
+            return self.__inFlight
+
+    def __refill(self):
+        now = monotonic()
+        refilled = self.__tokens + (now - self.__updated) * self.rate
+        self.__tokens = min(self.burst, refilled)
+        self.__updated = now
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
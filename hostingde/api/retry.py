@@ -0,0 +1,128 @@
+import random
+from time import monotonic
+
+
+class RetryPolicy:
+    """Decides if and when a failed api request is sent again.
+
+    Delays grow exponentially from baseDelay by multiplier up to maxDelay. With jitter,
+    a random part of each delay is dropped, so clients failing at the same moment do
+    not retry at the same moment. No retry is started if it could not finish before
+    deadline seconds after the first request, and the timeout of every request is
+    capped at the time left until the deadline.
+
+    Writes ( zoneCreate, zoneRecreate, zoneUpdate, zoneDelete ) are only retried if
+    they have certainly not been processed: if no connection could be established,
+    on blocked objects and on writeRetryStatusCodes. A write that timed out, lost its
+    connection after it was established or failed with a server error may have been
+    applied already, sending it again could apply it twice.
+
+    Attributes:
+        maxRetries -- maximum number of retries after the first request
+        baseDelay -- delay before the first retry in seconds
+        maxDelay -- upper bound for a single delay in seconds
+        multiplier -- factor applied to the delay after each retry
+        jitter -- fraction of each delay that is randomized ( 0 - 1 )
+        deadline -- total time budget of a call including retries in seconds, None for no limit
+        retryErrorCodes -- api error codes worth a retry, e.g. 10205 object blocked
+        retryStatusCodes -- http status codes worth a retry
+        writeRetryStatusCodes -- http status codes worth a retry of writes
+        retryConnectionErrors -- retry on connection errors, writes only if no connection could be established
+        retryTimeouts -- retry reads if the api did not answer in time, the request may have been processed
+    """
+
+    def __init__(
+        self,
+        maxRetries=2,
+        baseDelay=2,
+        maxDelay=30,
+        multiplier=2,
+        jitter=0.5,
+        deadline=None,
+        retryErrorCodes=(10205,),
+        retryStatusCodes=(429, 500, 502, 503, 504),
+        retryConnectionErrors=True,
+        retryTimeouts=True,
+        writeRetryStatusCodes=(429,),
+    ):
+        self.maxRetries = maxRetries
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retryErrorCodes = set(retryErrorCodes)
+        self.retryStatusCodes = set(retryStatusCodes)
+        self.retryConnectionErrors = retryConnectionErrors
+        self.retryTimeouts = retryTimeouts
+        self.writeRetryStatusCodes = set(writeRetryStatusCodes)
+
+    @classmethod
+    def fixed(cls, maxRetries=2, delay=2):
+        """Policy of previous versions: fixed delay, only retry blocked objects."""
+        return cls(
+            maxRetries,
+            delay,
+            maxDelay=delay,
+            multiplier=1,
+            jitter=0,
+            retryStatusCodes=(),
+            retryConnectionErrors=False,
+            retryTimeouts=False,
+            writeRetryStatusCodes=(),
+        )
+
+    def isRetryableErrors(self, errors):
+        """Check if all errors of an api response are worth a retry."""
+        if len(errors) == 0:
+            return False
+        for error in errors:
+            if error.get("code") not in self.retryErrorCodes:
+                return False
+        return True
+
+    def isRetryableStatus(self, statusCode, write=False):
+        if write:
+            return statusCode in self.writeRetryStatusCodes
+        return statusCode in self.retryStatusCodes
+
+    def isRetryableConnectionError(self, connected, write=False):
+        """connected tells if the connection was established, the request may have been sent."""
+        if write and connected:
+            return False
+        return self.retryConnectionErrors
+
+    def isRetryableTimeout(self, write=False):
+        return self.retryTimeouts and not write
+
+    def getDelay(self, retry):
+        """Return the delay before the given retry ( starting with 0 )."""
+        delay = min(self.maxDelay, self.baseDelay * (self.multiplier**retry))
+        if self.jitter > 0:
+            delay -= random.uniform(0, delay * self.jitter)
+        return delay
+
+    def getRetryDelay(self, retry, started):
+        """Return the delay before the given retry or None if no retry is left.
+
+        started is the monotonic time of the first request of the call.
+        """
+        if retry >= self.maxRetries:
+            return None
+        delay = self.getDelay(retry)
+        if self.deadline is not None and monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def getRequestTimeout(self, timeout, started):
+        """Cap a requests timeout ( seconds or a (connect, read) tuple ) at the time left until the deadline."""
+        if self.deadline is None:
+            return timeout
+        left = max(0.001, self.deadline - (monotonic() - started))
+        if timeout is None:
+            return left
+        if isinstance(timeout, tuple):
+            return tuple(
+                min(part, left) if part is not None else left for part in timeout
+            )
+        return min(timeout, left)
@@ -0,0 +1,87 @@
+import copy
+import threading
+from time import monotonic
+
+
+class SingleFlight:
+    """Share the result of a call between all threads asking for the same key at once.
+
+    The first thread calling do with a key runs the function, threads calling do with
+    the same key before it has finished wait and receive the same result or exception:
+
+        flight = SingleFlight()
+        response = flight.do(("zonesFind", body), lambda: sendRequest(body))
+
+    Nothing is cached, a call started after the previous one has finished runs the
+    function again. If the result has been shared, every caller receives its own copy
+    made by copyResult, so callers may change it.
+
+    A caller passing notBefore ( a monotonic time, e.g. of its last write ) only joins
+    calls started at or after it, an older call runs the function again.
+
+    Attributes:
+        copyResult -- function copying a shared result, by default copy.deepcopy
+    """
+
+    def __init__(self, copyResult=copy.deepcopy):
+        self.copyResult = copyResult
+        self.__lock = threading.Lock()
+        self.__calls = {}
+        self.__started = 0
+        self.__shared = 0
+
+    def do(self, key, function, notBefore=None):
+        with self.__lock:
+            call = self.__calls.get(key)
+            running = call is not None and (
+                notBefore is None or call.started >= notBefore
+            )
+            if running:
+                call.waiting += 1
+                self.__shared += 1
+            else:
+                # a newer call replaces an older one for later callers
+                call = self.__calls[key] = SingleFlightCall()
+                self.__started += 1
+        if running:
+            return self.__wait(call)
+        return self.__run(key, call, function)
+
+    def __run(self, key, call, function):
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self.__lock:
+                if self.__calls.get(key) is call:
+                    del self.__calls[key]
+                shared = call.waiting > 0
+            call.done.set()
+        if call.error is not None:
+            raise call.error
+        return self.copyResult(call.result) if shared else call.result
+
+    def __wait(self, call):
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return self.copyResult(call.result)
+
+    def stats(self):
+        """Return the number of calls run and the number of calls that shared a running call."""
+        with self.__lock:
+            return {
+                "calls": self.__started,
+                "shared": self.__shared,
+                "inFlight": len(self.__calls),
+            }
+
+
+class SingleFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.started = monotonic()
+        self.waiting = 0
+        self.result = None
+        self.error = None
@@ -0,0 +1,320 @@
+import sqlite3
+import threading
+from time import time
+from hostingde.api.codec import getDefaultCodec
+from hostingde.api.errors import ObjectNotFoundError
+from hostingde.helpers import dns
+from hostingde.helpers import filters
+from hostingde.helpers.index import getNormalizedName
+from hostingde.helpers.models import getWireFormat
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS zones (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    nameUnicode TEXT NOT NULL,
+    lastChangeDate TEXT,
+    zoneConfig BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS zonesName ON zones (name);
+CREATE INDEX IF NOT EXISTS zonesNameUnicode ON zones (nameUnicode);
+CREATE TABLE IF NOT EXISTS records (
+    zoneConfigId TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recordsZone ON records (zoneConfigId);
+CREATE INDEX IF NOT EXISTS recordsNameType ON records (name, type);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ZoneSnapshot:
+    """Local SQLite copy of zones and records for lookups without api calls.
+
+    The snapshot is filled and refreshed by sync(), which lists all zone configs
+    ( without records ) and only fetches zones whose lastChangeDate moved since the
+    last sync. Zone and record names are indexed, so lookups like getZoneByDomain
+    or getRecords are answered locally:
+
+        snapshot = ZoneSnapshot("zones.sqlite")
+        snapshot.sync(client)
+        snapshot.getZoneConfig("demo.dev.example.org")  # -> zoneConfig of dev.example.org
+
+    A DnsApiClient with a snapshot ( see DnsApiClient.setSnapshot ) reads from it and
+    stores the zones returned by its own zone updates.
+    Zones and records are returned as api dicts.
+
+    Attributes:
+        path -- sqlite database file, ":memory:" keeps the snapshot in memory only
+        codec -- json codec used to store zone configs and records
+    """
+
+    def __init__(self, path=":memory:", codec=None):
+        self.path = path
+        self.codec = codec if codec is not None else getDefaultCodec()
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.executescript(SCHEMA)
+
+    def close(self):
+        self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # synchronisation
+
+    def sync(self, client, zoneConfigFilter=None, fullRefresh=False, zoneFilterSize=50):
+        """Fetch all zones that are new or changed since the last sync
+
+        Zones of the snapshot that do not exist anymore are removed, but only
+        without zoneConfigFilter. Returns the number of added, updated, removed
+        and unchanged zones.
+        """
+        knownZones = dict(self.__query("SELECT id, lastChangeDate FROM zones"))
+        changedIds = []
+        seenIds = set()
+        for zoneConfig in client.iterZoneConfigs(zoneConfigFilter):
+            seenIds.add(zoneConfig["id"])
+            if (
+                fullRefresh
+                or zoneConfig["id"] not in knownZones
+                or knownZones[zoneConfig["id"]] != zoneConfig.get("lastChangeDate")
+            ):
+                changedIds.append(zoneConfig["id"])
+
+        for i in range(0, len(changedIds), zoneFilterSize):
+            zoneFilter = filters.getZoneConfigIdListFilter(
+                changedIds[i : i + zoneFilterSize]
+            )
+            for zone in client.iterZones(zoneFilter, stream=True):
+                self.storeZone(zone)
+
+        removedIds = []
+        if zoneConfigFilter is None:
+            removedIds = [id for id in knownZones if id not in seenIds]
+            for zoneConfigId in removedIds:
+                self.removeZone(zoneConfigId)
+        self.__setMeta("lastSync", str(time()))
+
+        added = len([id for id in changedIds if id not in knownZones])
+        return {
+            "added": added,
+            "updated": len(changedIds) - added,
+            "removed": len(removedIds),
+            "unchanged": len(seenIds) - len(changedIds),
+        }
+
+    def getLastSync(self):
+        """Return the unix time of the last sync or None."""
+        rows = self.__query("SELECT value FROM meta WHERE key = 'lastSync'")
+        if len(rows) == 0:
+            return None
+        return float(rows[0][0])
+
+    def storeZone(self, zone):
+        """Add or replace a zone object including all of its records."""
+        zone = getWireFormat(zone)
+        zoneConfig = zone["zoneConfig"]
+        zoneConfigId = zoneConfig["id"]
+        records = [
+            (
+                zoneConfigId,
+                getNormalizedName(record["name"]),
+                record["type"].upper(),
+                record["content"],
+                self.codec.dumps(record),
+            )
+            for record in zone["records"]
+        ]
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM records WHERE zoneConfigId = ?", (zoneConfigId,)
+            )
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO zones VALUES (?, ?, ?, ?, ?)",
+                (
+                    zoneConfigId,
+                    getNormalizedName(zoneConfig["name"]),
+                    getNormalizedName(
+                        zoneConfig.get("nameUnicode") or zoneConfig["name"]
+                    ),
+                    zoneConfig.get("lastChangeDate"),
+                    self.codec.dumps(zoneConfig),
+                ),
+            )
+            self.__connection.executemany(
+                "INSERT INTO records VALUES (?, ?, ?, ?, ?)", records
+            )
+
+    def removeZone(self, zoneConfigId=None, zoneName=None):
+        """Remove a zone by id or name."""
+        if zoneConfigId is None:
+            zoneConfig = self.getZoneConfig(zoneName)
+            if zoneConfig is None:
+                return
+            zoneConfigId = zoneConfig["id"]
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM records WHERE zoneConfigId = ?", (zoneConfigId,)
+            )
+            self.__connection.execute("DELETE FROM zones WHERE id = ?", (zoneConfigId,))
+
+    # lookups
+
+    def getZoneConfig(self, zoneName):
+        """Return the zone config of a zone by name or None."""
+        name = getNormalizedName(zoneName)
+        rows = self.__query(
+            "SELECT zoneConfig FROM zones WHERE name = ? OR nameUnicode = ?",
+            (name, name),
+        )
+        if len(rows) == 0:
+            return None
+        return self.codec.loads(rows[0][0])
+
+    def getZoneConfigs(self, recordName):
+        """Return the zone configs of all zones owning recordName, deepest zone first."""
+        domains = dns.getRecordDomainList(getNormalizedName(recordName))
+        if len(domains) == 0:
+            return []
+        placeholders = ", ".join("?" * len(domains))
+        rows = self.__query(
+            "SELECT zoneConfig, nameUnicode FROM zones"
+            " WHERE name IN ({0}) OR nameUnicode IN ({0})".format(placeholders),
+            domains + domains,
+        )
+        rows.sort(key=lambda row: row[1].count("."), reverse=True)
+        return [self.codec.loads(row[0]) for row in rows]
+
+    def getZone(self, zoneConfigId):
+        """Return a zone with all records by zoneConfig id or None."""
+        rows = self.__query(
+            "SELECT zoneConfig FROM zones WHERE id = ?", (zoneConfigId,)
+        )
+        if len(rows) == 0:
+            return None
+        records = self.__query(
+            "SELECT record FROM records WHERE zoneConfigId = ? ORDER BY rowid",
+            (zoneConfigId,),
+        )
+        return {
+            "zoneConfig": self.codec.loads(rows[0][0]),
+            "records": [self.codec.loads(row[0]) for row in records],
+        }
+
+    def getZoneByName(self, zoneName):
+        """Return a zone with all records by name or None."""
+        zoneConfig = self.getZoneConfig(zoneName)
+        if zoneConfig is None:
+            return None
+        return self.getZone(zoneConfig["id"])
+
+    def getRecords(
+        self, recordName, recordType=None, recordContent=None, zoneConfigId=None
+    ):
+        """Return all records named recordName, optionally of a type, content and zone."""
+        query = "SELECT record FROM records WHERE name = ?"
+        parameters = [getNormalizedName(recordName)]
+        if recordType:
+            query += " AND type = ?"
+            parameters.append(recordType.upper())
+        if recordContent:
+            query += " AND lower(content) = ?"
+            parameters.append(recordContent.lower())
+        if zoneConfigId:
+            query += " AND zoneConfigId = ?"
+            parameters.append(zoneConfigId)
+        rows = self.__query(query + " ORDER BY rowid", parameters)
+        return [self.codec.loads(row[0]) for row in rows]
+
+    def getZoneByDomain(self, recordName, recordType=None, recordContent=None):
+        """Return the best matching zone for a record like DnsApiClient.getZoneByDomain"""
+        zoneConfig = self.getZoneConfigByDomain(recordName, recordType, recordContent)
+        return self.getZone(zoneConfig["id"])
+
+    def getZoneConfigByDomain(self, recordName, recordType=None, recordContent=None):
+        """Return the zone config of the zone getZoneByDomain returns, without its records."""
+        zones = self.__getRecordZones(recordName)
+        recordZone = dns.getBestZoneForRecord(
+            zones, recordName, recordType, recordContent
+        )
+        return recordZone["zoneConfig"]
+
+    def getZoneByRecord(self, recordName, recordType=None, recordContent=None):
+        """Return the best zone containing a record like DnsApiClient.getZoneByRecord"""
+        zones = [
+            zone
+            for zone in self.__getRecordZones(recordName)
+            if dns.zoneContainsRecord(zone, recordName, recordType, recordContent)
+        ]
+        if len(zones) == 0:
+            raise ObjectNotFoundError("Could not find any zone matching the filter.")
+        recordZone = dns.getBestZoneForRecord(zones, recordName, recordType)
+        return self.getZone(recordZone["zoneConfig"]["id"])
+
+    def __getRecordZones(self, recordName):
+        # owning zones with only the records named recordName, enough to rank them
+        zoneConfigs = self.getZoneConfigs(recordName)
+        if len(zoneConfigs) == 0:
+            raise ObjectNotFoundError("Could not find any zone matching the filter.")
+        return [
+            {
+                "zoneConfig": zoneConfig,
+                "records": self.getRecords(recordName, zoneConfigId=zoneConfig["id"]),
+            }
+            for zoneConfig in zoneConfigs
+        ]
+
+    def iterZoneConfigs(self):
+        for row in self.__iterQuery("SELECT zoneConfig FROM zones ORDER BY name"):
+            yield self.codec.loads(row[0])
+
+    def iterRecords(self, recordType=None):
+        """Yield all records of the snapshot, optionally only of a type."""
+        if recordType:
+            rows = self.__iterQuery(
+                "SELECT record FROM records WHERE type = ? ORDER BY rowid",
+                (recordType.upper(),),
+            )
+        else:
+            rows = self.__iterQuery("SELECT record FROM records ORDER BY rowid")
+        for row in rows:
+            yield self.codec.loads(row[0])
+
+    def __len__(self):
+        return self.__query("SELECT count(*) FROM zones")[0][0]
+
+    def __query(self, query, parameters=()):
+        with self.__lock:
+            return self.__connection.execute(query, parameters).fetchall()
+
+    def __iterQuery(self, query, parameters=(), size=1000):
+        # rows are fetched in batches, the lock is not held while they are consumed
+        with self.__lock:
+            cursor = self.__connection.execute(query, parameters)
+        try:
+            while True:
+                with self.__lock:
+                    rows = cursor.fetchmany(size)
+                if len(rows) == 0:
+                    return
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def __setMeta(self, key, value):
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value)
+            )
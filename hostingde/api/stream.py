@@ -0,0 +1,192 @@
+import re
+from hostingde.api.codec import JsonCodec
+
+STRUCTURE_PATTERN = re.compile(rb'[\[\]{}",:]')
+STRING_PATTERN = re.compile(rb'["\\]')
+# everything up to the next bracket, skipping complete strings
+ITEM_PATTERN = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+WHITESPACE = b" \t\r\n"
+
+
+class FindResponseParser:
+    """Incremental parser for find responses, returning response.data items as they arrive.
+
+    Chunks of the http body are passed to feed(), which returns the items of the
+    data array that are complete. Only the current item and the response without
+    its data are held in memory, so the peak memory usage does not depend on the
+    number of items. After the last chunk, close() returns the parsed response
+    without items ( data is an empty list ), which contains status and errors.
+
+        parser = FindResponseParser()
+        for chunk in response.iter_content(65536):
+            for record in parser.feed(chunk):
+                ...
+        body = parser.close()
+
+    Attributes:
+        codec -- json codec used to decode single items and the remaining response
+        path -- keys of the array to stream, by default response.data
+    """
+
+    def __init__(self, codec=None, path=("response", "data")):
+        self.codec = codec if codec is not None else JsonCodec()
+        self.path = tuple(path)
+        self.__buffer = bytearray()
+        self.__skeleton = []
+        # every open container is [opening bracket, current key, expecting a key]
+        self.__stack = []
+        self.__pos = 0
+        self.__emitted = 0
+        self.__stringStart = None
+        self.__itemStart = None
+        self.__itemDepth = None
+        self.__dataDepth = None
+
+    def feed(self, chunk):
+        """Parse the next chunk of the body and return all items completed by it."""
+        self.__buffer += chunk
+        items = []
+        buffer = self.__buffer
+        while True:
+            if self.__stringStart is not None:
+                if not self.__scanString():
+                    break
+                continue
+
+            if self.__dataDepth == len(self.__stack):
+                if self.__itemStart is None:
+                    self.__findItemStart()
+                if self.__itemDepth is not None:
+                    if not self.__scanItem():
+                        break
+                    self.__finishItem(self.__pos, items)
+                    continue
+
+            match = STRUCTURE_PATTERN.search(buffer, self.__pos)
+            if match is None:
+                self.__pos = len(buffer)
+                break
+            index = match.start()
+            char = buffer[index : index + 1]
+            self.__pos = index + 1
+            if char == b'"':
+                self.__stringStart = index
+            elif char == b"{" or char == b"[":
+                if char == b"[" and self.__isStreamedPath():
+                    self.__dataDepth = len(self.__stack) + 1
+                self.__stack.append([char, None, char == b"{"])
+            elif char == b"}" or char == b"]":
+                if self.__dataDepth == len(self.__stack):
+                    self.__finishItem(index, items)
+                    self.__dataDepth = None
+                if not self.__stack:
+                    raise ValueError("Unexpected {} in response.".format(char))
+                self.__stack.pop()
+            elif char == b",":
+                if self.__dataDepth == len(self.__stack):
+                    self.__finishItem(index, items)
+                    self.__emitted = index + 1
+                elif self.__stack and self.__stack[-1][0] == b"{":
+                    self.__stack[-1][2] = True
+            elif char == b":" and self.__stack:
+                self.__stack[-1][2] = False
+        self.__trimBuffer()
+        return items
+
+    def close(self):
+        """Return the response without the streamed items, after all chunks were fed."""
+        if self.__stack or self.__stringStart is not None:
+            raise ValueError("Response ended unexpectedly.")
+        self.__skeleton.append(bytes(self.__buffer[self.__emitted :]))
+        return self.codec.loads(b"".join(self.__skeleton))
+
+    def __scanString(self):
+        buffer = self.__buffer
+        while True:
+            match = STRING_PATTERN.search(buffer, self.__pos)
+            if match is None:
+                self.__pos = len(buffer)
+                return False
+            index = match.start()
+            if buffer[index : index + 1] == b"\\":
+                if index + 1 >= len(buffer):
+                    # the escaped character is part of the next chunk
+                    self.__pos = index
+                    return False
+                self.__pos = index + 2
+                continue
+            self.__pos = index + 1
+            container = self.__stack[-1] if self.__stack else None
+            if container is not None and container[0] == b"{" and container[2]:
+                key = bytes(buffer[self.__stringStart : index + 1])
+                container[1] = self.codec.loads(key)
+            self.__stringStart = None
+            return True
+
+    def __findItemStart(self):
+        buffer = self.__buffer
+        index = self.__pos
+        while index < len(buffer) and buffer[index] in WHITESPACE:
+            index += 1
+        if index < len(buffer) and buffer[index : index + 1] not in (b",", b"]"):
+            self.__skeleton.append(bytes(buffer[self.__emitted : index]))
+            self.__emitted = index
+            self.__itemStart = index
+            if buffer[index : index + 1] in (b"{", b"["):
+                # objects and arrays are skipped as a whole until their closing bracket
+                self.__itemDepth = 0
+                self.__pos = index
+
+    def __scanItem(self):
+        buffer = self.__buffer
+        while True:
+            end = ITEM_PATTERN.match(buffer, self.__pos).end()
+            if end >= len(buffer) or buffer[end : end + 1] == b'"':
+                # the next bracket or the end of a string is part of the next chunk
+                self.__pos = end
+                return False
+            self.__pos = end + 1
+            if buffer[end : end + 1] in (b"{", b"["):
+                self.__itemDepth += 1
+                continue
+            self.__itemDepth -= 1
+            if self.__itemDepth == 0:
+                self.__itemDepth = None
+                return True
+
+    def __finishItem(self, end, items):
+        if self.__itemStart is None:
+            return
+        item = bytes(self.__buffer[self.__itemStart : end])
+        items.append(self.codec.loads(item))
+        self.__itemStart = None
+        self.__emitted = end
+
+    def __isStreamedPath(self):
+        if len(self.__stack) != len(self.path):
+            return False
+        for container, key in zip(self.__stack, self.path):
+            if container[0] != b"{" or container[1] != key:
+                return False
+        return True
+
+    def __trimBuffer(self):
+        # drop everything that is parsed and not part of the current item or string
+        cut = self.__pos
+        if self.__itemStart is not None:
+            cut = min(cut, self.__itemStart)
+        if self.__stringStart is not None:
+            cut = min(cut, self.__stringStart)
+        if self.__itemStart is None and self.__emitted < cut:
+            self.__skeleton.append(bytes(self.__buffer[self.__emitted : cut]))
+            self.__emitted = cut
+        cut = min(cut, self.__emitted)
+        if cut == 0:
+            return
+        del self.__buffer[:cut]
+        self.__pos -= cut
+        self.__emitted -= cut
+        if self.__itemStart is not None:
+            self.__itemStart -= cut
+        if self.__stringStart is not None:
+            self.__stringStart -= cut
@@ -0,0 +1,306 @@
+"""Command line interface for bulk record operations and zone exports.
+
+    hostingde-dns apply < operations.jsonl
+    hostingde-dns apply --format csv --workers 8 < operations.csv
+    hostingde-dns export records --zone example.org --format csv
+
+The api key is read from --api-key-file or the HOSTINGDE_API_KEY environment variable.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import requests
+from hostingde.api.batch import RecordOperation
+from hostingde.api.codec import getAvailableCodecs, getCodec, getDefaultCodec
+from hostingde.api.dns import DnsApiClient
+from hostingde.api.errors import Error
+from hostingde.helpers import filters
+
+OPERATION_FIELDS = ("action", "name", "type", "content", "oldContent", "ttl", "zone")
+RECORD_FIELDS = ("name", "type", "content", "ttl", "priority", "zoneConfigId")
+
+
+def main(argv=None):
+    args = getArgumentParser().parse_args(argv)
+    codec = getCodec(args.codec) if args.codec else getDefaultCodec()
+    try:
+        apiKey = getApiKey(args)
+    except (IOError, ValueError) as e:
+        sys.stderr.write("hostingde-dns: {}\n".format(e))
+        return 2
+
+    output = getattr(sys.stdout, "buffer", sys.stdout)
+    with DnsApiClient(apiKey, baseUrl=args.base_url, codec=codec) as client:
+        try:
+            return args.run(client, args, codec, output)
+        except (Error, requests.RequestException) as e:
+            sys.stderr.write("hostingde-dns: {}\n".format(getErrorMessage(e)))
+            return 1
+
+
+def getArgumentParser():
+    parser = argparse.ArgumentParser(
+        prog="hostingde-dns", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--api-key-file", help="file containing the api key")
+    parser.add_argument("--base-url", default="https://secure.hosting.de")
+    parser.add_argument("--codec", choices=getAvailableCodecs(), default=None)
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    apply = commands.add_parser(
+        "apply",
+        help="apply record operations read from stdin, one result line per operation",
+        description=(
+            "Read record operations from stdin as json lines or csv with the "
+            + "columns {}. Operations are applied in chunks, grouped by zone and "
+            + "sent in parallel for different zones."
+        ).format(", ".join(OPERATION_FIELDS)),
+    )
+    apply.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    apply.add_argument(
+        "--default-action",
+        choices=("add", "delete", "set"),
+        help="action of operations without action",
+    )
+    apply.add_argument("--ttl", type=int, default=600, help="default ttl")
+    apply.add_argument("--workers", type=int, default=4, help="zones updated at once")
+    apply.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="operations read and applied at once, limits memory usage",
+    )
+    apply.add_argument(
+        "--no-merge",
+        dest="merge",
+        action="store_false",
+        help="send a zone update per operation instead of one per zone and chunk",
+    )
+    apply.set_defaults(run=runApply)
+
+    export = commands.add_parser("export", help="write zones or records to stdout")
+    exports = export.add_subparsers(dest="object")
+    exports.required = True
+    for name, run, limit in (
+        ("zone-configs", runExportZoneConfigs, 100),
+        ("zones", runExportZones, 5),
+        ("records", runExportRecords, 1000),
+    ):
+        exportParser = exports.add_parser(
+            name, help="export {} page by page".format(name)
+        )
+        exportParser.add_argument("--zone", help="only export the zone with this name")
+        exportParser.add_argument("--filter", help="api filter as json")
+        exportParser.add_argument("--limit", type=int, default=limit, help="page size")
+        if name == "records":
+            exportParser.add_argument(
+                "--format", choices=("jsonl", "csv"), default="jsonl"
+            )
+        exportParser.set_defaults(run=run)
+    return parser
+
+
+def getApiKey(args):
+    if args.api_key_file:
+        with open(args.api_key_file) as keyFile:
+            apiKey = keyFile.read().strip()
+    else:
+        apiKey = os.environ.get("HOSTINGDE_API_KEY", "").strip()
+    if not apiKey:
+        raise ValueError("no api key, use --api-key-file or HOSTINGDE_API_KEY")
+    return apiKey
+
+
+# apply
+
+
+def runApply(client, args, codec, output):
+    """Apply operations chunk by chunk, writing results as soon as a zone is done."""
+    rows = iterInputRows(args.format, codec)
+    failed = 0
+    while True:
+        chunk = list(itertools.islice(rows, args.chunk_size))
+        if len(chunk) == 0:
+            break
+        operations = []
+        lines = {}
+        for line, row in chunk:
+            try:
+                operation = getRecordOperation(row, args.default_action, args.ttl)
+            except ValueError as e:
+                failed += 1
+                writeLine(output, codec, getInvalidResult(line, row, e))
+                continue
+            lines[id(operation)] = line
+            operations.append(operation)
+
+        for result in client.applyRecordOperations(
+            operations, args.workers, args.merge
+        ):
+            if not result.success:
+                failed += 1
+            writeLine(output, codec, getResult(lines[id(result.operation)], result))
+    return 1 if failed else 0
+
+
+def iterInputRows(inputFormat, codec):
+    """Yield (line number, row) for every operation read from stdin."""
+    if inputFormat == "csv":
+        stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        reader = csv.DictReader(stdin)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, content in enumerate(sys.stdin.buffer, 1):
+        content = content.strip()
+        if not content or content.startswith(b"#"):
+            continue
+        try:
+            yield line, codec.loads(content)
+        except ValueError as e:
+            yield line, e
+
+
+def getRecordOperation(row, defaultAction=None, defaultTtl=600):
+    if isinstance(row, Exception):
+        raise ValueError("invalid json: {}".format(row))
+    if not isinstance(row, dict):
+        raise ValueError("operation is not an object")
+    row = dict((key, value) for key, value in row.items() if value not in ("", None))
+    row.setdefault("action", defaultAction)
+    for field in ("action", "name", "type"):
+        if not row.get(field):
+            raise ValueError("missing {}".format(field))
+    for field in ("action", "name", "type", "content", "oldContent", "zone"):
+        if field in row and not isinstance(row[field], str):
+            raise ValueError("{} is not a string".format(field))
+    if row["action"] in ("add", "set") and not row.get("content"):
+        raise ValueError("missing content")
+    try:
+        ttl = int(row.get("ttl", defaultTtl))
+    except (TypeError, ValueError):
+        raise ValueError("ttl is not an integer")
+    return RecordOperation(
+        row["action"],
+        row["name"],
+        row["type"].upper(),
+        row.get("content"),
+        row.get("oldContent"),
+        ttl,
+        row.get("zone"),
+    )
+
+
+def getResult(line, result):
+    operation = result.operation
+    return {
+        "line": line,
+        "action": operation.action,
+        "name": operation.recordName,
+        "type": operation.recordType,
+        "content": operation.recordContent,
+        "zone": result.zoneConfig["name"] if result.zoneConfig else None,
+        "changed": result.changed,
+        "success": result.success,
+        "error": getErrorMessage(result.error) if result.error else None,
+    }
+
+
+def getInvalidResult(line, row, error):
+    if not isinstance(row, dict):
+        row = {}
+    return {
+        "line": line,
+        "action": row.get("action"),
+        "name": row.get("name"),
+        "type": row.get("type"),
+        "content": row.get("content"),
+        "zone": row.get("zone"),
+        "changed": False,
+        "success": False,
+        "error": "invalid operation: {}".format(error),
+    }
+
+
+# export
+
+
+def runExportZoneConfigs(client, args, codec, output):
+    zoneConfigFilter = getExportFilter(args, codec, "ZoneName")
+    for zoneConfig in client.iterZoneConfigs(zoneConfigFilter, args.limit, stream=True):
+        writeLine(output, codec, zoneConfig)
+    return 0
+
+
+def runExportZones(client, args, codec, output):
+    zoneFilter = getExportFilter(args, codec, "ZoneName")
+    for zone in client.iterZones(zoneFilter, args.limit, stream=True):
+        writeLine(output, codec, zone)
+    return 0
+
+
+def runExportRecords(client, args, codec, output):
+    recordFilter = getExportFilter(args, codec, None)
+    if args.zone:
+        zoneConfigs = list(
+            client.iterZoneConfigs(filters.getFilter("ZoneName", args.zone))
+        )
+        if len(zoneConfigs) == 0:
+            sys.stderr.write("hostingde-dns: zone {} not found\n".format(args.zone))
+            return 1
+        zoneFilter = filters.getFilter("ZoneConfigId", zoneConfigs[0]["id"])
+        recordFilter = combineFilters(zoneFilter, recordFilter)
+
+    records = client.iterRecords(recordFilter, args.limit, stream=True)
+    if args.format == "jsonl":
+        for record in records:
+            writeLine(output, codec, record)
+        return 0
+
+    stdout = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    writer = csv.DictWriter(stdout, RECORD_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+    stdout.flush()
+    stdout.detach()
+    return 0
+
+
+def getExportFilter(args, codec, zoneField):
+    exportFilter = codec.loads(args.filter.encode("utf-8")) if args.filter else None
+    if args.zone and zoneField:
+        exportFilter = combineFilters(
+            filters.getFilter(zoneField, args.zone), exportFilter
+        )
+    return exportFilter
+
+
+def combineFilters(requestFilter, otherFilter):
+    if otherFilter is None:
+        return requestFilter
+    return filters.getAndFilter([requestFilter, otherFilter])
+
+
+def writeLine(output, codec, item):
+    output.write(codec.dumps(item) + b"\n")
+    output.flush()
+
+
+def getErrorMessage(error):
+    message = getattr(error, "message", None) or str(error)
+    errors = getattr(error, "errors", None)
+    if errors:
+        message += " " + ", ".join(
+            "[{}] {}".format(e.get("code"), e.get("text")) for e in errors
+        )
+    return message
+
+
+if __name__ == "__main__":
+    sys.exit(main())
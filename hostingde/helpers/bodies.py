@@ -0,0 +1,43 @@
+from hostingde.helpers.models import getWireFormat
+
+
+def getCommonFilterBody(authToken, requestFilter, limit, page, sort):
+    return {
+        "authToken": authToken,
+        "filter": requestFilter,
+        "limit": limit,
+        "page": page,
+        "sort": sort,
+    }
+
+
+def getZoneCreateBody(
+    authToken, zoneConfig, records, useDefaultNameserverSet=False, nameserverSetId=None
+):
+    data = {
+        "authToken": authToken,
+        "zoneConfig": getWireFormat(zoneConfig),
+        "records": getWireFormat(records),
+        "useDefaultNameserverSet": useDefaultNameserverSet,
+    }
+    if nameserverSetId:
+        data["nameserverSetId"] = nameserverSetId
+    return data
+
+
+def getZoneConfigBody(zoneConfigId=None, zoneConfigName=None):
+    data = {}
+    if zoneConfigId:
+        data["zoneConfigId"] = zoneConfigId
+    elif zoneConfigName:
+        data["zoneConfigName"] = zoneConfigName
+    return data
+
+
+def getZoneUpdateBody(authToken, zoneConfig, recordsToAdd, recordsToDelete=[]):
+    return {
+        "authToken": authToken,
+        "zoneConfig": getWireFormat(zoneConfig),
+        "recordsToAdd": getWireFormat(recordsToAdd),
+        "recordsToDelete": getWireFormat(recordsToDelete),
+    }
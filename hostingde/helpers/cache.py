@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from hostingde.helpers import dns
+from hostingde.helpers.index import getNormalizedName
+
+
+class TtlCache:
+    """Thread-safe least recently used cache with a time to live per entry.
+
+    Attributes:
+        maxSize -- maximum number of entries, the least recently used entry is evicted first
+        ttl -- seconds an entry stays valid after it has been set
+    """
+
+    def __init__(self, maxSize=1024, ttl=300):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get(self, key, default=None):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self.__entries[key]
+                self.__misses += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[1]
+
+    def peek(self, key, default=None):
+        """Return a valid entry without counting a hit or miss and without touching its position."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] < monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        with self.__lock:
+            self.__entries[key] = (monotonic() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxSize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictions": self.__evictions,
+                "size": len(self.__entries),
+            }
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class ZoneStateCache:
+    """Complete zones by zoneConfig id, kept fresh from the zones returned by zone writes.
+
+    Entries are versioned by the lastChangeDate of their zoneConfig: an older zone
+    never replaces a newer one, and a zoneConfig seen with a newer lastChangeDate in
+    other responses makes the entry stale, so it is dropped. Record names are mapped
+    to the zone resolved for them, so the zone of a known record name is returned
+    without any api call.
+
+    Attributes:
+        maxSize -- maximum number of zones, the least recently used zone is evicted first
+        ttl -- seconds a zone is used after it has been stored
+    """
+
+    def __init__(self, maxSize=64, ttl=300):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.__zones = TtlCache(maxSize, ttl)
+        self.__zoneIds = TtlCache(maxSize * 64, ttl)
+        self.__lock = threading.Lock()
+        self.__stale = 0
+
+    def getZone(self, recordName):
+        """Return the zone resolved for a record name or zone name, None if unknown."""
+        zoneConfigId = self.__zoneIds.peek(getNormalizedName(recordName))
+        if zoneConfigId is None:
+            return None
+        return self.__zones.get(zoneConfigId)
+
+    def getZoneById(self, zoneConfigId):
+        return self.__zones.get(zoneConfigId)
+
+    def store(self, zone, recordName=None):
+        """Store a complete zone, returns False if a newer version is stored already."""
+        zoneConfig = zone["zoneConfig"]
+        zoneConfigId = zoneConfig.get("id")
+        if not zoneConfigId:
+            return False
+        with self.__lock:
+            current = self.__zones.peek(zoneConfigId)
+            if current is not None and getZoneVersion(current) > getZoneVersion(zone):
+                return False
+            self.__zones.set(zoneConfigId, dns.getIndexedZone(zone))
+            for name in (zoneConfig.get("name"), zoneConfig.get("nameUnicode")):
+                if name:
+                    self.__zoneIds.set(getNormalizedName(name), zoneConfigId)
+        if recordName is not None:
+            self.mapRecordName(recordName, zoneConfigId)
+        return True
+
+    def refresh(self, zone):
+        """Replace a stored zone with a newer version, zones not stored are ignored."""
+        zoneConfigId = zone["zoneConfig"].get("id")
+        if zoneConfigId is not None and self.__zones.peek(zoneConfigId) is not None:
+            self.store(zone)
+
+    def mapRecordName(self, recordName, zoneConfigId):
+        self.__zoneIds.set(getNormalizedName(recordName), zoneConfigId)
+
+    def observe(self, zoneConfig):
+        """Drop the stored zone if zoneConfig shows that it has been changed since."""
+        zoneConfigId = zoneConfig.get("id")
+        with self.__lock:
+            current = self.__zones.peek(zoneConfigId)
+            if current is None:
+                return
+            if getZoneVersion({"zoneConfig": zoneConfig}) > getZoneVersion(current):
+                self.__zones.invalidate(zoneConfigId)
+                self.__stale += 1
+
+    def markStale(self):
+        """Count a stored zone found to be outdated by the response of a write."""
+        with self.__lock:
+            self.__stale += 1
+
+    def invalidate(self, zoneConfigId=None, zoneName=None):
+        if zoneConfigId is None and zoneName is not None:
+            zoneConfigId = self.__zoneIds.peek(getNormalizedName(zoneName))
+        if zoneConfigId is not None:
+            self.__zones.invalidate(zoneConfigId)
+
+    def clear(self):
+        self.__zones.clear()
+        self.__zoneIds.clear()
+
+    def stats(self):
+        stats = self.__zones.stats()
+        stats["stale"] = self.__stale
+        return stats
+
+    def __len__(self):
+        return len(self.__zones)
+
+
+def getZoneVersion(zone):
+    return zone["zoneConfig"].get("lastChangeDate") or ""
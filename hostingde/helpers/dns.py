@@ -1,3 +1,44 @@
+from collections import Counter, OrderedDict
+from hostingde.helpers.index import RecordIndex, ZoneIndex, getNormalizedName
+
+
+class IndexedZone(dict):
+    """Zone kept by the client itself ( zone caches, batches ) with a RecordIndex of its records.
+
+    The zone holds its own copies of the records in a tuple, so they cannot be changed
+    in place. Records are only replaced by assigning zone["records"], which drops the
+    index, it is built again by the next lookup. Zones returned to callers are plain
+    dicts, the helpers build the index of those once per call.
+    """
+
+    def __init__(self, zone):
+        super(IndexedZone, self).__init__(zone)
+        self["records"] = zone["records"]
+
+    def __setitem__(self, key, value):
+        if key == "records":
+            value = tuple(dict(record) for record in value)
+            self.recordIndex = None
+        super(IndexedZone, self).__setitem__(key, value)
+
+    def getRecordIndex(self):
+        if self.recordIndex is None:
+            self.recordIndex = RecordIndex(self["records"])
+        return self.recordIndex
+
+
+def getIndexedZone(zone):
+    if isinstance(zone, IndexedZone):
+        return zone
+    return IndexedZone(zone)
+
+
+def getZoneRecordIndex(zone):
+    if isinstance(zone, IndexedZone):
+        return zone.getRecordIndex()
+    return RecordIndex(zone["records"])
+
+
 def getZoneConfig(name=None, id=None):
     if name:
         return {"name": name}
@@ -42,36 +83,88 @@ def getBestZoneForRecord(zones, recordName, recordType=None, recordContent=None)
         return None
     if len(zones) == 1:
         return zones[0]
-    # reorder zhe zones by path depth ( determined by dots )
-    sortedZones = getZonesOrderedByDepth(zones)
 
-    # return the first zone with a matching recordName [and recordType]
-    for zone in sortedZones:
-        if zoneContainsRecord(zone, recordName, recordType, recordContent):
-            return zone
+    # prefer the zone containing the most exact match of name, type and content,
+    # the deepest zone ( determined by dots ) wins between equally matching zones
+    bestZone = None
+    bestRank = None
+    for zone in zones:
+        rank = (
+            getZoneRecordMatchLevel(zone, recordName, recordType, recordContent),
+            getZoneDepth(zone),
+        )
+        if bestRank is None or rank > bestRank:
+            bestZone = zone
+            bestRank = rank
+
+    return bestZone
 
-    # if no exact match has been found with recordContent, iterate again,
-    # to search for a match without recordContent
-    if recordContent:
-        for zone in sortedZones:
-            if zoneContainsRecord(zone, recordName, recordType):
-                return zone
 
-    # if no exact match has been found with recordType, iterate one last time, to check for a match based on name only
-    # to search for a match without recordType
-    if recordType:
-        for zone in sortedZones:
-            if zoneContainsRecord(zone, recordName):
-                return zone
+def getZoneRecordMatchLevel(zone, recordName, recordType=None, recordContent=None):
+    """Rank how exact a zone contains a record
 
-    # return the deepest zone if none contains the given record
-    return sortedZones[0]
+    0 - no record with recordName
+    1 - record with recordName, but different recordType
+    2 - record with recordName and recordType, but different recordContent
+    3 - record matching all given properties
+    """
+    recordIndex = getZoneRecordIndex(zone)
+    if recordIndex.contains(recordName, recordType, recordContent):
+        return 3
+    if recordIndex.contains(recordName, recordType):
+        return 2
+    if recordIndex.contains(recordName):
+        return 1
+    return 0
+
+
+def getZoneDepth(zone):
+    return zone["zoneConfig"]["nameUnicode"].count(".")
 
 
 def getZonesOrderedByDepth(zones):
-    return sorted(
-        zones, key=lambda x: (x["zoneConfig"]["nameUnicode"].count(".")), reverse=True
-    )
+    return sorted(zones, key=getZoneDepth, reverse=True)
+
+
+# targeted lookups - zones resolved from recordsFind and zoneConfigsFind results
+
+
+def getRecordsNamed(records, recordName):
+    name = recordName.lower()
+    return [record for record in records if record["name"].lower() == name]
+
+
+def getNamedRecordZones(records):
+    """Group records by zone, the zoneConfig of the returned zones only contains the id."""
+    zones = OrderedDict()
+    for record in records:
+        zoneConfigId = record["zoneConfigId"]
+        if zoneConfigId not in zones:
+            zones[zoneConfigId] = {"zoneConfig": {"id": zoneConfigId}, "records": []}
+        zones[zoneConfigId]["records"].append(record)
+    return list(zones.values())
+
+
+def getZonesContainingRecord(zones, recordName, recordType=None, recordContent=None):
+    return [
+        zone
+        for zone in zones
+        if zoneContainsRecord(zone, recordName, recordType, recordContent)
+    ]
+
+
+def getBestRecordZones(zones, recordName, recordType=None, recordContent=None):
+    """Return the zones containing the most exact match, more than one if only their depth decides."""
+    levels = [
+        getZoneRecordMatchLevel(zone, recordName, recordType, recordContent)
+        for zone in zones
+    ]
+    return [zone for zone, level in zip(zones, levels) if level == max(levels)]
+
+
+def getOwningZoneConfigs(zoneConfigs, recordName):
+    """Return the zone configs whose zone owns recordName, deepest first."""
+    return ZoneIndex(zoneConfigs).getZoneConfigs(recordName)
 
 
 def zoneRecordMatches(record, recordName, recordType=None, recordContent=None):
@@ -87,18 +180,11 @@ def zoneRecordMatches(record, recordName, recordType=None, recordContent=None):
 
 
 def zoneContainsRecord(zone, recordName, recordType=None, recordContent=None):
-    for record in zone["records"]:
-        if zoneRecordMatches(record, recordName, recordType, recordContent):
-            return True
-    return False
+    return getZoneRecordIndex(zone).contains(recordName, recordType, recordContent)
 
 
 def getMatchingRecordsFromZone(zone, recordName, recordType=None, recordContent=None):
-    zoneRecords = []
-    for record in zone["records"]:
-        if zoneRecordMatches(record, recordName, recordType, recordContent):
-            zoneRecords.append(record)
-    return zoneRecords
+    return getZoneRecordIndex(zone).getRecords(recordName, recordType, recordContent)
 
 
 def getZoneUpdateFromZone(
@@ -123,3 +209,88 @@ def getZoneUpdateFromZone(
         recordsToAdd = [getRecordToAddEntry(recordName, recordType, recordContent, ttl)]
 
     return (zoneConfig, recordsToAdd, recordsToDelete)
+
+
+def zoneUpdateMatches(zone, recordsToAdd, recordsToDelete, updatedZone):
+    """Check if updatedZone has exactly the records of zone with the update applied
+
+    A zone update response with other records shows that the zone has been changed by
+    someone else since zone was fetched.
+    """
+    expected = Counter(getReconcileRecordKey(record) for record in zone["records"])
+    for record in recordsToDelete:
+        expected[getReconcileRecordKey(record)] = 0
+    expected.update(getReconcileRecordKey(record) for record in recordsToAdd)
+    return +expected == Counter(
+        getReconcileRecordKey(record) for record in updatedZone["records"]
+    )
+
+
+def getZoneReconcileUpdate(zone, desiredRecords, recordTypes=None, ttl=8400):
+    """Compute the minimal zone update turning the records of a zone into desiredRecords
+
+    Records are compared by name, type and content ( case insensitive like
+    zoneRecordMatches ) with hashed sets, instead of matching every desired record
+    against the whole zone. A record with a different ttl is deleted and added again,
+    desired records without ttl keep the ttl of the existing record or use ttl.
+
+    Only records of recordTypes are managed, by default all types except SOA.
+    Returns (zoneConfig, recordsToAdd, recordsToDelete) like getZoneUpdateFromZone,
+    both lists are empty if the zone already matches.
+    """
+    if recordTypes is not None:
+        recordTypes = {recordType.upper() for recordType in recordTypes}
+
+    currentRecords = {}
+    for record in zone["records"]:
+        if isManagedRecordType(record["type"], recordTypes):
+            currentRecords.setdefault(getReconcileRecordKey(record), record)
+
+    wantedRecords = {}
+    for record in desiredRecords:
+        if not isManagedRecordType(record["type"], recordTypes):
+            raise ValueError(
+                "Desired record {} has unmanaged type {}.".format(
+                    record["name"], record["type"]
+                )
+            )
+        wantedRecords[getReconcileRecordKey(record)] = record
+
+    recordsToDelete = []
+    for key, record in currentRecords.items():
+        wanted = wantedRecords.get(key)
+        if wanted is None or not recordTtlMatches(record, wanted):
+            recordsToDelete.append(getRecordToDeleteEntryFromRecord(record))
+
+    recordsToAdd = []
+    for key, record in wantedRecords.items():
+        current = currentRecords.get(key)
+        if current is not None and recordTtlMatches(current, record):
+            continue
+        recordTtl = record.get("ttl") or ttl
+        recordsToAdd.append(
+            getRecordToAddEntry(
+                record["name"], record["type"], record["content"], recordTtl
+            )
+        )
+
+    return (zone["zoneConfig"], recordsToAdd, recordsToDelete)
+
+
+def getReconcileRecordKey(record):
+    return (
+        getNormalizedName(record["name"]),
+        record["type"].lower(),
+        record["content"].lower(),
+    )
+
+
+def isManagedRecordType(recordType, recordTypes=None):
+    if recordTypes is None:
+        return recordType.upper() != "SOA"
+    return recordType.upper() in recordTypes
+
+
+def recordTtlMatches(currentRecord, desiredRecord):
+    ttl = desiredRecord.get("ttl")
+    return ttl is None or ttl == currentRecord.get("ttl")
@@ -36,8 +36,22 @@ def getRecordFilter(recordName, recordType=None, recordContent=None):
     return getAndFilter(recordFilters)
 
 
+def getNamedRecordFilter(recordName, zoneConfigId=None):
+    recordFilters = [getFilter("RecordName", recordName)]
+    if zoneConfigId is not None:
+        recordFilters.append(getFilter("ZoneConfigId", zoneConfigId))
+    return getAndFilter(recordFilters)
+
+
 def getZoneDomainListFilter(domains):
     filters = []
     for domain in domains:
         filters.append(getFilter("ZoneNameUnicode", domain))
     return getOrFilter(filters)
+
+
+def getZoneConfigIdListFilter(zoneConfigIds):
+    filters = []
+    for zoneConfigId in zoneConfigIds:
+        filters.append(getFilter("ZoneConfigId", zoneConfigId))
+    return getOrFilter(filters)
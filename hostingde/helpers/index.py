@@ -0,0 +1,138 @@
+def getNormalizedName(name):
+    return name.rstrip(".").lower()
+
+
+class RecordIndex:
+    """Hashed index of the records of a zone.
+
+    Records are indexed by lowercase (name), (name, type) and (name, type, content),
+    the same comparison done by hostingde.helpers.dns.zoneRecordMatches, so finding
+    matching records is a dictionary lookup instead of a scan over all records.
+    Matching records are returned in the order of the zone.
+    """
+
+    def __init__(self, records):
+        self.__byName = {}
+        self.__byType = {}
+        self.__byContent = {}
+        for record in records:
+            name = record["name"].lower()
+            type = record["type"].lower()
+            content = record["content"].lower()
+            self.__byName.setdefault(name, []).append(record)
+            self.__byType.setdefault((name, type), []).append(record)
+            self.__byContent.setdefault((name, type, content), []).append(record)
+
+    def getRecords(self, recordName, recordType=None, recordContent=None):
+        name = recordName.lower()
+        if recordType is None:
+            records = self.__byName.get(name, [])
+            if recordContent is None:
+                return list(records)
+            content = recordContent.lower()
+            return [r for r in records if r["content"].lower() == content]
+        if recordContent is None:
+            return list(self.__byType.get((name, recordType.lower()), []))
+        key = (name, recordType.lower(), recordContent.lower())
+        return list(self.__byContent.get(key, []))
+
+    def contains(self, recordName, recordType=None, recordContent=None):
+        name = recordName.lower()
+        if recordType is None:
+            if recordContent is None:
+                return name in self.__byName
+            return len(self.getRecords(recordName, None, recordContent)) > 0
+        if recordContent is None:
+            return (name, recordType.lower()) in self.__byType
+        return (name, recordType.lower(), recordContent.lower()) in self.__byContent
+
+
+class ZoneIndex:
+    """Index of zone configs answering which zones own a given record name.
+
+    Zone names are stored in a trie of reversed labels, e.g. "dev.example.org" is
+    stored as org -> example -> dev, so finding the owning zones of a name needs one
+    dictionary lookup per label, independent of the number of zones.
+
+    The index is built once from zoneConfigsFind or zonesFind results:
+
+        index = ZoneIndex(client.iterZoneConfigs(None))
+        index.getZoneConfig("demo.dev.example.org")  # -> zoneConfig of dev.example.org
+    """
+
+    def __init__(self, zoneConfigs=()):
+        self.__root = [{}, None]
+        self.__size = 0
+        for zoneConfig in zoneConfigs:
+            self.add(zoneConfig)
+
+    @classmethod
+    def fromZones(cls, zones):
+        return cls(zone["zoneConfig"] for zone in zones)
+
+    def add(self, zoneConfig):
+        """Add a zone config by name and unicode name."""
+        if self.__findZoneConfig(zoneConfig["name"]) is None:
+            self.__size += 1
+        for name in getZoneConfigNames(zoneConfig):
+            node = self.__root
+            for label in reversed(name.split(".")):
+                node = node[0].setdefault(label, [{}, None])
+            node[1] = zoneConfig
+
+    def remove(self, zoneName):
+        """Remove a zone config by name, returns the removed zone config or None."""
+        zoneConfig = self.__findZoneConfig(zoneName)
+        if zoneConfig is None:
+            return None
+        for name in getZoneConfigNames(zoneConfig):
+            self.__findNode(name)[1] = None
+        self.__size -= 1
+        return zoneConfig
+
+    def getZoneConfig(self, recordName):
+        """Return the deepest zone config owning recordName or None."""
+        zoneConfigs = self.getZoneConfigs(recordName)
+        if len(zoneConfigs) == 0:
+            return None
+        return zoneConfigs[0]
+
+    def getZoneConfigs(self, recordName):
+        """Return all zone configs owning recordName, deepest zone first."""
+        zoneConfigs = []
+        node = self.__root
+        for label in reversed(getNormalizedName(recordName).split(".")):
+            node = node[0].get(label)
+            if node is None:
+                break
+            if node[1] is not None:
+                zoneConfigs.append(node[1])
+        zoneConfigs.reverse()
+        return zoneConfigs
+
+    def __findZoneConfig(self, zoneName):
+        node = self.__findNode(getNormalizedName(zoneName))
+        if node is None:
+            return None
+        return node[1]
+
+    def __findNode(self, name):
+        node = self.__root
+        for label in reversed(name.split(".")):
+            node = node[0].get(label)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, zoneName):
+        return self.__findZoneConfig(zoneName) is not None
+
+    def __len__(self):
+        return self.__size
+
+
+def getZoneConfigNames(zoneConfig):
+    names = {getNormalizedName(zoneConfig["name"])}
+    if zoneConfig.get("nameUnicode"):
+        names.add(getNormalizedName(zoneConfig["nameUnicode"]))
+    return names
@@ -0,0 +1,248 @@
+from sys import intern
+from hostingde.helpers.index import getNormalizedName
+
+
+class ApiObject:
+    """Base of the compact api object types, readable and writable like api dicts.
+
+    Known fields of the api object are stored in __slots__ instead of a dict per
+    object, unknown fields are kept in extra. Fields are read with object["name"]
+    or object.name, toDict() returns the api wire format again.
+    Fields set to None are treated as missing and omitted by toDict().
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = ()
+    FIELD_SET = frozenset()
+
+    @classmethod
+    def fromDict(cls, data):
+        fields = {}
+        extra = None
+        for key, value in data.items():
+            if key in cls.FIELD_SET:
+                fields[key] = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        return cls(extra=extra, **fields)
+
+    def toDict(self):
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = getWireFormat(value)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def keys(self):
+        return self.toDict().keys()
+
+    def get(self, key, default=None):
+        value = self.__getValue(key)
+        return default if value is None else value
+
+    def __getValue(self, key):
+        if key in self.FIELD_SET:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key)
+        return None
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELD_SET:
+            setattr(self, key, value)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __contains__(self, key):
+        return self.__getValue(key) is not None
+
+    def __eq__(self, other):
+        if isinstance(other, ApiObject):
+            other = other.toDict()
+        return self.toDict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self.toDict())
+
+
+class Record(ApiObject):
+    """Record object - https://www.hosting.de/api/#the-record-object
+
+    type and zone ids are interned, so records of the same zone share these strings.
+    normalizedName is the lowercase name without trailing dot.
+    """
+
+    __slots__ = (
+        "id",
+        "zoneId",
+        "zoneConfigId",
+        "recordTemplateId",
+        "name",
+        "type",
+        "content",
+        "ttl",
+        "priority",
+        "lastChangeDate",
+        "normalizedName",
+    )
+    FIELDS = __slots__[:-1]
+    FIELD_SET = frozenset(FIELDS)
+
+    def __init__(
+        self,
+        name,
+        type,
+        content,
+        ttl=None,
+        priority=None,
+        id=None,
+        zoneId=None,
+        zoneConfigId=None,
+        recordTemplateId=None,
+        lastChangeDate=None,
+        extra=None,
+    ):
+        self.id = id
+        self.zoneId = getInterned(zoneId)
+        self.zoneConfigId = getInterned(zoneConfigId)
+        self.recordTemplateId = recordTemplateId
+        self.name = name
+        self.type = getInterned(type)
+        self.content = content
+        self.ttl = ttl
+        self.priority = priority
+        self.lastChangeDate = lastChangeDate
+        self.normalizedName = getSharedNormalizedName(name)
+        self.extra = extra
+
+
+class ZoneConfig(ApiObject):
+    """ZoneConfig object - https://www.hosting.de/api/#the-zoneconfig-object
+
+    normalizedName is the lowercase unicode name without trailing dot.
+    """
+
+    __slots__ = (
+        "id",
+        "accountId",
+        "name",
+        "nameUnicode",
+        "masterIp",
+        "type",
+        "emailAddress",
+        "zoneTransferWhitelist",
+        "lastChangeDate",
+        "dnsSecMode",
+        "soaValues",
+        "templateValues",
+        "normalizedName",
+    )
+    FIELDS = __slots__[:-1]
+    FIELD_SET = frozenset(FIELDS)
+
+    def __init__(
+        self,
+        id=None,
+        accountId=None,
+        name=None,
+        nameUnicode=None,
+        masterIp=None,
+        type=None,
+        emailAddress=None,
+        zoneTransferWhitelist=None,
+        lastChangeDate=None,
+        dnsSecMode=None,
+        soaValues=None,
+        templateValues=None,
+        extra=None,
+    ):
+        self.id = getInterned(id)
+        self.accountId = accountId
+        self.name = name
+        self.nameUnicode = nameUnicode
+        self.masterIp = masterIp
+        self.type = type
+        self.emailAddress = emailAddress
+        self.zoneTransferWhitelist = zoneTransferWhitelist
+        self.lastChangeDate = lastChangeDate
+        self.dnsSecMode = dnsSecMode
+        self.soaValues = soaValues
+        self.templateValues = templateValues
+        self.normalizedName = None
+        if nameUnicode or name:
+            self.normalizedName = getSharedNormalizedName(nameUnicode or name)
+        self.extra = extra
+
+
+class Zone(ApiObject):
+    """Zone object with ZoneConfig and Record objects - https://www.hosting.de/api/#the-zone-object"""
+
+    __slots__ = ("zoneConfig", "records")
+    FIELDS = ("zoneConfig", "records")
+    FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, zoneConfig=None, records=None, extra=None):
+        self.zoneConfig = zoneConfig
+        self.records = records
+        self.extra = extra
+
+    @classmethod
+    def fromDict(cls, data):
+        zone = super(Zone, cls).fromDict(data)
+        if zone.zoneConfig is not None:
+            zone.zoneConfig = ZoneConfig.fromDict(zone.zoneConfig)
+        if zone.records is not None:
+            zone.records = [Record.fromDict(record) for record in zone.records]
+        return zone
+
+
+def getInterned(value):
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+def getSharedNormalizedName(name):
+    # most names are normalized already, so no second string is needed
+    normalizedName = getNormalizedName(name)
+    if normalizedName == name:
+        return name
+    return normalizedName
+
+
+def getWireFormat(value):
+    """Convert api objects, also inside lists, back to the dicts sent to the api."""
+    if isinstance(value, ApiObject):
+        return value.toDict()
+    if isinstance(value, list):
+        return [getWireFormat(item) for item in value]
+    return value
+
+
+def iterApiObjects(items, objectType):
+    """Convert the items of a streamed find function, keeping its return value."""
+    while True:
+        try:
+            item = next(items)
+        except StopIteration as stop:
+            return stop.value
+        yield objectType.fromDict(item)
@@ -0,0 +1,69 @@
+from time import monotonic, sleep
+from hostingde.api.errors import DnsQueryError
+from hostingde.helpers import resolver
+
+
+def getAuthoritativeNameservers(zoneName, resolverAddress, timeout=3):
+    """Find the addresses of the nameservers of a zone, returns a list of (host, port)."""
+    host, port = resolver.parseNameserverAddress(resolverAddress)
+    nameservers = []
+    for _, recordType, nameserver in resolver.query(
+        zoneName, resolver.TYPE_NS, host, port, timeout
+    ):
+        if recordType != resolver.TYPE_NS:
+            continue
+        for _, addressType, address in resolver.query(
+            nameserver, resolver.TYPE_A, host, port, timeout
+        ):
+            if addressType == resolver.TYPE_A and (address, 53) not in nameservers:
+                nameservers.append((address, 53))
+    return nameservers
+
+
+def txtRecordIsVisible(recordName, recordContent, nameserver, timeout=3):
+    """Check if a nameserver answers a TXT query with the given content."""
+    host, port = nameserver
+    try:
+        answers = resolver.query(
+            recordName, resolver.TYPE_TXT, host, port, timeout, recursive=False
+        )
+    except DnsQueryError:
+        return False
+    for _, recordType, content in answers:
+        if recordType == resolver.TYPE_TXT and content == recordContent:
+            return True
+    return False
+
+
+def waitForTxtRecords(records, timeout, initialDelay=1, maxDelay=10, queryTimeout=3):
+    """Poll nameservers until all of them answer with the expected TXT records.
+
+    records is a list of (recordName, recordContent, nameservers) tuples, where
+    nameservers is a list of (host, port). Nameservers that already answered
+    correctly are not queried again, the delay between rounds doubles up to maxDelay.
+
+    Returns True once every nameserver answers all records, False after timeout seconds.
+    """
+    pending = [
+        (recordName, recordContent, nameserver)
+        for recordName, recordContent, nameservers in records
+        for nameserver in nameservers
+    ]
+    deadline = monotonic() + timeout
+    delay = initialDelay
+    while True:
+        pending = [
+            (recordName, recordContent, nameserver)
+            for recordName, recordContent, nameserver in pending
+            if not txtRecordIsVisible(
+                recordName, recordContent, nameserver, queryTimeout
+            )
+        ]
+        if len(pending) == 0:
+            return True
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, maxDelay)
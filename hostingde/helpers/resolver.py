@@ -0,0 +1,174 @@
+"""Minimal dns client for A, NS and TXT queries against a given nameserver.
+
+Only the standard library is used, queries are sent by udp and repeated by tcp
+if the answer was truncated.
+"""
+
+import random
+import socket
+import struct
+from hostingde.api.errors import DnsQueryError
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_TXT = 16
+CLASS_IN = 1
+
+
+def getSystemNameserver(resolvConf="/etc/resolv.conf"):
+    """Return the first nameserver of resolv.conf or 127.0.0.1."""
+    try:
+        with open(resolvConf) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except (IOError, OSError):
+        pass
+    return "127.0.0.1"
+
+
+def parseNameserverAddress(address, defaultPort=53):
+    """Split "host", "host:port", "[v6]:port" or "v6" into (host, port)."""
+    if address.startswith("["):
+        host, _, port = address[1:].partition("]")
+        return host, int(port.lstrip(":") or defaultPort)
+    if address.count(":") == 1:
+        host, port = address.split(":")
+        return host, int(port)
+    return address, defaultPort
+
+
+def query(name, recordType, nameserver, port=53, timeout=3, recursive=True):
+    """Query a nameserver, returns a list of answer and authority records.
+
+    Records are returned as (name, type, data) tuples, data is an ip address for A,
+    a name for NS and the joined character strings for TXT records.
+    """
+    queryId = random.randint(0, 0xFFFF)
+    message = getQueryMessage(queryId, name, recordType, recursive)
+    try:
+        # socket.gaierror of unknown nameserver hosts is a socket.error as well
+        family = socket.getaddrinfo(nameserver, port, 0, socket.SOCK_DGRAM)[0][0]
+        response = sendUdpQuery(message, family, nameserver, port, timeout)
+        if struct.unpack("!H", response[2:4])[0] & 0x0200:
+            response = sendTcpQuery(message, family, nameserver, port, timeout)
+    except (socket.error, socket.timeout) as e:
+        raise DnsQueryError(nameserver, "Query for {} failed: {}".format(name, e))
+    return parseResponseMessage(queryId, response, nameserver)
+
+
+def getQueryMessage(queryId, name, recordType, recursive=True):
+    flags = 0x0100 if recursive else 0x0000
+    header = struct.pack("!HHHHHH", queryId, flags, 1, 0, 0, 0)
+    question = encodeName(name) + struct.pack("!HH", recordType, CLASS_IN)
+    return header + question
+
+
+def encodeName(name):
+    encoded = b""
+    for label in name.rstrip(".").split("."):
+        if label:
+            label = label.encode("idna")
+            encoded += struct.pack("!B", len(label)) + label
+    return encoded + b"\x00"
+
+
+def sendUdpQuery(message, family, nameserver, port, timeout):
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        sock.sendto(message, (nameserver, port))
+        return sock.recv(65535)
+    finally:
+        sock.close()
+
+
+def sendTcpQuery(message, family, nameserver, port, timeout):
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect((nameserver, port))
+        sock.sendall(struct.pack("!H", len(message)) + message)
+        length = struct.unpack("!H", receiveExactly(sock, 2))[0]
+        return receiveExactly(sock, length)
+    finally:
+        sock.close()
+
+
+def receiveExactly(sock, length):
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise socket.error("Connection closed by nameserver.")
+        data += chunk
+    return data
+
+
+def parseResponseMessage(queryId, message, nameserver):
+    try:
+        responseId, flags, qdCount, anCount, nsCount, _ = struct.unpack(
+            "!HHHHHH", message[:12]
+        )
+        if responseId != queryId:
+            raise DnsQueryError(nameserver, "Response id does not match query.")
+        rcode = flags & 0x000F
+        if rcode == 3:
+            return []
+        if rcode != 0:
+            raise DnsQueryError(nameserver, "Query failed with rcode {}.".format(rcode))
+
+        offset = 12
+        for _ in range(qdCount):
+            _, offset = decodeName(message, offset)
+            offset += 4
+
+        records = []
+        for _ in range(anCount + nsCount):
+            name, offset = decodeName(message, offset)
+            recordType, _, _, length = struct.unpack(
+                "!HHIH", message[offset : offset + 10]
+            )
+            offset += 10
+            data = decodeRecordData(message, offset, length, recordType)
+            if data is not None:
+                records.append((name, recordType, data))
+            offset += length
+        return records
+    except (struct.error, IndexError):
+        raise DnsQueryError(nameserver, "Could not parse dns response.")
+
+
+def decodeRecordData(message, offset, length, recordType):
+    if recordType == TYPE_A:
+        return socket.inet_ntoa(message[offset : offset + 4])
+    if recordType == TYPE_NS:
+        return decodeName(message, offset)[0]
+    if recordType == TYPE_TXT:
+        strings = []
+        end = offset + length
+        while offset < end:
+            size = struct.unpack("!B", message[offset : offset + 1])[0]
+            strings.append(message[offset + 1 : offset + 1 + size])
+            offset += 1 + size
+        return b"".join(strings).decode("utf-8", "replace")
+    return None
+
+
+def decodeName(message, offset):
+    """Decode a possibly compressed name, returns (name, offset after the name)."""
+    labels = []
+    end = None
+    for _ in range(128):
+        size = struct.unpack("!B", message[offset : offset + 1])[0]
+        if size & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = struct.unpack("!H", message[offset : offset + 2])[0] & 0x3FFF
+            continue
+        if size == 0:
+            return ".".join(labels), end if end is not None else offset + 1
+        labels.append(message[offset + 1 : offset + 1 + size].decode("ascii"))
+        offset += 1 + size
+    raise IndexError("Too many labels in dns name.")
@@ -2,18 +2,23 @@
 
 """
 import logging
+import time
 import zope.interface
 
 from certbot import interfaces
 from certbot import errors
 from certbot.plugins import dns_common
 
+from hostingde.api.batch import ZoneChangeBatch
 from hostingde.api.dns import DnsApiClient
 from hostingde.api.errors import (
     ObjectNotFoundError,
     ApiHttpStatusError,
     ApiResponseError,
+    DnsQueryError,
 )
+from hostingde.helpers import propagation
+from hostingde.helpers import resolver
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +32,15 @@ class Authenticator(dns_common.DNSAuthenticator):
 
     ttl = 60
 
+    # number of zones updated concurrently
+    workers = 4
+
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
         self.credentials = None
+        self._apiClient = None
+        # zoneConfig per added validation record, so cleanup does not need to fetch zones
+        self._validationZones = {}
 
     @classmethod
     def add_parser_arguments(cls, add):  # pylint: disable=arguments-differ
@@ -37,6 +48,25 @@ class Authenticator(dns_common.DNSAuthenticator):
             add, default_propagation_seconds=60
         )
         add("credentials", help="Path to Hosting.de API Key file.", default=None)
+        add(
+            "propagation-mode",
+            help="fixed: always wait propagation-seconds, poll: query the nameservers of "
+            + "the zone until they answer, at most propagation-seconds.",
+            choices=["fixed", "poll"],
+            default="fixed",
+        )
+        add(
+            "resolver",
+            help="Resolver address used to find the nameservers of a zone in poll mode. "
+            + "[default: first nameserver of /etc/resolv.conf]",
+            default=None,
+        )
+        add(
+            "nameservers",
+            help="Comma separated nameserver addresses ( host or host:port ) polled "
+            + "instead of the nameservers of the zone in poll mode.",
+            default=None,
+        )
 
     def more_info(self):  # pylint: disable=missing-docstring,no-self-use
         return (
@@ -52,6 +82,138 @@ class Authenticator(dns_common.DNSAuthenticator):
         )
         dns_common.validate_file_permissions(self.conf("credentials"))
 
+    def perform(self, achalls):
+        """Add the TXT records of all challenges with one zone update per zone."""
+        self._setup_credentials()
+        self._attempt_cleanup = True
+
+        batch = ZoneChangeBatch(self._getApiClient(), workers=self.workers)
+        responses = []
+        for achall in achalls:
+            domain = achall.domain
+            validation_domain_name = achall.validation_domain_name(domain)
+            validation = achall.validation(achall.account_key)
+            logger.debug(
+                "Attempting to perform domain validation for: [ domain: %s, validation_domain: %s, validation: %s ]",
+                domain,
+                validation_domain_name,
+                validation,
+            )
+            batch.add(
+                validation_domain_name, "TXT", '"{}"'.format(validation), self.ttl
+            )
+            responses.append(achall.response(achall.account_key))
+
+        results = batch.commit()
+        for result in results:
+            if result.success:
+                self._rememberValidationZone(
+                    result.operation.recordName,
+                    result.operation.recordContent,
+                    result.zoneConfig,
+                )
+        self._raiseBatchErrors(results, "adding")
+
+        if self.conf("propagation-mode") == "poll":
+            self._waitForPropagation(results)
+        else:
+            self._waitPropagationSeconds()
+        return responses
+
+    def _waitPropagationSeconds(self):
+        # DNS updates take time to propagate and checking to see if the update has occurred
+        # is not reliable, so we sleep for the configured amount of time
+        logger.info(
+            "Waiting %d seconds for DNS changes to propagate",
+            self.conf("propagation-seconds"),
+        )
+        time.sleep(self.conf("propagation-seconds"))
+
+    def _waitForPropagation(self, results):
+        """Poll the nameservers of all zones until they answer the validation records."""
+        timeout = self.conf("propagation-seconds")
+        records = []
+        zoneNameservers = {}
+        try:
+            for result in results:
+                zoneName = result.zoneConfig["name"]
+                if zoneName not in zoneNameservers:
+                    zoneNameservers[zoneName] = self._getPropagationNameservers(
+                        zoneName
+                    )
+                records.append(
+                    (
+                        result.operation.recordName,
+                        result.operation.recordContent.strip('"'),
+                        zoneNameservers[zoneName],
+                    )
+                )
+        except DnsQueryError as e:
+            logger.warning(
+                "Could not find nameservers to poll [{}]: {}".format(
+                    e.nameserver, e.message
+                )
+            )
+            return self._waitPropagationSeconds()
+
+        logger.info(
+            "Waiting up to %d seconds for DNS changes to propagate to %d zones",
+            timeout,
+            len(zoneNameservers),
+        )
+        if not propagation.waitForTxtRecords(records, timeout):
+            logger.warning(
+                "DNS changes did not propagate to all nameservers within %d seconds",
+                timeout,
+            )
+
+    def _getPropagationNameservers(self, zoneName):
+        if self.conf("nameservers"):
+            return [
+                resolver.parseNameserverAddress(address.strip())
+                for address in self.conf("nameservers").split(",")
+            ]
+        resolverAddress = self.conf("resolver") or resolver.getSystemNameserver()
+        nameservers = propagation.getAuthoritativeNameservers(zoneName, resolverAddress)
+        if len(nameservers) == 0:
+            raise DnsQueryError(
+                resolverAddress, "No nameservers found for zone {}.".format(zoneName)
+            )
+        return nameservers
+
+    def cleanup(self, achalls):
+        """Delete the TXT records of all challenges with one zone update per zone."""
+        if not self._attempt_cleanup:
+            return
+
+        batch = ZoneChangeBatch(self._getApiClient(), workers=self.workers)
+        for achall in achalls:
+            domain = achall.domain
+            validation_domain_name = achall.validation_domain_name(domain)
+            validation = achall.validation(achall.account_key)
+            logger.debug(
+                "Attempting to cleanup domain validation for: [ domain: %s, validation_domain: %s, validation: %s ]",
+                domain,
+                validation_domain_name,
+                validation,
+            )
+            content = '"{}"'.format(validation)
+            zoneConfig = self._popValidationZone(validation_domain_name, content)
+            batch.delete(validation_domain_name, "TXT", content, zoneConfig=zoneConfig)
+
+        self._raiseBatchErrors(batch.commit(), "deleting")
+
+    def _raiseBatchErrors(self, results, action):
+        failed = [result for result in results if not result.success]
+        for result in failed:
+            logger.error(
+                "Encountered error {} TXT record. [{}]: {}".format(
+                    action, result.operation.recordName, result.error.message
+                )
+            )
+        if len(failed) > 0:
+            raise self._getPluginErrorFromException(failed[0].error)
+
     def _perform(self, domain, validation_domain_name, validation):
         logger.debug(
             "Attempting to perform domain validation for: [ domain: %s, validation_domain: %s, validation: %s ]",
@@ -59,9 +221,13 @@ class Authenticator(dns_common.DNSAuthenticator):
             validation_domain_name,
             validation,
         )
+        content = '"{}"'.format(validation)
         try:
-            self._getApiClient().addRecord(
-                validation_domain_name, "TXT", '"{}"'.format(validation), self.ttl
+            zone = self._getApiClient().addRecord(
+                validation_domain_name, "TXT", content, self.ttl
+            )
+            self._rememberValidationZone(
+                validation_domain_name, content, zone["zoneConfig"]
             )
         except (ObjectNotFoundError, ApiHttpStatusError, ApiResponseError) as e:
             logger.error(
@@ -78,10 +244,17 @@ class Authenticator(dns_common.DNSAuthenticator):
             validation_domain_name,
             validation,
         )
+        content = '"{}"'.format(validation)
+        zoneConfig = self._popValidationZone(validation_domain_name, content)
         try:
-            self._getApiClient().deleteRecord(
-                validation_domain_name, "TXT", '"{}"'.format(validation)
-            )
+            if zoneConfig is None:
+                self._getApiClient().deleteRecord(
+                    validation_domain_name, "TXT", content
+                )
+            else:
+                self._getApiClient().deleteZoneRecordWithConfig(
+                    zoneConfig, validation_domain_name, "TXT", content
+                )
         except (ObjectNotFoundError, ApiHttpStatusError, ApiResponseError) as e:
             logger.error(
                 "Encountered error deleting TXT record. [{}]: {}".format(
@@ -109,7 +282,17 @@ class Authenticator(dns_common.DNSAuthenticator):
         logger.error(message)
         return errors.PluginError(message, e)
 
+    def _rememberValidationZone(self, validation_domain_name, content, zoneConfig):
+        key = (validation_domain_name.lower(), content)
+        self._validationZones[key] = zoneConfig
+
+    def _popValidationZone(self, validation_domain_name, content):
+        key = (validation_domain_name.lower(), content)
+        return self._validationZones.pop(key, None)
+
     def _getApiClient(self):
-        apiKey = self.credentials.conf("apikey")
-        logger.debug("Using apiKey: {}".format(apiKey))
-        return DnsApiClient(apiKey)
+        if self._apiClient is None:
+            apiKey = self.credentials.conf("apikey")
+            logger.debug("Using apiKey: {}".format(apiKey))
+            self._apiClient = DnsApiClient(apiKey)
+        return self._apiClient
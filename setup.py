@@ -30,6 +30,7 @@ setup(
     ],
     platforms="any",
     install_requires=install_requirements,
+    extras_require={"async": ["aiohttp"], "fast": ["orjson"]},
     long_description=long_description,
     long_description_content_type="text/markdown",
     keywords="hosting.de dns api client development certbot certbot-dns certbot-dns-plugin",
@@ -47,7 +48,8 @@ setup(
     entry_points={
         "certbot.plugins": [
             "dns-hostingde = hostingde.plugins.certbot.dns_hostingde:Authenticator"
-        ]
+        ],
+        "console_scripts": ["hostingde-dns = hostingde.cli:main"],
     },
 )
 
@@ -0,0 +1,182 @@
+"""Concurrent use of a single DnsApiClient against the stand-in api of benchmarks/standin.py."""
+
+import os
+import sys
+import threading
+import unittest
+import requests
+from hostingde.api.batch import RecordOperation
+from hostingde.api.bulk import applyZoneOperations
+from hostingde.api.dns import DnsApiClient
+from hostingde.api.errors import ObjectNotFoundError
+from hostingde.api.retry import RetryPolicy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from standin import StandInApi, StandInServer  # noqa: E402
+
+THREADS = 8
+NAMES_PER_THREAD = 5
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    def setUp(self):
+        # blocked objects make threads retry while others are still sending
+        self.api = StandInApi(latency=0.005, blockedRate=0.2, seed=1)
+        self.api.addSyntheticZone("example.org", 100)
+        self.api.addSyntheticZone("dev.example.org", 10)
+        self.server = StandInServer(self.api).start()
+        self.client = DnsApiClient(
+            "token",
+            baseUrl=self.server.url,
+            retryPolicy=RetryPolicy(maxRetries=20, baseDelay=0.001, maxDelay=0.01),
+        )
+        # dev.example.org is nested below example.org
+        self.client.enableZoneCache(suffixLookup=False)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def runThreads(self, target):
+        errors = []
+
+        def run(thread):
+            try:
+                target(thread)
+            except Exception as e:  # reported by the test thread
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def getContents(self, zoneName, recordName, recordType):
+        zone = self.client.getZoneByDomain(zoneName)
+        self.assertEqual(zone["zoneConfig"]["name"], zoneName)
+        return sorted(
+            record["content"]
+            for record in zone["records"]
+            if record["name"] == recordName and record["type"] == recordType
+        )
+
+    def testConcurrentSetRecord(self):
+        def setRecords(thread):
+            for i in range(NAMES_PER_THREAD):
+                name = "t{}-{}.example.org".format(thread, i)
+                self.client.setRecord(name, "A", "192.0.2.1")
+                self.client.setRecord(name, "A", "192.0.2.{}".format(thread + 10))
+                self.client.setRecord(
+                    "t{}.dev.example.org".format(thread), "TXT", '"x"'
+                )
+
+        self.runThreads(setRecords)
+        for thread in range(THREADS):
+            for i in range(NAMES_PER_THREAD):
+                name = "t{}-{}.example.org".format(thread, i)
+                self.assertEqual(
+                    self.getContents("example.org", name, "A"),
+                    ["192.0.2.{}".format(thread + 10)],
+                )
+            name = "t{}.dev.example.org".format(thread)
+            self.assertEqual(self.getContents("dev.example.org", name, "TXT"), ['"x"'])
+            self.assertEqual(self.getContents("example.org", name, "TXT"), [])
+
+    def testConcurrentSetRecordAndApplyRecordOperations(self):
+        def apply(thread):
+            if thread % 2 == 0:
+                for i in range(NAMES_PER_THREAD):
+                    name = "s{}-{}.example.org".format(thread, i)
+                    self.client.setRecord(name, "A", "192.0.2.{}".format(i))
+                return
+            operations = []
+            for i in range(NAMES_PER_THREAD):
+                name = "b{}-{}.example.org".format(thread, i)
+                operations.append(RecordOperation("add", name, "A", "192.0.2.1"))
+                operations.append(RecordOperation("set", name, "A", "192.0.2.2"))
+            name = "b{}.dev.example.org".format(thread)
+            operations.append(RecordOperation("add", name, "A", "192.0.2.3"))
+            results = list(
+                self.client.applyRecordOperations(
+                    operations, workers=2, merge=thread % 4 == 1
+                )
+            )
+            self.assertEqual(len(results), len(operations))
+            for result in results:
+                self.assertIsNone(result.error)
+
+        self.runThreads(apply)
+        zone = self.client.getZoneByDomain("example.org")
+        records = {}
+        for record in zone["records"]:
+            records.setdefault((record["name"], record["type"]), []).append(
+                record["content"]
+            )
+        for thread in range(THREADS):
+            for i in range(NAMES_PER_THREAD):
+                if thread % 2 == 0:
+                    name = "s{}-{}.example.org".format(thread, i)
+                    expected = ["192.0.2.{}".format(i)]
+                else:
+                    name = "b{}-{}.example.org".format(thread, i)
+                    expected = ["192.0.2.2"]
+                self.assertEqual(records.get((name, "A")), expected)
+            if thread % 2 == 1:
+                name = "b{}.dev.example.org".format(thread)
+                self.assertEqual(
+                    self.getContents("dev.example.org", name, "A"), ["192.0.2.3"]
+                )
+
+
+class FailingRefetchClient:
+    """zoneUpdate responses without records force a refetch, which fails once."""
+
+    def __init__(self, zone, failingZoneId=None):
+        self.zone = zone
+        self.failingZoneId = failingZoneId
+        self.fetches = 0
+        self.updates = []
+
+    def zoneUpdate(self, zoneConfig, recordsToAdd, recordsToDelete=[]):
+        if zoneConfig["id"] == self.failingZoneId:
+            raise requests.ReadTimeout("zoneUpdate timed out")
+        self.updates.append(recordsToAdd)
+        return {"zoneConfig": zoneConfig}
+
+    def getZonesByFilter(self, zoneFilter):
+        self.fetches += 1
+        if self.fetches == 1:
+            raise ObjectNotFoundError("Could not find any zone matching the filter.")
+        return [self.zone]
+
+
+class BulkErrorTest(unittest.TestCase):
+    def testFailedRefetchIsErrorOfNextOperation(self):
+        zone = {"zoneConfig": {"id": "z1", "name": "example.org"}, "records": []}
+        client = FailingRefetchClient(zone)
+        operations = [
+            RecordOperation("add", "a.example.org", "A", "192.0.2.1"),
+            RecordOperation("add", "b.example.org", "A", "192.0.2.2"),
+            RecordOperation("add", "c.example.org", "A", "192.0.2.3"),
+        ]
+        results = applyZoneOperations(client, zone, operations, merge=False)
+        self.assertEqual(len(results), 3)
+        # the applied update stays successful, the next one was not sent
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, ObjectNotFoundError)
+        self.assertIsNone(results[2].error)
+        self.assertEqual(len(client.updates), 2)
+
+    def testTransportErrorIsReturnedAsResult(self):
+        zone = {"zoneConfig": {"id": "z1", "name": "example.org"}, "records": []}
+        client = FailingRefetchClient(zone, failingZoneId="z1")
+        operation = RecordOperation("add", "a.example.org", "A", "192.0.2.1")
+        for merge in (True, False):
+            results = applyZoneOperations(client, zone, [operation], merge)
+            self.assertIsInstance(results[0].error, requests.ReadTimeout)
+
+
+if __name__ == "__main__":
+    unittest.main()